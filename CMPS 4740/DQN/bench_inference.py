@@ -0,0 +1,100 @@
+import os
+import time
+import argparse
+import importlib.util
+import numpy as np
+import torch
+from poke_env.battle.move import Move
+from features_v4 import FeatureExtractor
+from dqn_player import DQNPlayer
+from dqn_inference_player import DQNInferencePlayer, NUM_THREADS
+from export_dqn import export
+
+# --- CONFIG ---
+MODEL_FILE = "v4_models/dqn_heuristic.pth"
+ENGINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "New Models", "v16", "gen1_engine.py")
+FORWARD_CALLS = 20000
+BATTLES = 200
+SEED = 0
+
+def load_engine():
+    """v16's gen1_engine by file path, so sys.path (and which features_* wins) is untouched."""
+    spec = importlib.util.spec_from_file_location("gen1_engine", ENGINE_FILE)
+    engine = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(engine)
+    return engine
+
+gen1_engine = load_engine()
+
+def percentiles_us(samples):
+    samples = np.asarray(samples) * 1e6
+    return np.percentile(samples, 50), np.percentile(samples, 99), samples.mean()
+
+def bench_forward(q, input_dim, n_calls):
+    """Backend call alone on a full (9, dim) candidate matrix."""
+    x = np.random.default_rng(SEED).random((9, input_dim), dtype=np.float32)
+    for _ in range(100): q(x) # Warm-up (TorchScript profiling runs, ORT allocations)
+    times = np.empty(n_calls)
+    for i in range(n_calls):
+        start = time.perf_counter()
+        q(x)
+        times[i] = time.perf_counter() - start
+    return percentiles_us(times)
+
+def bench_choose_move(player, n_battles):
+    """Wall time of every choose_move call over seeded engine battles vs max base power."""
+    times = []
+    choose_move = player.choose_move
+    def timed(battle):
+        start = time.perf_counter()
+        order = choose_move(battle)
+        times.append(time.perf_counter() - start)
+        return order
+    player.choose_move = timed
+    # max_bp, not heuristic_policy: that one imports v16's player modules
+    gen1_engine.Gen1Engine(seed=SEED).play(player, gen1_engine.max_bp_policy, n_battles)
+    return percentiles_us(times) + (len(times),)
+
+def bench_extractor():
+    # The engine's moves are SimMoves, not poke_env Moves; each player's extractor is told explicitly
+    return FeatureExtractor(move_types=(Move, gen1_engine.SimMove))
+
+def make_players(model_path, stem, input_dim):
+    baseline = DQNPlayer(epsilon=0.0, device="cpu", extractor=bench_extractor(), start_listening=False)
+    baseline.model.load_state_dict(torch.load(model_path, map_location="cpu")['model_state_dict'])
+    baseline.model.eval()
+    yield "DQNPlayer", None, baseline
+    for backend, path in (("eager", model_path), ("script", stem + ".pt"), ("onnx", stem + ".onnx")):
+        yield backend, path, DQNInferencePlayer(path, backend=backend, extractor=bench_extractor(), start_listening=False)
+
+def benchmark(model_path, n_calls, n_battles):
+    input_dim = FeatureExtractor().total_dim
+    stem = os.path.splitext(model_path)[0]
+    missing = [fmt for fmt, ext in (("script", ".pt"), ("onnx", ".onnx")) if not os.path.exists(stem + ext)]
+    if missing: export(model_path, input_dim, missing)
+    torch.set_num_threads(NUM_THREADS) # Same thread budget for every backend, baseline included
+
+    print(f"--- DQN INFERENCE BENCHMARK ({model_path}, {NUM_THREADS} thread(s), {n_battles} engine battles) ---")
+    print(f"{'backend':10s} | {'forward p50':>11s} {'p99':>8s} | {'choose_move p50':>15s} {'p99':>8s} {'mean':>8s} | calls")
+    results = {}
+    for name, path, player in make_players(model_path, stem, input_dim):
+        if path is None:
+            def q(x, model=player.model):
+                with torch.no_grad():
+                    return model(torch.from_numpy(x).float()).cpu().numpy().flatten()
+        else:
+            q = player.q
+        f50, f99, _ = bench_forward(q, input_dim, n_calls)
+        c50, c99, cmean, calls = bench_choose_move(player, n_battles)
+        results[name] = c50
+        print(f"{name:10s} | {f50:9.1f}us {f99:6.1f}us | {c50:13.1f}us {c99:6.1f}us {cmean:6.1f}us | {calls}")
+    base = results["DQNPlayer"]
+    print("choose_move p50 speedup vs DQNPlayer: " + " | ".join(f"{k} x{base / v:.2f}" for k, v in results.items() if k != "DQNPlayer"))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("model", nargs="?", type=str, default=MODEL_FILE)
+    parser.add_argument("--calls", type=int, default=FORWARD_CALLS)
+    parser.add_argument("--battles", type=int, default=BATTLES)
+    args = parser.parse_args()
+    benchmark(args.model, args.calls, args.battles)
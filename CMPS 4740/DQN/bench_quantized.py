@@ -0,0 +1,90 @@
+import io
+import os
+import argparse
+import numpy as np
+import torch
+from features_v4 import FeatureExtractor
+from dqn_player import DQNPlayer
+from dqn_inference_player import DQNInferencePlayer, load_backend
+from export_dqn import load_quantized
+from bench_inference import bench_forward, bench_choose_move, bench_extractor, gen1_engine, FORWARD_CALLS
+
+# --- CONFIG ---
+MODEL_FILE = "v4_models/dqn_heuristic.pth"
+EVAL_BATTLES = 300 # Per opponent
+EVAL_SEED = 1000 # Battle i always uses engine seed EVAL_SEED + i: same teams for both models
+OPPONENTS = {"random": gen1_engine.random_policy, "maxbp": gen1_engine.max_bp_policy} # heuristic_policy imports v16's player modules
+
+def serialized_bytes(obj):
+    buffer = io.BytesIO()
+    torch.save(obj, buffer)
+    return buffer.tell()
+
+def memory_report(model_path, input_dim):
+    """Bytes each play-mode process holds for the model, today vs the int8 inference loader."""
+    player = DQNPlayer(epsilon=0.0, device="cpu", start_listening=False)
+    param_bytes = sum(p.numel() * p.element_size() for p in player.model.parameters())
+    phi = np.zeros(input_dim, dtype=np.float32)
+    player.memory.push(phi, 0, 0.0, phi, False) # Allocates the ring (pages are touched as it fills)
+    replay_bytes = sum(v.nbytes for v in vars(player.memory).values() if isinstance(v, np.ndarray))
+    rows = [("float model", param_bytes), ("target_model", param_bytes),
+            ("Adam state (m, v)", 2 * param_bytes), ("replay ring (reserved)", replay_bytes)]
+    float_total = sum(b for _, b in rows)
+    int8_bytes = serialized_bytes(load_quantized(model_path, input_dim).state_dict())
+
+    print("--- MEMORY (per process) ---")
+    for name, b in rows: print(f"DQNPlayer {name:24s} {b / 1024:10.1f} KiB")
+    print(f"DQNPlayer {'total':24s} {float_total / 1024:10.1f} KiB")
+    print(f"int8 inference model             {int8_bytes / 1024:10.1f} KiB (x{float_total / int8_bytes:.0f} less; float model alone x{param_bytes / int8_bytes:.1f})")
+    print(f"Checkpoint on disk: {os.path.getsize(model_path) / 1024:.1f} KiB (.pth incl. optimizer) | int8 state {int8_bytes / 1024:.1f} KiB")
+
+def latency_report(model_path, input_dim, n_calls, n_battles):
+    print("--- LATENCY (1 thread) ---")
+    for backend in ("eager", "int8"):
+        player = DQNInferencePlayer(model_path, backend=backend, extractor=bench_extractor(), start_listening=False)
+        f50, f99, _ = bench_forward(player.q, input_dim, n_calls)
+        c50, c99, _, _ = bench_choose_move(player, n_battles)
+        print(f"{backend:6s} | forward p50 {f50:6.1f}us p99 {f99:6.1f}us | choose_move p50 {c50:6.1f}us p99 {c99:6.1f}us")
+
+class AgreementPlayer(DQNInferencePlayer):
+    """Plays the float model while recording how often the int8 model picks the same action."""
+    def __init__(self, model_path, **kwargs):
+        super().__init__(model_path, backend="eager", **kwargs)
+        self.decisions = self.agreements = 0
+        q_float = self.q
+        q_int8 = load_backend(model_path, self.extractor.total_dim, "int8")
+
+        def q(phi):
+            values = q_float(phi)
+            self.decisions += 1
+            self.agreements += int(np.argmax(values) == np.argmax(q_int8(phi)))
+            return values
+        self.q = q
+
+def play_eval_set(player, opponent, n_battles):
+    return sum(gen1_engine.Gen1Engine(seed=EVAL_SEED + i).play_battle(player, opponent) for i in range(n_battles))
+
+def win_rate_report(model_path, n_battles):
+    print(f"--- WIN RATE ({n_battles} fixed battles per opponent) ---")
+    for name, opponent in OPPONENTS.items():
+        float_player = AgreementPlayer(model_path, extractor=bench_extractor(), start_listening=False)
+        int8_player = DQNInferencePlayer(model_path, backend="int8", extractor=bench_extractor(), start_listening=False)
+        wins_float = play_eval_set(float_player, opponent, n_battles)
+        wins_int8 = play_eval_set(int8_player, opponent, n_battles)
+        delta = (wins_int8 - wins_float) / n_battles
+        stderr = np.sqrt(2 * 0.25 / n_battles) # Worst-case s.e. of a difference of two win rates
+        agreement = float_player.agreements / max(1, float_player.decisions)
+        print(f"vs {name:9s} | float {wins_float / n_battles:6.1%} | int8 {wins_int8 / n_battles:6.1%} | "
+              f"diff {delta:+6.1%} (±{2 * stderr:.1%}) | same action {agreement:6.2%}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("model", nargs="?", type=str, default=MODEL_FILE)
+    parser.add_argument("--battles", type=int, default=EVAL_BATTLES)
+    parser.add_argument("--calls", type=int, default=FORWARD_CALLS)
+    args = parser.parse_args()
+    input_dim = FeatureExtractor().total_dim
+    torch.set_num_threads(1)
+    memory_report(args.model, input_dim)
+    latency_report(args.model, input_dim, args.calls, args.battles)
+    win_rate_report(args.model, args.battles)
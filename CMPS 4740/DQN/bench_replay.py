@@ -0,0 +1,64 @@
+import time
+import random
+import argparse
+import numpy as np
+from collections import deque
+from dqn_model import ReplayBuffer, PrioritizedReplayBuffer
+
+# --- CONFIG ---
+CAPACITY = 50000
+BATCH_SIZE = 512
+STATE_DIM = 21 # features_v4.FeatureExtractor.total_dim
+
+class DequeReplayBuffer:
+    """The original deque-of-tuples buffer, kept as the reference."""
+    def __init__(self, capacity=10000):
+        self.buffer = deque(maxlen=capacity)
+
+    def push(self, state, action, reward, next_state, done):
+        self.buffer.append((state, reward, next_state, done))
+
+    def sample(self, batch_size):
+        batch = random.sample(self.buffer, batch_size)
+        state, reward, next_state, done = zip(*batch)
+        return np.array(state), np.array(reward), np.array(next_state), np.array(done)
+
+    def __len__(self):
+        return len(self.buffer)
+
+def benchmark(capacity, batch_size, state_dim, n_samples, seed=0):
+    rng = np.random.default_rng(seed)
+    # Same shapes/dtypes the player pushes: float32 phi vectors, float rewards, bool dones
+    transitions = [(rng.random(state_dim, dtype=np.float32), float(rng.uniform(-1, 1)),
+                    rng.random(state_dim, dtype=np.float32), bool(rng.random() < 0.02)) for _ in range(capacity)]
+
+    print(f"--- REPLAY BUFFER BENCHMARK (capacity {capacity}, batch {batch_size}, dim {state_dim}) ---")
+    results = {}
+    buffers = (("deque", DequeReplayBuffer(capacity)), ("ring", ReplayBuffer(capacity, state_dim, seed=seed)),
+               ("per", PrioritizedReplayBuffer(capacity, state_dim, seed=seed)))
+    for name, buffer in buffers:
+        random.seed(seed)
+        start = time.perf_counter()
+        for s, r, s2, d in transitions: buffer.push(s, None, r, s2, d)
+        t_push = time.perf_counter() - start
+
+        buffer.sample(batch_size) # Warm-up (allocates the ring's batch arrays once)
+        start = time.perf_counter()
+        for _ in range(n_samples):
+            batch = buffer.sample(batch_size)
+            # PER: include the priority write-back optimize_model does after every batch
+            if name == "per": buffer.update_priorities(batch[5], rng.normal(size=batch_size))
+        t_sample = time.perf_counter() - start
+
+        results[name] = n_samples * batch_size / t_sample
+        print(f"{name:6s} | push {capacity / t_push:10,.0f} transitions/s | sample {results[name]:12,.0f} samples/s ({t_sample / n_samples * 1e3:.3f} ms/batch)")
+    print(f"Speedup: ring x{results['ring'] / results['deque']:.1f} | per x{results['per'] / results['deque']:.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--capacity", type=int, default=CAPACITY)
+    parser.add_argument("--batch_size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--state_dim", type=int, default=STATE_DIM)
+    parser.add_argument("--samples", type=int, default=500)
+    args = parser.parse_args()
+    benchmark(args.capacity, args.batch_size, args.state_dim, args.samples)
@@ -0,0 +1,70 @@
+import os
+import numpy as np
+from poke_env.player.player import Player
+from features_v4 import FeatureExtractor
+
+# --- CONFIG ---
+NUM_THREADS = 1 # A decision is a (<=9, 21) x 128 x 128 MLP; extra threads only add sync overhead
+BACKENDS = {'.pth': 'eager', '.pt': 'script', '.onnx': 'onnx'}
+
+def load_backend(path, input_dim=None, backend=None):
+    """
+    q(features) -> (n,) Q-values for a float32 (n, input_dim) C-contiguous array.
+    backend: 'eager' (.pth checkpoint, needs input_dim), 'int8' (.pth checkpoint, Linear
+    layers dynamically quantized on load), 'script' (TorchScript .pt, including
+    export_dqn.py's *_int8.pt) or 'onnx' (ONNX Runtime CPU); inferred from the file
+    extension when omitted.
+    """
+    backend = backend or BACKENDS[os.path.splitext(path)[1]]
+    if backend == 'onnx':
+        import onnxruntime as ort
+        opts = ort.SessionOptions()
+        opts.intra_op_num_threads = NUM_THREADS
+        opts.inter_op_num_threads = NUM_THREADS
+        opts.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        session = ort.InferenceSession(path, opts, providers=['CPUExecutionProvider'])
+        input_name = session.get_inputs()[0].name
+        return lambda x: session.run(None, {input_name: x})[0].ravel()
+
+    import torch
+    torch.set_num_threads(NUM_THREADS)
+    if backend == 'script':
+        model = torch.jit.load(path, map_location='cpu')
+    elif backend == 'int8':
+        from export_dqn import load_quantized
+        model = load_quantized(path, input_dim)
+    else:
+        from export_dqn import load_eager
+        model = load_eager(path, input_dim)
+    model.eval()
+
+    def q(x):
+        with torch.inference_mode():
+            return model(torch.from_numpy(x)).numpy().ravel()
+    return q
+
+
+class DQNInferencePlayer(Player):
+    """
+    Greedy, inference-only DQN for serving games: no replay memory, optimizer, target
+    network or exploration. Loads an eager checkpoint or an export_dqn.py artifact.
+    """
+    def __init__(self, model_path, battle_format="gen1randombattle", backend=None, extractor=None, **kwargs):
+        super().__init__(battle_format=battle_format, **kwargs)
+        self.extractor = extractor or FeatureExtractor()
+        self.q = load_backend(model_path, self.extractor.total_dim, backend)
+        self._phi = np.zeros((9, self.extractor.total_dim), dtype=np.float32) # Backend input, reused
+
+    def choose_move(self, battle):
+        actions = []
+        if battle.active_pokemon and not battle.active_pokemon.fainted:
+            actions.extend(battle.available_moves[:4])
+        actions.extend(mon for mon in battle.available_switches[:5] if not mon.fainted and not mon.active)
+
+        if not actions:
+            return self.choose_random_move(battle)
+
+        phi = self._phi[:len(actions)]
+        phi[:] = self.extractor.get_action_matrix(battle, actions) # float64 -> float32 in place
+        return self.create_order(actions[int(np.argmax(self.q(phi)))])
@@ -2,8 +2,6 @@ import torch
 import torch.nn as nn
 import torch.optim as optim
 import numpy as np
-import random
-from collections import deque
 
 class DQN(nn.Module):
     def __init__(self, input_dim):
@@ -18,17 +16,216 @@ class DQN(nn.Module):
         return self.fc3(x)
 
 class ReplayBuffer:
-    def __init__(self, capacity=10000):
-        self.buffer = deque(maxlen=capacity)
+    """
+    Fixed-capacity ring buffer stored as structure-of-arrays (float32).
+
+    sample() draws all indices with one vectorized RNG call (with replacement; at 512 of
+    50k, duplicates are rare) and gathers rows with np.take(..., out=) into batch arrays
+    allocated once per batch size, so steady-state sampling does no per-sample Python
+    allocation. The returned arrays are reused by the next sample() call. With CUDA they
+    are views of pinned tensors, so .to(device, non_blocking=True) avoids a staging copy;
+    call copies_issued() after those copies and the next sample() waits for them to land
+    before overwriting the arrays.
+    """
+    def __init__(self, capacity=10000, state_dim=None, seed=None, pin_memory=None):
+        self.capacity = capacity
+        self.pos = 0
+        self.size = 0
+        self.rng = np.random.default_rng(seed)
+        self.pin_memory = torch.cuda.is_available() if pin_memory is None else pin_memory
+
+        self.states = None
+        self.next_states = None
+        self.rewards = np.zeros(capacity, dtype=np.float32)
+        self.dones = np.zeros(capacity, dtype=np.float32)
+        if state_dim is not None: self._alloc(state_dim)
+
+        self._batches = {} # batch_size -> (uniforms, indices, states, rewards, next_states, dones)
+        self._in_flight = None # CUDA event after the last batch's async host-to-device copies
+
+    def _alloc(self, state_dim):
+        self.state_dim = state_dim
+        self.states = np.zeros((self.capacity, state_dim), dtype=np.float32)
+        self.next_states = np.zeros((self.capacity, state_dim), dtype=np.float32)
+
+    def _empty(self, shape):
+        if self.pin_memory:
+            return torch.empty(shape, dtype=torch.float32, pin_memory=True).numpy()
+        return np.empty(shape, dtype=np.float32)
+
+    def copies_issued(self, device):
+        """Marks the end of the non_blocking copies to device out of the last sample()'s arrays."""
+        device = torch.device(device)
+        if self.pin_memory and device.type == 'cuda':
+            self._in_flight = torch.cuda.Event()
+            self._in_flight.record(torch.cuda.current_stream(device))
+
+    def _batch(self, batch_size):
+        if self._in_flight is not None:
+            self._in_flight.synchronize() # The GPU may still be reading the pinned arrays
+            self._in_flight = None
+        batch = self._batches.get(batch_size)
+        if batch is None:
+            batch = (np.empty(batch_size, dtype=np.float64), np.empty(batch_size, dtype=np.int64),
+                     self._empty((batch_size, self.state_dim)), self._empty(batch_size),
+                     self._empty((batch_size, self.state_dim)), self._empty(batch_size))
+            self._batches[batch_size] = batch
+        return batch
 
     def push(self, state, action, reward, next_state, done):
         # We don't store 'action' separately because our features INCLUDE the action
         # So 'state' here is actually phi(s, a)
-        self.buffer.append((state, reward, next_state, done))
+        if self.states is None: self._alloc(len(state))
+        i = self.pos
+        self.states[i] = state
+        self.next_states[i] = next_state
+        self.rewards[i] = reward
+        self.dones[i] = done
+        self.pos = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def push_batch(self, states, rewards, next_states, dones):
+        """Vectorized push of n transitions (row arrays). Returns the slots written."""
+        n = len(rewards)
+        if self.states is None: self._alloc(states.shape[1])
+        idx = (self.pos + np.arange(n)) % self.capacity
+        self.states[idx] = states
+        self.next_states[idx] = next_states
+        self.rewards[idx] = rewards
+        self.dones[idx] = dones
+        self.pos = (self.pos + n) % self.capacity
+        self.size = min(self.size + n, self.capacity)
+        return idx
+
+    def _gather(self, batch):
+        _, idx, states, rewards, next_states, dones = batch
+        np.take(self.states, idx, axis=0, out=states)
+        np.take(self.rewards, idx, out=rewards)
+        np.take(self.next_states, idx, axis=0, out=next_states)
+        np.take(self.dones, idx, out=dones)
+        return states, rewards, next_states, dones
 
     def sample(self, batch_size):
-        state, reward, next_state, done = zip(*random.sample(self.buffer, batch_size))
-        return np.array(state), np.array(reward), np.array(next_state), np.array(done)
+        batch = self._batch(batch_size)
+        uniforms, idx = batch[0], batch[1]
+        self.rng.random(out=uniforms)
+        np.multiply(uniforms, self.size, out=uniforms)
+        idx[:] = uniforms # Truncating cast == floor for [0, size)
+        return self._gather(batch)
 
     def __len__(self):
-        return len(self.buffer)
\ No newline at end of file
+        return self.size
+
+
+class SumTree:
+    """
+    Array-based binary sum-tree over `capacity` leaf priorities.
+    Node i has children 2i and 2i+1, leaves live at [offset, offset + capacity) and
+    tree[1] is the total. Updates and prefix-sum searches are vectorized over a whole
+    batch, one NumPy op per level (O(log n)).
+    """
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.offset = 1 << max(1, (capacity - 1).bit_length())
+        self.depth = self.offset.bit_length() - 1
+        self.tree = np.zeros(2 * self.offset, dtype=np.float64)
+
+    @property
+    def total(self):
+        return self.tree[1]
+
+    def update(self, leaves, priorities):
+        nodes = np.asarray(leaves, dtype=np.int64) + self.offset
+        self.tree[nodes] = priorities
+        for _ in range(self.depth):
+            # All nodes sit on the same level; duplicates just write the same sum twice
+            nodes >>= 1
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+
+    def find(self, prefix_sums, out):
+        """Leaf index whose cumulative priority range contains each prefix sum (written to out)."""
+        out[:] = 1
+        for _ in range(self.depth):
+            out *= 2
+            left = self.tree[out]
+            go_right = prefix_sums >= left
+            prefix_sums -= left * go_right
+            out += go_right
+        out -= self.offset
+        return out
+
+
+class PrioritizedReplayBuffer(ReplayBuffer):
+    """
+    Proportional prioritized replay (Schaul et al. 2016) on top of the ring buffer.
+
+    P(i) = p_i^alpha / sum_k p_k^alpha with p_i = |TD error| + eps; new transitions get
+    the current max priority so each is replayed at least once. sample() additionally
+    returns importance-sampling weights (N * P(i))^-beta normalized by the batch max, and
+    the sampled indices for update_priorities(). beta anneals to 1 over beta_steps samples.
+
+    push() only records the leaf; pending leaves are written to the tree in one vectorized
+    update at the next sample(), so acting stays O(1) per transition.
+    """
+    def __init__(self, capacity=10000, state_dim=None, seed=None, pin_memory=None,
+                 alpha=0.6, beta=0.4, beta_steps=100000, eps=1e-3):
+        super().__init__(capacity, state_dim, seed, pin_memory)
+        self.alpha = alpha
+        self.beta_start = beta
+        self.beta_steps = beta_steps
+        self.eps = eps
+        self.tree = SumTree(capacity)
+        self.max_priority = 1.0
+        self.n_sampled = 0
+        self._pending = []
+        self._weights = {} # batch_size -> (IS weights, stratum offsets)
+
+    @property
+    def beta(self):
+        frac = min(1.0, self.n_sampled / self.beta_steps) if self.beta_steps else 1.0
+        return self.beta_start + (1.0 - self.beta_start) * frac
+
+    def push(self, state, action, reward, next_state, done):
+        self._pending.append(self.pos)
+        super().push(state, action, reward, next_state, done)
+
+    def push_batch(self, states, rewards, next_states, dones):
+        idx = super().push_batch(states, rewards, next_states, dones)
+        self._pending.extend(idx.tolist())
+        return idx
+
+    def _flush_pending(self):
+        if self._pending:
+            self.tree.update(self._pending, self.max_priority)
+            self._pending = []
+
+    def sample(self, batch_size):
+        self._flush_pending()
+        batch = self._batch(batch_size)
+        uniforms, idx = batch[0], batch[1]
+
+        cached = self._weights.get(batch_size)
+        if cached is None:
+            cached = self._weights[batch_size] = (self._empty(batch_size), np.arange(batch_size, dtype=np.float64))
+        weights, strata = cached
+
+        # Stratified: one uniform draw inside each of batch_size equal slices of the total
+        total = self.tree.total
+        self.rng.random(out=uniforms)
+        uniforms += strata
+        uniforms *= total / batch_size
+        self.tree.find(uniforms, idx)
+        np.minimum(idx, self.size - 1, out=idx) # Float round-off can step past the last filled leaf
+
+        probs = self.tree.tree[idx + self.tree.offset] / total
+        np.power(self.size * probs, -self.beta, out=weights, casting='unsafe')
+        weights /= weights.max()
+        self.n_sampled += batch_size
+
+        states, rewards, next_states, dones = self._gather(batch)
+        return states, rewards, next_states, dones, weights, idx
+
+    def update_priorities(self, indices, td_errors):
+        priorities = (np.abs(td_errors) + self.eps) ** self.alpha
+        self.max_priority = max(self.max_priority, float(priorities.max()))
+        self.tree.update(indices, priorities)
@@ -5,7 +5,9 @@ import torch.nn as nn  # <--- Added missing import
 from poke_env.player.player import Player
 from poke_env.battle.pokemon import Pokemon
 from features_v4 import FeatureExtractor
-from dqn_model import DQN, ReplayBuffer
+from dqn_model import DQN, ReplayBuffer, PrioritizedReplayBuffer
+from inference_batcher import InferenceBatcher
+from battle_log import BattleRecorderMixin
 
 # Fix Gen 1
 _original_available_moves = Pokemon.available_moves_from_request
@@ -16,22 +18,28 @@ def patched_available_moves(self, request):
         return []
 Pokemon.available_moves_from_request = patched_available_moves
 
-class DQNPlayer(Player):
-    def __init__(self, battle_format="gen1randombattle", epsilon=1.0, **kwargs):
+class DQNPlayer(BattleRecorderMixin, Player):
+    def __init__(self, battle_format="gen1randombattle", epsilon=1.0, prioritized=False, device=None, batch_inference_ms=None, extractor=None, **kwargs):
         super().__init__(battle_format=battle_format, **kwargs)
         
-        self.extractor = FeatureExtractor()
+        # features_v4 by default; features_hashed.HashedFeatureExtractor(bits) gives a 2^bits input
+        self.extractor = extractor or FeatureExtractor()
         
         # Setup Device (MPS for Mac M-series, else CPU)
-        self.device = torch.device("mps" if torch.backends.mps.is_available() else "cpu")
+        if device is None: device = "mps" if torch.backends.mps.is_available() else "cpu"
+        self.device = torch.device(device)
         
         # Neural Network
         self.model = DQN(self.extractor.total_dim).to(self.device)
         self.target_model = DQN(self.extractor.total_dim).to(self.device)
         self.target_model.load_state_dict(self.model.state_dict())
         self.optimizer = torch.optim.Adam(self.model.parameters(), lr=0.0001)
+        # Score decisions of all concurrent battles in one forward pass (None = per-decision)
+        self.batcher = InferenceBatcher(self.model, self.device, batch_inference_ms) if batch_inference_ms is not None else None
         
-        self.memory = ReplayBuffer(capacity=50000)
+        self.prioritized = prioritized
+        BufferClass = PrioritizedReplayBuffer if prioritized else ReplayBuffer
+        self.memory = BufferClass(capacity=50000, state_dim=self.extractor.total_dim)
         self.batch_size = 512
         self.gamma = 0.999
         self.epsilon = epsilon
@@ -55,25 +63,38 @@ class DQNPlayer(Player):
             return self.choose_random_move(battle)
 
         # 1. Calculate Q-values for all possible actions
-        candidate_features = []
-        for action_obj, _ in valid_actions:
-            phi = self.extractor.get_features(battle, action_obj)
-            candidate_features.append(phi)
+        # (n_actions, dim) matrix: state encoded once, rows live in the extractor's reused buffer
+        candidate_features = self.extractor.get_action_matrix(battle, [a for a, _ in valid_actions])
         
+        if self.batcher is not None:
+            # poke-env awaits the coroutine; the batcher answers once its micro-batch is scored.
+            # Other battles reuse the extractor buffer meanwhile, so this one keeps a copy.
+            return self._choose_move_batched(battle, valid_actions, candidate_features.copy())
+
         # Convert to Tensor for batch prediction
-        features_tensor = torch.FloatTensor(np.array(candidate_features)).to(self.device)
+        features_tensor = torch.from_numpy(candidate_features).float().to(self.device)
         
         with torch.no_grad():
             q_values = self.model(features_tensor).cpu().numpy().flatten()
             
-        # 2. Epsilon-Greedy Selection
-        if random.random() < self.epsilon:
+        return self._select_action(battle, valid_actions, candidate_features, q_values)
+
+    async def _choose_move_batched(self, battle, valid_actions, candidate_features):
+        q_values = await self.batcher.score(candidate_features)
+        return self._select_action(battle, valid_actions, candidate_features, q_values)
+
+    def _select_action(self, battle, valid_actions, candidate_features, q_values):
+        # 2. Epsilon-Greedy Selection (offline replay pins the logged action)
+        logged_idx = self.replay_index([a for a, _ in valid_actions])
+        if logged_idx is not None:
+            choice_idx = logged_idx
+        elif random.random() < self.epsilon:
             choice_idx = random.randint(0, len(valid_actions) - 1)
         else:
             choice_idx = np.argmax(q_values)
             
         chosen_action = valid_actions[choice_idx][0] # Action Object
-        chosen_phi = candidate_features[choice_idx]
+        chosen_phi = candidate_features[choice_idx].copy() # Kept past this turn
         
         # 3. Store Transition
         battle_id = battle.battle_tag
@@ -87,6 +108,14 @@ class DQNPlayer(Player):
         
         return self.create_order(chosen_action)
 
+    def drop_context(self, battle_tag):
+        """Frees an abandoned battle's last features (it never gets a terminal transition)."""
+        self._last_features.pop(battle_tag, None)
+
+    def _battle_finished_callback(self, battle):
+        # The only terminal hook poke_env 0.16 calls live (at |win| / |tie|)
+        self.battle_finished_callback(battle)
+
     def battle_finished_callback(self, battle):
         battle_id = battle.battle_tag
         self.last_battle_won = battle.won
@@ -101,9 +130,6 @@ class DQNPlayer(Player):
             self.memory.push(last_phi, 0, reward, np.zeros_like(last_phi), True)
             
             del self._last_features[battle_id]
-            
-            if battle_id in self._battles:
-                del self._battles[battle_id]
 
     def optimize_model(self):
         if len(self.memory) < self.batch_size:
@@ -111,12 +137,19 @@ class DQNPlayer(Player):
         
         # FIX: Removed the extra variable "_" (action) from unpacking
         # The memory sample returns (state, reward, next_state, done)
-        states, rewards, next_states, dones = self.memory.sample(self.batch_size)
-        
-        states = torch.FloatTensor(states).to(self.device)
-        rewards = torch.FloatTensor(rewards).unsqueeze(1).to(self.device)
-        next_states = torch.FloatTensor(next_states).to(self.device)
-        dones = torch.FloatTensor(dones).unsqueeze(1).to(self.device)
+        batch = self.memory.sample(self.batch_size)
+        states, rewards, next_states, dones = batch[:4]
+        
+        # Zero-copy views of the buffer's preallocated batch arrays (float32 already)
+        non_blocking = self.memory.pin_memory
+        states = torch.from_numpy(states).to(self.device, non_blocking=non_blocking)
+        rewards = torch.from_numpy(rewards).unsqueeze(1).to(self.device, non_blocking=non_blocking)
+        next_states = torch.from_numpy(next_states).to(self.device, non_blocking=non_blocking)
+        dones = torch.from_numpy(dones).unsqueeze(1).to(self.device, non_blocking=non_blocking)
+        if self.prioritized:
+            weights, indices = batch[4], batch[5]
+            weights = torch.from_numpy(weights).unsqueeze(1).to(self.device, non_blocking=non_blocking)
+        self.memory.copies_issued(self.device) # The next sample() reuses these arrays
         
         # Current Q(s, a)
         current_q = self.model(states)
@@ -126,8 +159,14 @@ class DQNPlayer(Player):
             next_q = self.target_model(next_states)
             target_q = rewards + (1 - dones) * self.gamma * next_q
 
-        # Use nn.MSELoss (requires import torch.nn as nn)
-        loss = nn.MSELoss()(current_q, target_q)
+        if self.prioritized:
+            # Importance-sampling weighted MSE; |TD error| becomes the new priority
+            td_errors = target_q - current_q
+            loss = (weights * td_errors.pow(2)).mean()
+            self.memory.update_priorities(indices, td_errors.detach().squeeze(1).cpu().numpy())
+        else:
+            # Use nn.MSELoss (requires import torch.nn as nn)
+            loss = nn.MSELoss()(current_q, target_q)
         
         self.optimizer.zero_grad()
         loss.backward()
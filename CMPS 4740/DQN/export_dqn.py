@@ -0,0 +1,69 @@
+import os
+import argparse
+import torch
+import torch.nn as nn
+from dqn_model import DQN
+from features_v4 import FeatureExtractor
+
+# --- CONFIG ---
+ONNX_OPSET = 17
+EXAMPLE_ACTIONS = 9 # 4 moves + 5 switches; the action axis is exported as dynamic
+
+def load_eager(model_path, input_dim):
+    model = DQN(input_dim)
+    checkpoint = torch.load(model_path, map_location="cpu")
+    model.load_state_dict(checkpoint['model_state_dict'])
+    return model.eval()
+
+def quantize(model):
+    """Post-training dynamic quantization: int8 Linear weights, activations quantized per call."""
+    return torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+
+def load_quantized(model_path, input_dim):
+    return quantize(load_eager(model_path, input_dim)).eval()
+
+def export(model_path, input_dim, formats=("script", "onnx")):
+    """v4_models/dqn_X.pth -> dqn_X.pt (frozen TorchScript), dqn_X.onnx and/or dqn_X_int8.pt next to it. Returns the paths."""
+    model = load_eager(model_path, input_dim)
+    stem = os.path.splitext(model_path)[0]
+    example = torch.zeros(EXAMPLE_ACTIONS, input_dim)
+    paths = {}
+
+    if "script" in formats:
+        # freeze() folds the weights into the graph as constants and drops training-only paths
+        scripted = torch.jit.freeze(torch.jit.script(model))
+        scripted = torch.jit.optimize_for_inference(scripted)
+        paths["script"] = stem + ".pt"
+        scripted.save(paths["script"])
+
+    if "onnx" in formats:
+        paths["onnx"] = stem + ".onnx"
+        torch.onnx.export(
+            model, example, paths["onnx"],
+            input_names=["phi"], output_names=["q"],
+            dynamic_axes={"phi": {0: "n_actions"}, "q": {0: "n_actions"}},
+            opset_version=ONNX_OPSET)
+
+    if "int8" in formats:
+        # Scripted, not frozen: freeze() would unpack the quantized Linear params
+        paths["int8"] = stem + "_int8.pt"
+        torch.jit.script(quantize(model)).save(paths["int8"])
+
+    # Sanity check: every artifact reproduces the eager Q-values
+    from dqn_inference_player import load_backend
+    x = torch.randn(EXAMPLE_ACTIONS, input_dim).numpy()
+    with torch.no_grad():
+        expected = model(torch.from_numpy(x)).numpy().ravel()
+    for fmt, path in paths.items():
+        err = abs(load_backend(path, input_dim)(x) - expected).max()
+        print(f"✅ {fmt:6s} -> {path} (max |dQ| vs eager {err:.2e})")
+    return paths
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("model", nargs="?", type=str, default="v4_models/dqn_heuristic.pth")
+    parser.add_argument("--formats", type=str, nargs="+", default=["script", "onnx"], choices=["script", "onnx", "int8"])
+    parser.add_argument("--hash_bits", type=int, default=None, help="Model was trained with train_dqn.py --hash_bits")
+    args = parser.parse_args()
+    input_dim = (1 << args.hash_bits) if args.hash_bits else FeatureExtractor().total_dim
+    export(args.model, input_dim, args.formats)
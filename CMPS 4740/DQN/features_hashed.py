@@ -0,0 +1,155 @@
+import zlib
+import numpy as np
+from type_chart import type_effectiveness
+from poke_env.battle.move import Move
+
+# --- CONFIG ---
+HASH_BITS = 16 # 2^16 buckets; the weight vector keeps this size whatever the species / move pool
+
+def _name(x):
+    """Enum member, string or None -> stable feature-name fragment."""
+    return getattr(x, 'name', x)
+
+class HashedFeatureExtractor:
+    """
+    Hashing-trick phi(s, a). Every feature is a name ('opp_species=snorlax',
+    'cross=ICE>DRAGON', 'move=blizzard', ...) hashed with crc32 into one of 2^bits buckets,
+    with a second hash bit as its sign so colliding features cancel on average instead of
+    piling up (Weinberger et al. 2009). crc32 is stable across processes and runs, unlike
+    hash(), so weight files stay valid; a new species, move or generation only adds names,
+    never changes total_dim.
+
+    Same sparse / dense API as features_full.FeatureExtractor. Indices are unique within
+    the state part and within each action part, but a state and an action feature can share
+    a bucket, so updates over a concatenated phi must accumulate (np.add.at).
+    """
+    def __init__(self, bits=HASH_BITS):
+        assert 1 <= bits <= 30, "bucket bits and the sign bit (31) must not overlap"
+        self.bits = bits
+        self.size = 1 << bits
+        self._slots = {} # name -> (bucket, sign), memoized crc32
+        self._matrix = np.zeros((9, self.size)) # Reused by get_action_matrix
+
+    @property
+    def total_dim(self):
+        return self.size
+
+    def _add(self, entries, name, value=1.0):
+        if value == 0.0: return
+        slot = self._slots.get(name)
+        if slot is None:
+            h = zlib.crc32(name.encode())
+            slot = self._slots[name] = (h & (self.size - 1), 1.0 if h >> 31 else -1.0)
+        bucket, sign = slot
+        entries[bucket] = entries.get(bucket, 0.0) + sign * value
+
+    @staticmethod
+    def _to_arrays(entries):
+        return np.fromiter(entries.keys(), dtype=np.intp, count=len(entries)), np.fromiter(entries.values(), dtype=np.float64, count=len(entries))
+
+    # --- STATE ---
+    def _mon_entries(self, mon, side, entries):
+        add = self._add
+        add(entries, f"{side}_hp", mon.current_hp_fraction)
+        for stat, value in mon.base_stats.items():
+            add(entries, f"{side}_base_{stat}", value / 255.0)
+        for stat, stage in mon.boosts.items():
+            add(entries, f"{side}_boost_{stat}", stage / 6.0)
+        add(entries, f"{side}_species={mon.species}")
+        status = 'FNT' if mon.fainted else (_name(mon.status) or 'NONE')
+        add(entries, f"{side}_status={status}")
+        for effect in mon.effects:
+            add(entries, f"{side}_effect={_name(effect)}")
+
+    def _state_entries(self, battle):
+        entries = {}
+        me, opp = battle.active_pokemon, battle.opponent_active_pokemon
+        if me: self._mon_entries(me, "my", entries)
+        if opp: self._mon_entries(opp, "opp", entries)
+        for cond in battle.side_conditions:
+            self._add(entries, f"my_side={_name(cond)}")
+        for cond in battle.opponent_side_conditions:
+            self._add(entries, f"opp_side={_name(cond)}")
+        self._add(entries, "bias")
+        return entries
+
+    # --- ACTION ---
+    def _action_entries(self, battle, move):
+        entries = {}
+        add = self._add
+        opp = battle.opponent_active_pokemon
+        opp_types = [t for t in opp.types if t is not None] if opp else []
+
+        if isinstance(move, Move):
+            add(entries, "is_move")
+            add(entries, f"move={move.id}")
+            add(entries, f"category={_name(move.category)}")
+            add(entries, "accuracy", 1.0 if move.accuracy is True else float(move.accuracy))
+            if move.status: add(entries, f"move_status={_name(move.status)}")
+            if move.volatile_status: add(entries, f"move_volatile={_name(move.volatile_status)}")
+
+            me = battle.active_pokemon
+            stab = me is not None and move.type in me.types
+            if stab: add(entries, "stab")
+            if move.base_power > 0:
+                eff = type_effectiveness(move.type, opp.type_1, opp.type_2, gen=getattr(battle, 'gen', 1)) if opp else 1.0
+                add(entries, "dmg_pot", move.base_power * (1.5 if stab else 1.0) * eff / 300.0)
+            # Move type x defender type: lets the model learn the chart (and per-gen quirks)
+            for t in opp_types:
+                add(entries, f"cross={_name(move.type)}>{_name(t)}")
+        else:
+            add(entries, "is_switch")
+            add(entries, f"switch={move.species}")
+            add(entries, "switch_hp", move.current_hp_fraction)
+            # Opponent's STAB types x the switch-in's types
+            for u in opp_types:
+                for t in move.types:
+                    if t is not None: add(entries, f"switch_cross={_name(u)}>{_name(t)}")
+        return entries
+
+    # --- SPARSE API ---
+    def get_sparse_state(self, battle):
+        return self._to_arrays(self._state_entries(battle))
+
+    def get_sparse_action(self, battle, move):
+        return self._to_arrays(self._action_entries(battle, move))
+
+    def get_sparse_actions(self, battle, actions):
+        """(n, m) index / value arrays for all candidates, padded with index -1 / value 0.0."""
+        parts = [self._action_entries(battle, move) for move in actions]
+        width = max((len(p) for p in parts), default=0)
+        idx = np.full((len(parts), width), -1, dtype=np.intp)
+        vals = np.zeros((len(parts), width))
+        for row, entries in enumerate(parts):
+            idx[row, :len(entries)] = list(entries.keys())
+            vals[row, :len(entries)] = list(entries.values())
+        return idx, vals
+
+    def get_sparse_features(self, battle, move_obj=None):
+        """(indices, values) with unique indices: phi[indices] == values, zero elsewhere."""
+        entries = self._state_entries(battle)
+        if move_obj is not None:
+            for bucket, value in self._action_entries(battle, move_obj).items():
+                entries[bucket] = entries.get(bucket, 0.0) + value
+        return self._to_arrays(entries)
+
+    # --- DENSE API (DQN) ---
+    def get_features(self, battle, move_obj=None):
+        phi = np.zeros(self.size)
+        idx, vals = self.get_sparse_features(battle, move_obj)
+        phi[idx] = vals
+        return phi
+
+    def get_action_matrix(self, battle, actions, out=None):
+        """(len(actions), 2^bits) dense phi rows in a reused buffer (copy any row you keep)."""
+        n = len(actions)
+        if out is None:
+            if self._matrix.shape[0] < n: self._matrix = np.zeros((n, self.size))
+            out = self._matrix[:n]
+        out[:] = 0.0
+        s_idx, s_vals = self.get_sparse_state(battle)
+        out[:, s_idx] = s_vals
+        for row, move in zip(out, actions):
+            a_idx, a_vals = self.get_sparse_action(battle, move)
+            row[a_idx] += a_vals # Indices are unique within the action part
+        return out
@@ -1,11 +1,18 @@
 import numpy as np
+from type_chart import type_effectiveness
 from poke_env.battle.move import Move
 from poke_env.battle.pokemon import Pokemon
 from poke_env.battle.effect import Effect
 from poke_env.battle.status import Status
 
 class FeatureExtractor:
-    def __init__(self):
+    STATE_DIM = 13
+    ACTION_DIM = 8
+
+    def __init__(self, move_types=(Move,)):
+        # Classes scored as moves (anything else is a switch target). Only the engine
+        # benchmark passes more: (Move, gen1_engine.SimMove).
+        self.move_types = move_types
         # NORMALIZED TYPES (ALL UPPERCASE)
         self.types = [
             'NORMAL', 'FIRE', 'WATER', 'ELECTRIC', 'GRASS', 'ICE', 
@@ -13,36 +20,11 @@ class FeatureExtractor:
             'BUG', 'ROCK', 'GHOST', 'DRAGON'
         ]
         self.special_types = {'FIRE', 'WATER', 'GRASS', 'ICE', 'ELECTRIC', 'PSYCHIC', 'DRAGON'}
-        
-        # GEN 1 TYPE CHART (Upper Case Keys)
-        self.gen1_chart = {
-            ('NORMAL', 'GHOST'): 0.0, ('NORMAL', 'ROCK'): 0.5,
-            ('FIRE', 'FIRE'): 0.5, ('FIRE', 'WATER'): 0.5, ('FIRE', 'GRASS'): 2.0, ('FIRE', 'ICE'): 2.0, ('FIRE', 'BUG'): 2.0, ('FIRE', 'ROCK'): 0.5, ('FIRE', 'DRAGON'): 0.5,
-            ('WATER', 'FIRE'): 2.0, ('WATER', 'WATER'): 0.5, ('WATER', 'GRASS'): 0.5, ('WATER', 'GROUND'): 2.0, ('WATER', 'ROCK'): 2.0, ('WATER', 'DRAGON'): 0.5,
-            ('ELECTRIC', 'WATER'): 2.0, ('ELECTRIC', 'ELECTRIC'): 0.5, ('ELECTRIC', 'GRASS'): 0.5, ('ELECTRIC', 'GROUND'): 0.0, ('ELECTRIC', 'FLYING'): 2.0, ('ELECTRIC', 'DRAGON'): 0.5,
-            ('GRASS', 'FIRE'): 0.5, ('GRASS', 'WATER'): 2.0, ('GRASS', 'GRASS'): 0.5, ('GRASS', 'POISON'): 0.5, ('GRASS', 'GROUND'): 2.0, ('GRASS', 'FLYING'): 0.5, ('GRASS', 'BUG'): 0.5, ('GRASS', 'ROCK'): 2.0, ('GRASS', 'DRAGON'): 0.5,
-            ('ICE', 'WATER'): 0.5, ('ICE', 'GRASS'): 2.0, ('ICE', 'ICE'): 0.5, ('ICE', 'GROUND'): 2.0, ('ICE', 'FLYING'): 2.0, ('ICE', 'DRAGON'): 2.0,
-            ('FIGHTING', 'NORMAL'): 2.0, ('FIGHTING', 'ICE'): 2.0, ('FIGHTING', 'POISON'): 0.5, ('FIGHTING', 'FLYING'): 0.5, ('FIGHTING', 'PSYCHIC'): 0.5, ('FIGHTING', 'BUG'): 0.5, ('FIGHTING', 'ROCK'): 2.0, ('FIGHTING', 'GHOST'): 0.0,
-            ('POISON', 'GRASS'): 2.0, ('POISON', 'POISON'): 0.5, ('POISON', 'GROUND'): 0.5, ('POISON', 'BUG'): 2.0, ('POISON', 'ROCK'): 0.5, ('POISON', 'GHOST'): 0.5,
-            ('GROUND', 'FIRE'): 2.0, ('GROUND', 'ELECTRIC'): 2.0, ('GROUND', 'GRASS'): 0.5, ('GROUND', 'POISON'): 2.0, ('GROUND', 'FLYING'): 0.0, ('GROUND', 'BUG'): 0.5, ('GROUND', 'ROCK'): 2.0,
-            ('FLYING', 'ELECTRIC'): 0.5, ('FLYING', 'GRASS'): 2.0, ('FLYING', 'FIGHTING'): 2.0, ('FLYING', 'BUG'): 2.0, ('FLYING', 'ROCK'): 0.5,
-            ('PSYCHIC', 'FIGHTING'): 2.0, ('PSYCHIC', 'POISON'): 2.0, ('PSYCHIC', 'PSYCHIC'): 0.5,
-            ('BUG', 'FIRE'): 0.5, ('BUG', 'GRASS'): 2.0, ('BUG', 'FIGHTING'): 0.5, ('BUG', 'POISON'): 2.0, ('BUG', 'FLYING'): 0.5, ('BUG', 'GHOST'): 0.5,
-            ('ROCK', 'FIRE'): 2.0, ('ROCK', 'ICE'): 2.0, ('ROCK', 'FIGHTING'): 0.5, ('ROCK', 'GROUND'): 0.5, ('ROCK', 'FLYING'): 2.0, ('ROCK', 'BUG'): 2.0,
-            ('GHOST', 'NORMAL'): 0.0, ('GHOST', 'PSYCHIC'): 0.0, ('GHOST', 'GHOST'): 2.0,
-            ('DRAGON', 'DRAGON'): 2.0
-        }
+        self._matrix = np.zeros((9, self.total_dim)) # Reused by get_action_matrix (4 moves + 5 switches)
 
     def get_effectiveness(self, move_type, def_type1, def_type2=None):
-        if not move_type or not def_type1: return 1.0
-        # Force UPPERCASE matching
-        m_t = move_type.upper()
-        d_t1 = def_type1.upper()
-        eff = self.gen1_chart.get((m_t, d_t1), 1.0)
-        if def_type2:
-            d_t2 = def_type2.upper()
-            eff *= self.gen1_chart.get((m_t, d_t2), 1.0)
-        return eff
+        # Shared dense chart (type_chart.py); accepts PokemonType or type names in any case
+        return type_effectiveness(move_type, def_type1, def_type2)
 
     def get_features(self, battle, move_obj=None):
         # --- STATE FEATURES (13) ---
@@ -101,7 +83,26 @@ class FeatureExtractor:
         action_vec = self._get_action_features(battle, move_obj)
         return np.concatenate([state_vec, action_vec])
 
+    def get_action_matrix(self, battle, actions, out=None):
+        """
+        (len(actions), total_dim) matrix of phi(s, a) for every candidate action, equal to
+        stacking get_features(battle, a). The state block is encoded once and broadcast;
+        action features are written straight into the rows. Without `out` the rows live in
+        a buffer reused by the next call, so copy any row you keep.
+        """
+        n = len(actions)
+        if out is None:
+            if self._matrix.shape[0] < n: self._matrix = np.zeros((n, self.total_dim))
+            out = self._matrix[:n]
+        out[:, :self.STATE_DIM] = self.get_features(battle)
+        for row, action in zip(out, actions):
+            self._fill_action_features(battle, action, row[self.STATE_DIM:])
+        return out
+
     def _get_action_features(self, battle, move):
+        return self._fill_action_features(battle, move, np.zeros(self.ACTION_DIM))
+
+    def _fill_action_features(self, battle, move, row):
         is_move = 0.0
         is_switch = 0.0
         
@@ -112,7 +113,7 @@ class FeatureExtractor:
         switch_def_adv = 0.0
         is_stab = 0.0
 
-        if isinstance(move, Move):
+        if isinstance(move, self.move_types):
             is_move = 1.0
             
             if move.base_power > 0:
@@ -147,11 +148,12 @@ class FeatureExtractor:
                 elif eff < 1.0: switch_def_adv = 0.5 
                 elif eff > 1.0: switch_def_adv = -0.5 
 
-        return np.array([
+        row[:] = (
             is_move, is_switch,
             dmg_pot, accuracy, is_stab,
             is_status, is_recovery, switch_def_adv
-        ])
+        )
+        return row
 
     @property
     def total_dim(self):
@@ -0,0 +1,105 @@
+import time
+import asyncio
+import numpy as np
+import torch
+
+# --- CONFIG ---
+MAX_WAIT_MS = 2.0 # Longest a request waits for company before its batch is flushed
+MAX_BATCH_ROWS = 256 # Flush immediately once this many candidate rows are queued
+BATCH_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256] # Requests per forward pass
+LATENCY_BUCKETS_MS = [0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 50] # Enqueue -> result
+
+class Histogram:
+    """Fixed-bucket histogram: counts[i] = values <= bounds[i] (last bucket is overflow)."""
+    def __init__(self, bounds):
+        self.bounds = np.asarray(bounds, dtype=np.float64)
+        self.counts = np.zeros(len(bounds) + 1, dtype=np.int64)
+        self.total = 0.0
+
+    def record(self, value):
+        self.counts[np.searchsorted(self.bounds, value)] += 1
+        self.total += value
+
+    @property
+    def n(self):
+        return int(self.counts.sum())
+
+    def mean(self):
+        return self.total / self.n if self.n else 0.0
+
+    def percentile(self, q):
+        """Upper bound of the bucket holding the q-th percentile (inf for the overflow bucket)."""
+        if not self.n: return 0.0
+        i = int(np.searchsorted(np.cumsum(self.counts), q / 100 * self.n))
+        return float(self.bounds[i]) if i < len(self.bounds) else float('inf')
+
+    def snapshot(self):
+        labels = [f"<={b:g}" for b in self.bounds] + [f">{self.bounds[-1]:g}"]
+        return dict(zip(labels, self.counts.tolist()))
+
+    def reset(self):
+        self.counts[:] = 0
+        self.total = 0.0
+
+
+class InferenceBatcher:
+    """
+    Micro-batches Q-value requests from every in-flight battle into one forward pass.
+
+    score(features) queues a (k, dim) block of candidate phi(s, a) rows and returns a
+    future. The first request of a batch arms a MAX_WAIT_MS timer on the running loop;
+    the batch is flushed when the timer fires or MAX_BATCH_ROWS rows are queued, and each
+    future gets its own slice of the Q-values. All battles of a player share one event
+    loop, so no locking is needed.
+    """
+    def __init__(self, model, device, max_wait_ms=MAX_WAIT_MS, max_rows=MAX_BATCH_ROWS):
+        self.model = model
+        self.device = device
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_rows = max_rows
+        self.pending = [] # (features, future, enqueue time)
+        self.pending_rows = 0
+        self.timer = None
+
+        self.batch_sizes = Histogram(BATCH_BUCKETS)
+        self.latencies_ms = Histogram(LATENCY_BUCKETS_MS)
+
+    def score(self, features):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append((features, future, time.perf_counter()))
+        self.pending_rows += len(features)
+        if self.pending_rows >= self.max_rows:
+            self.flush()
+        elif self.timer is None:
+            self.timer = loop.call_later(self.max_wait, self.flush)
+        return future
+
+    def flush(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        batch, self.pending, self.pending_rows = self.pending, [], 0
+        if not batch: return
+
+        features = np.concatenate([f for f, _, _ in batch])
+        with torch.no_grad():
+            q_values = self.model(torch.from_numpy(features.astype(np.float32, copy=False)).to(self.device)).cpu().numpy().flatten()
+
+        now = time.perf_counter()
+        self.batch_sizes.record(len(batch))
+        offset = 0
+        for f, future, enqueued in batch:
+            self.latencies_ms.record((now - enqueued) * 1000.0)
+            if not future.done(): # The battle may have timed out / been cancelled meanwhile
+                future.set_result(q_values[offset:offset + len(f)])
+            offset += len(f)
+
+    def summary(self):
+        b, l = self.batch_sizes, self.latencies_ms
+        return (f"Batch mean {b.mean():.1f} p50 {b.percentile(50):g} p99 {b.percentile(99):g} | "
+                f"Queue mean {l.mean():.2f}ms p50 {l.percentile(50):g}ms p99 {l.percentile(99):g}ms")
+
+    def reset_stats(self):
+        self.batch_sizes.reset()
+        self.latencies_ms.reset()
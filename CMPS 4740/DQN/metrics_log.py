@@ -0,0 +1,167 @@
+import os
+import csv
+import time
+import math
+import struct
+import argparse
+import numpy as np
+
+# --- CONFIG ---
+METRICS_EXT = ".metrics"
+MAGIC = b"PKMETv1\n" # File header; bump the version if FIELDS ever change
+
+# One schema for every agent's training log; a column an agent doesn't have is NaN
+# (floats), -1 (table_size) or empty (opponent). Win rates are fractions, not "86.00%".
+#   name          struct  CSV column(s) it replaces
+FIELDS = [
+    ('time',        'd',   ()),                      # Unix time the row was written (NaN if converted)
+    ('battles',     'q',   ('Battles', 'Episode')),
+    ('rolling_win', 'd',   ('RollingWin',)),
+    ('overall_win', 'd',   ('OverallWin', 'WinRate')), # Linear SARSA's WinRate is cumulative
+    ('epsilon',     'd',   ('Epsilon',)),
+    ('tau',         'd',   ('Tau',)),
+    ('speed',       'd',   ('Speed',)),
+    ('avg_reward',  'd',   ('AvgReward',)),
+    ('table_size',  'q',   ('TableSize',)),
+    ('opponent',    '16s', ('Opponent',)),
+]
+NAMES = [name for name, _, _ in FIELDS]
+RECORD = struct.Struct('<' + ''.join(code for _, code, _ in FIELDS)) # Fixed width: the last row is at size - RECORD.size
+DTYPE = np.dtype([(name, {'d': '<f8', 'q': '<i8', '16s': 'S16'}[code]) for name, code, _ in FIELDS])
+MISSING = {'d': math.nan, 'q': -1, '16s': b''}
+CSV_COLUMNS = {column: name for name, _, columns in FIELDS for column in columns}
+FRAME_COLUMNS = {name: columns[0] for name, _, columns in FIELDS if columns} # Plot scripts keep the CSV names
+
+def metrics_path(path):
+    return os.path.splitext(path)[0] + METRICS_EXT
+
+def _legacy(path):
+    """The CSV a metrics log replaces (it seeds the log on its first append)."""
+    return os.path.splitext(path)[0] + ".csv"
+
+def _pack(row):
+    values = []
+    for name, code, _ in FIELDS:
+        value = row.get(name)
+        if value is None: value = MISSING[code]
+        elif code == '16s': value = str(value).encode()[:16]
+        elif code == 'q': value = int(value)
+        else: value = float(value)
+        values.append(value)
+    return RECORD.pack(*values)
+
+def _unpack(blob):
+    row = dict(zip(NAMES, RECORD.unpack(blob)))
+    row['opponent'] = row['opponent'].rstrip(b'\0').decode()
+    return row
+
+def _count(path):
+    """Complete rows on disk; a torn trailing write (crash mid-append) is not counted."""
+    return max(0, (os.path.getsize(path) - len(MAGIC)) // RECORD.size)
+
+def _check(path):
+    """Refuses anything that isn't a metrics log (a CSV would be truncated or misread)."""
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC: raise ValueError(f"{path} is not a metrics log")
+
+def _create(path, rows=()):
+    tmp = path + ".tmp"
+    with open(tmp, 'wb') as f:
+        f.write(MAGIC)
+        for row in rows: f.write(_pack(row))
+    os.replace(tmp, path)
+
+def append_metrics(path, **row):
+    """Appends one row. A missing log is first seeded from the CSV it replaces, if there is one."""
+    if not os.path.exists(path):
+        legacy = _legacy(path)
+        _create(path, read_csv_rows(legacy) if os.path.exists(legacy) else ())
+    _check(path)
+    end = len(MAGIC) + _count(path) * RECORD.size
+    if os.path.getsize(path) != end: os.truncate(path, end) # Drop a torn tail before appending
+    row.setdefault('time', time.time())
+    with open(path, 'ab') as f:
+        f.write(_pack(row))
+
+def read_last(path, n=1):
+    """
+    The last n rows (oldest first) with one seek, whatever the file size. Before the
+    first append, the rows of the CSV that will seed the log; [] if there is neither.
+    """
+    if not os.path.exists(path):
+        legacy = _legacy(path)
+        rows = read_csv_rows(legacy) if os.path.exists(legacy) else []
+        return [_unpack(_pack(row)) for row in rows[len(rows) - min(n, len(rows)):]] # Typed as if read from the log
+    _check(path)
+    count = _count(path)
+    n = min(n, count)
+    with open(path, 'rb') as f:
+        f.seek(len(MAGIC) + (count - n) * RECORD.size)
+        data = f.read(n * RECORD.size)
+    return [_unpack(data[i * RECORD.size:(i + 1) * RECORD.size]) for i in range(n)]
+
+def read_metrics(path):
+    """Whole log as a numpy structured array (one read, no parsing)."""
+    _check(path)
+    return np.fromfile(path, dtype=DTYPE, count=_count(path), offset=len(MAGIC))
+
+def read_frame(path, names=None):
+    """
+    pandas DataFrame with numeric win rates and the old CSV column names (Battles,
+    RollingWin, ...); names overrides some, e.g. {'battles': 'Episode'}. Columns this
+    agent never logged are dropped, as they would be absent from its CSV.
+    """
+    import pandas as pd
+    data = pd.DataFrame(read_metrics(path))
+    data['opponent'] = data['opponent'].str.decode('utf-8')
+    data['table_size'] = data['table_size'].where(data['table_size'] >= 0)
+    data = data.dropna(axis=1, how='all')
+    return data.rename(columns={**FRAME_COLUMNS, **(names or {})})
+
+
+# --- CSV CONVERSION ---
+def _number(text):
+    text = text.strip()
+    if text.endswith('%'): return float(text[:-1]) / 100.0
+    return float(text)
+
+def read_csv_rows(csv_path):
+    rows = []
+    with open(csv_path, newline='') as f:
+        for record in csv.DictReader(f):
+            row = {}
+            try:
+                for column, text in record.items():
+                    name = CSV_COLUMNS.get(column)
+                    if name is None or text is None or text == '': continue
+                    row[name] = text if name == 'opponent' else _number(text)
+            except ValueError:
+                continue # Half-written line from a killed worker
+            if 'battles' in row: rows.append(row)
+    return rows
+
+def convert_csv(csv_path, force=False):
+    out = metrics_path(csv_path)
+    if os.path.exists(out) and not force:
+        print(f"⚠️ {out} exists (use --force to rebuild it from the CSV)")
+        return None
+    rows = read_csv_rows(csv_path)
+    _create(out, rows)
+    print(f"💾 {csv_path} -> {out} ({len(rows)} rows, {os.path.getsize(out) / 1024:.1f} KiB)")
+    return out
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Typed, append-only training metrics logs.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    convert = sub.add_parser("convert", help="Convert v*_logs CSVs to .metrics files next to them")
+    convert.add_argument("csv", nargs="+")
+    convert.add_argument("--force", action="store_true")
+    tail = sub.add_parser("tail", help="Print the last rows of a .metrics file")
+    tail.add_argument("path")
+    tail.add_argument("-n", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        for path in args.csv: convert_csv(path, args.force)
+    else:
+        for row in read_last(args.path, args.n): print(row)
@@ -5,13 +5,16 @@ import glob
 import sys
 import argparse
 from datetime import datetime
+from metrics_log import METRICS_EXT, read_frame
 
 # --- CONFIGURATION ---
 LOG_DIR = "v4_logs"
 PLOT_DIR = "v4_plots"
 
 def get_log_file(opponent):
-    """Determines the log file name based on the opponent argument."""
+    """Determines the log file name based on the opponent argument (CSV if not yet converted)."""
+    log_file = os.path.join(LOG_DIR, f"dqn_log_{opponent}{METRICS_EXT}")
+    if os.path.exists(log_file): return log_file
     return os.path.join(LOG_DIR, f"dqn_log_{opponent}.csv")
 
 def plot_training(opponent):
@@ -24,7 +27,7 @@ def plot_training(opponent):
     print(f"Plotting DQN data from: {log_file}")
     
     try:
-        data = pd.read_csv(log_file)
+        data = read_frame(log_file, {'battles': 'Episode'}) if log_file.endswith(METRICS_EXT) else pd.read_csv(log_file)
     except Exception as e:
         print(f"Error reading log file: {e}")
         return
@@ -1,13 +1,13 @@
 import subprocess
 import sys
 import time
-import os
-import csv
+from metrics_log import METRICS_EXT, read_last
+from worker_state import linear_epsilon
 
 # --- CONFIG ---
 TOTAL_EPISODES = 1000000
-BATCH_SIZE = 10000 # Restart Python every 1000 battles to clear memory
 LOG_INTERVAL = 1000
+RESTART_DELAY = 5 # Seconds before relaunching a worker that failed
 
 # Epsilon Schedule
 DECAY_STEPS = 100000
@@ -18,67 +18,58 @@ def get_last_stats(log_file):
     current_ep = 0
     historic_wins = 0
     
-    if not os.path.exists(log_file): return 0, 0
     try:
-        with open(log_file, 'r') as f:
-            reader = csv.reader(f)
-            data = list(reader)
-            if len(data) > 1:
-                last_row = data[-1]
-                # Format: Episode, RollingWin, OverallWin, Epsilon, Speed, Opponent
-                if len(last_row) >= 3:
-                    current_ep = int(last_row[0])
-                    overall_wr = float(last_row[2])
-                    historic_wins = int(current_ep * overall_wr)
+        last = read_last(log_file) # One seek, however long the log
+        if last:
+            current_ep = last[0]['battles']
+            historic_wins = int(current_ep * last[0]['overall_win'])
     except: pass 
     return current_ep, historic_wins
 
 def get_epsilon(current_ep):
-    if current_ep >= DECAY_STEPS: return EPS_END
-    prog = current_ep / DECAY_STEPS
-    return max(EPS_END, EPS_START - (prog * (EPS_START - EPS_END)))
+    return linear_epsilon(current_ep, EPS_START, EPS_END, DECAY_STEPS)
 
 def main():
     # Default to heuristic, or take from command line
     opponent = "heuristic"
-    if len(sys.argv) > 1:
+    if len(sys.argv) > 1 and not sys.argv[1].startswith("--"):
         opponent = sys.argv[1]
+    prioritized = "--prioritized" in sys.argv
 
-    log_file = f"v4_logs/dqn_log_{opponent}.csv"
+    log_file = f"v4_logs/dqn_log_{opponent}{METRICS_EXT}"
     
     print(f"🚀 STARTING DQN TRAINING vs {opponent.upper()}")
-    print(f"   Device: Auto-detecting (likely MPS/CPU)")
+    print("   Device: Auto-detecting (likely MPS/CPU)")
     print(f"   Goal: {TOTAL_EPISODES} episodes")
     
+    # One long-lived worker (model, replay memory and login survive across batches); it
+    # resumes its counters and epsilon from the state saved with its checkpoint, so the
+    # metrics log is only a first-run fallback
     while True:
         current_ep, historic_wins = get_last_stats(log_file)
         
-        if current_ep >= TOTAL_EPISODES:
-            print("🎉 Target Reached.")
-            break
-            
-        eps = get_epsilon(current_ep)
-        
-        print(f"\n--- Launching Worker (Start: {current_ep}, Eps: {eps:.4f}) ---")
+        print("\n--- Launching Persistent Worker ---")
         
         cmd = [
-            sys.executable, "train_dqn.py",
+            sys.executable, "train_dqn.py", "--persistent",
             "--start_ep", str(current_ep),
-            "--batch_size", str(BATCH_SIZE),
             "--historic_wins", str(historic_wins),
-            "--epsilon", str(eps),
+            "--target_battles", str(TOTAL_EPISODES),
+            "--epsilon", str(EPS_START),
+            "--eps_end", str(EPS_END),
+            "--decay_battles", str(DECAY_STEPS),
             "--opponent", opponent
         ]
+        if prioritized: cmd.append("--prioritized")
         
         # Run worker and wait for it to finish/die
         p = subprocess.run(cmd)
         
-        if p.returncode != 0:
-            print("⚠️ Worker crashed. Restarting in 5s...")
-            time.sleep(5)
-        else:
-            # Brief pause to ensure file handles close
-            time.sleep(1) 
+        if p.returncode == 0:
+            print("🎉 Target Reached.")
+            break
+        print(f"⚠️ Worker crashed (exit {p.returncode}). Restarting from its last checkpoint in {RESTART_DELAY}s...")
+        time.sleep(RESTART_DELAY)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
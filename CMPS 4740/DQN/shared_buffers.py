@@ -0,0 +1,115 @@
+import numpy as np
+from multiprocessing import shared_memory
+
+# --- CONFIG ---
+HEADER_SLOTS = 4 # int64 header: [write count, read count, dropped, version]
+WRITE, READ, DROPPED, VERSION = range(HEADER_SLOTS)
+
+class _SharedBlock:
+    """One shared_memory segment: an int64 header followed by float32 payload arrays."""
+    def __init__(self, n_floats, name=None):
+        nbytes = HEADER_SLOTS * 8 + n_floats * 4
+        self.owner = name is None
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner, size=nbytes)
+        self.header = np.ndarray((HEADER_SLOTS,), dtype=np.int64, buffer=self.shm.buf)
+        self.payload = np.ndarray((n_floats,), dtype=np.float32, buffer=self.shm.buf, offset=HEADER_SLOTS * 8)
+        if self.owner: self.header[:] = 0
+
+    def close(self):
+        del self.header, self.payload # Views must go before the buffer can be released
+        self.shm.close()
+        if self.owner: self.shm.unlink()
+
+
+class TransitionRing(_SharedBlock):
+    """
+    Single-producer / single-consumer ring of (phi, reward, next_phi, done) in shared memory.
+
+    The actor writes rows then publishes the new write count under the lock; the learner
+    reads the count under the same lock, copies the rows out and advances the read count.
+    A full ring drops the transition (counted in the header) instead of blocking the battle.
+    Duck-types ReplayBuffer.push so it can be dropped in as DQNPlayer.memory.
+    """
+    def __init__(self, capacity, state_dim, lock, name=None):
+        super().__init__(capacity * (2 * state_dim + 2), name)
+        self.capacity = capacity
+        self.state_dim = state_dim
+        self.lock = lock
+        rows = capacity * state_dim
+        self.states = self.payload[:rows].reshape(capacity, state_dim)
+        self.next_states = self.payload[rows:2 * rows].reshape(capacity, state_dim)
+        self.rewards = self.payload[2 * rows:2 * rows + capacity]
+        self.dones = self.payload[2 * rows + capacity:]
+
+    def spec(self):
+        """Picklable arguments to re-attach in another process (plus the lock)."""
+        return (self.capacity, self.state_dim, self.shm.name)
+
+    def close(self):
+        del self.states, self.next_states, self.rewards, self.dones
+        super().close()
+
+    # --- PRODUCER (actor) ---
+    def push(self, state, action, reward, next_state, done):
+        w = int(self.header[WRITE])
+        if w - int(self.header[READ]) >= self.capacity:
+            self.header[DROPPED] += 1
+            return
+        i = w % self.capacity
+        self.states[i] = state
+        self.next_states[i] = next_state
+        self.rewards[i] = reward
+        self.dones[i] = done
+        with self.lock: self.header[WRITE] = w + 1
+
+    # --- CONSUMER (learner) ---
+    def drain_into(self, buffer):
+        """Moves every published transition into buffer (a ReplayBuffer). Returns the count."""
+        with self.lock: w = int(self.header[WRITE])
+        r = int(self.header[READ])
+        n = w - r
+        if n <= 0: return 0
+        start = r % self.capacity
+        first = min(n, self.capacity - start) # Up to two contiguous segments when the ring wraps
+        for lo, hi in ((start, start + first), (0, n - first)):
+            if hi > lo:
+                buffer.push_batch(self.states[lo:hi], self.rewards[lo:hi], self.next_states[lo:hi], self.dones[lo:hi])
+        with self.lock: self.header[READ] = w
+        return n
+
+    @property
+    def dropped(self):
+        return int(self.header[DROPPED])
+
+
+class SharedWeights(_SharedBlock):
+    """Flat float32 parameter vector published by the learner and polled by the actors."""
+    def __init__(self, n_params, lock, name=None):
+        super().__init__(n_params, name)
+        self.n_params = n_params
+        self.lock = lock
+        self.local_version = 0
+
+    def spec(self):
+        return (self.n_params, self.shm.name)
+
+    @property
+    def version(self):
+        return int(self.header[VERSION])
+
+    def publish(self, model):
+        import torch
+        vector = torch.nn.utils.parameters_to_vector(model.parameters()).detach().cpu().numpy()
+        with self.lock:
+            self.payload[:] = vector
+            self.header[VERSION] += 1
+
+    def load_into(self, model):
+        """Copies the latest weights into model if they changed. Returns True when it did."""
+        import torch
+        if self.version == self.local_version: return False
+        with self.lock:
+            vector = self.payload.copy()
+            self.local_version = int(self.header[VERSION])
+        torch.nn.utils.vector_to_parameters(torch.from_numpy(vector), model.parameters())
+        return True
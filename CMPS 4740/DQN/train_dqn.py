@@ -1,6 +1,5 @@
 import asyncio
 import os
-import csv
 import time
 import logging
 import uuid
@@ -10,6 +9,9 @@ from collections import deque
 from poke_env.player import SimpleHeuristicsPlayer, RandomPlayer, MaxBasePowerPlayer
 from poke_env.ps_client.server_configuration import LocalhostServerConfiguration
 from dqn_player import DQNPlayer
+from battle_log import BattleLogWriter
+from metrics_log import METRICS_EXT, append_metrics
+from worker_state import state_path, load_state, save_state, linear_epsilon, release_finished, memory_gauges, format_gauges, log_gauges
 
 # Config
 BATCH_SIZE = 10000 # Train network after every 1000 battles (or less)
@@ -24,12 +26,8 @@ os.makedirs("v4_logs", exist_ok=True)
 os.makedirs("v4_models", exist_ok=True)
 
 def log_stats(filename, episode, rolling_win, overall_win, epsilon, speed, opponent):
-    file_exists = os.path.isfile(filename)
-    with open(filename, mode='a', newline='') as f:
-        writer = csv.writer(f)
-        if not file_exists:
-            writer.writerow(['Episode', 'RollingWin', 'OverallWin', 'Epsilon', 'Speed', 'Opponent'])
-        writer.writerow([episode, rolling_win, overall_win, epsilon, speed, opponent])
+    append_metrics(filename, battles=episode, rolling_win=rolling_win, overall_win=overall_win,
+                   epsilon=epsilon, speed=speed, opponent=opponent)
 
 def get_unique_player_class(base_class, prefix, run_uuid):
     unique_name = f"{prefix}_{run_uuid}"
@@ -43,93 +41,134 @@ async def main(args):
     else: BaseOpponent = SimpleHeuristicsPlayer
 
     OpponentClass = get_unique_player_class(BaseOpponent, "Opp", run_uuid)
-    opponent = OpponentClass(battle_format="gen1randombattle", server_configuration=LocalhostServerConfiguration, max_concurrent_battles=1)
+    opponent = OpponentClass(battle_format="gen1randombattle", server_configuration=LocalhostServerConfiguration, max_concurrent_battles=args.concurrent)
     opponent.logger.setLevel(logging.ERROR)
 
     MODEL_FILE = f"v4_models/dqn_{args.opponent}.pth"
-    LOG_FILE = f"v4_logs/dqn_log_{args.opponent}.csv"
+    LOG_FILE = f"v4_logs/dqn_log_{args.opponent}{METRICS_EXT}"
+    extractor = None
+    if args.hash_bits:
+        from features_hashed import HashedFeatureExtractor
+        extractor = HashedFeatureExtractor(args.hash_bits)
+        MODEL_FILE = f"v4_models/dqn_{args.opponent}_hashed{args.hash_bits}.pth"
+        LOG_FILE = f"v4_logs/dqn_log_{args.opponent}_hashed{args.hash_bits}{METRICS_EXT}"
 
     LearnerClass = get_unique_player_class(DQNPlayer, "DQN", run_uuid)
     learner = LearnerClass(
         battle_format="gen1randombattle",
         server_configuration=LocalhostServerConfiguration,
         epsilon=args.epsilon,
-        max_concurrent_battles=1
+        prioritized=args.prioritized,
+        batch_inference_ms=args.batch_ms,
+        extractor=extractor,
+        max_concurrent_battles=args.concurrent
     )
     learner.logger.setLevel(logging.ERROR)
+    if args.record: learner.record_to(BattleLogWriter(args.record)) # Raw protocol for train_offline_dqn.py
     
     if os.path.exists(MODEL_FILE):
         learner.load_checkpoint(MODEL_FILE)
 
-    print(f"--- DQN TRAINING START: {args.start_ep} | Eps: {args.epsilon:.4f} ---")
+    STATE_FILE = state_path(MODEL_FILE)
+    if args.persistent:
+        # Counters saved with the checkpoint we just loaded win over the supervisor's CSV guess
+        state = load_state(STATE_FILE)
+        if state is not None:
+            args.start_ep, args.historic_wins = state['battles'], state['wins']
+        args.batch_size = max(0, args.target_battles - args.start_ep)
+
+    def save_checkpoint():
+        learner.save_checkpoint(MODEL_FILE)
+        save_state(STATE_FILE, battles=args.start_ep + battles_done,
+                   wins=args.historic_wins + session_wins, epsilon=learner.epsilon)
+
+    replay = "PER" if args.prioritized else "Uniform"
+    print(f"--- DQN TRAINING START: {args.start_ep} | Eps: {args.epsilon:.4f} | Replay: {replay} ---")
     
     # Track wins within THIS worker session
     session_wins = 0          # total wins in this batch
     prev_wins = 0             # wins at last LOG_INTERVAL snapshot
+    prev_battles = 0          # battles at last LOG_INTERVAL snapshot
 
-    # Baseline for poke-env's cumulative win counter
-    initial_learner_wins = learner.n_won_battles
-    last_total_wins = initial_learner_wins
-    
     battles_done = 0
     start_time = time.time()
     
     # Training Loop
     while battles_done < args.batch_size:
         try:
-            await asyncio.wait_for(learner.battle_against(opponent, n_battles=1), timeout=BATTLE_TIMEOUT)
+            n = min(args.concurrent, args.batch_size - battles_done) # Battles played side by side this round
+            if args.decay_battles:
+                learner.epsilon = linear_epsilon(args.start_ep + battles_done, args.epsilon, args.eps_end, args.decay_battles)
+            wins_before = learner.n_won_battles
+            await asyncio.wait_for(learner.battle_against(opponent, n_battles=n), timeout=BATTLE_TIMEOUT * n)
             
-            # Detect win using the monotone n_won_battles counter
-            current_total_wins = learner.n_won_battles
-            if current_total_wins > last_total_wins:
-                won = 1
-            else:
-                won = 0
-            last_total_wins = current_total_wins
+            won = learner.n_won_battles - wins_before
+            # poke_env would otherwise hold every finished battle (and its lock) forever
+            release_finished(learner)
+            release_finished(opponent)
 
             session_wins += won
-            battles_done += 1
+            battles_done += n
             current_total = args.start_ep + battles_done
 
             # Train the network
             # We do a few optimization steps per battle to learn faster
-            for _ in range(5):
+            for _ in range(5 * n):
                 learner.optimize_model()
 
             # Update Target Network
-            if current_total % TARGET_UPDATE_FREQ == 0:
+            if current_total // TARGET_UPDATE_FREQ != (current_total - n) // TARGET_UPDATE_FREQ:
                 learner.update_target_net()
 
             # Log
-            if current_total % LOG_INTERVAL == 0:
+            if current_total // LOG_INTERVAL != (current_total - n) // LOG_INTERVAL:
                 elapsed = time.time() - start_time
                 speed = battles_done / elapsed if elapsed > 0 else 0.0
 
-                # Rolling win rate over the last LOG_INTERVAL battles
+                # Rolling win rate over the battles finished since the last log (rounds of
+                # --concurrent battles rarely land exactly on LOG_INTERVAL)
                 wins_this_interval = session_wins - prev_wins
-                rolling_win = wins_this_interval / LOG_INTERVAL if LOG_INTERVAL > 0 else 0.0
+                battles_this_interval = battles_done - prev_battles
+                rolling_win = wins_this_interval / battles_this_interval if battles_this_interval > 0 else 0.0
                 prev_wins = session_wins
+                prev_battles = battles_done
 
                 # Overall win rate across ALL battles so far
                 overall_wins = args.historic_wins + session_wins
                 overall_win = overall_wins / current_total if current_total > 0 else 0.0
                 
-                print(f"Ep {current_total}: RollWin {rolling_win:.2%} | Overall {overall_win:.2%} | Eps {args.epsilon:.3f} | Speed {speed:.1f}")
-                log_stats(LOG_FILE, current_total, rolling_win, overall_win, args.epsilon, speed, args.opponent)
+                print(f"Ep {current_total}: RollWin {rolling_win:.2%} | Overall {overall_win:.2%} | Eps {learner.epsilon:.3f} | Speed {speed:.1f}")
+                if learner.batcher is not None:
+                    print(f"   Inference: {learner.batcher.summary()}")
+                    learner.batcher.reset_stats()
+                log_stats(LOG_FILE, current_total, rolling_win, overall_win, learner.epsilon, speed, args.opponent)
+                gauges = memory_gauges(learner, opponent, last_features=len(learner._last_features), replay=len(learner.memory))
+                print(f"   Memory: {format_gauges(gauges)}")
+                log_gauges(os.path.splitext(LOG_FILE)[0].replace("dqn_log_", "dqn_memory_") + ".csv", current_total, gauges)
                 
-                learner.save_checkpoint(MODEL_FILE)
+                save_checkpoint()
 
         except asyncio.TimeoutError: pass
         except Exception: pass
             
-    learner.save_checkpoint(MODEL_FILE)
+    save_checkpoint()
+    if learner.recorder is not None: learner.recorder.close()
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--start_ep", type=int, default=0)
     parser.add_argument("--batch_size", type=int, default=100000)
     parser.add_argument("--historic_wins", type=int, default=0) 
-    parser.add_argument("--epsilon", type=float, default=1.0)
+    parser.add_argument("--epsilon", type=float, default=1.0, help="Fixed epsilon, or the schedule's start with --decay_battles")
+    parser.add_argument("--eps_end", type=float, default=0.01)
+    parser.add_argument("--decay_battles", type=int, default=0, help="Decay epsilon linearly to --eps_end over this many total battles")
+    parser.add_argument("--persistent", action="store_true", help="Run to --target_battles in this process, resuming from the saved worker state")
+    parser.add_argument("--target_battles", type=int, default=0)
     parser.add_argument("--opponent", type=str, default="heuristic")
+    parser.add_argument("--prioritized", action="store_true", help="Sum-tree prioritized replay instead of uniform")
+    parser.add_argument("--concurrent", type=int, default=1, help="Battles played at once")
+    parser.add_argument("--batch_ms", type=float, default=None, help="Micro-batch Q inference across concurrent battles, waiting up to this many ms")
+    parser.add_argument("--hash_bits", type=int, default=None, help="Hashed features with a 2^k input (e.g. 12) instead of features_v4")
+    parser.add_argument("--record", type=str, default=None, help="Log every battle to this battle_log directory")
     args = parser.parse_args()
     asyncio.run(main(args))
\ No newline at end of file
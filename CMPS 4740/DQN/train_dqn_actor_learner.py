@@ -0,0 +1,194 @@
+import asyncio
+import os
+import csv
+import time
+import uuid
+import logging
+import argparse
+import multiprocessing as mp
+
+# --- CONFIG ---
+RING_CAPACITY = 20000 # Transitions buffered per actor between learner drains
+ACTOR_SYNC_BATTLES = 5 # Actors pull fresh weights (and epsilon) this often
+PUBLISH_EVERY_UPDATES = 50
+TARGET_UPDATE_UPDATES = 500 # train_dqn.py: 5 updates/battle * 100 battles
+SAVE_SECONDS = 300
+REPORT_SECONDS = 30
+BATTLE_TIMEOUT = 10
+
+# terminal the following first:
+# node pokemon-showdown start --no-security
+
+def log_actor_learner(filename, battles, actor_speed, learner_speed, buffer_size, dropped, epsilon, opponent):
+    file_exists = os.path.isfile(filename)
+    with open(filename, mode='a', newline='') as f:
+        writer = csv.writer(f)
+        if not file_exists:
+            writer.writerow(['Battles', 'ActorBattlesPerSec', 'LearnerUpdatesPerSec', 'BufferSize', 'Dropped', 'Epsilon', 'Opponent'])
+        writer.writerow([battles, f"{actor_speed:.2f}", f"{learner_speed:.2f}", buffer_size, dropped, f"{epsilon:.4f}", opponent])
+
+# --- ACTOR ---
+async def actor_loop(actor_id, opponent_name, ring_spec, weights_spec, locks, counters, stop, start_ep):
+    import torch
+    from poke_env.player import SimpleHeuristicsPlayer, RandomPlayer, MaxBasePowerPlayer
+    from poke_env.ps_client.server_configuration import LocalhostServerConfiguration
+    from dqn_player import DQNPlayer
+    from shared_buffers import TransitionRing, SharedWeights
+    from train_dqn import get_unique_player_class
+    from run_loop import get_epsilon
+    from worker_state import release_finished
+
+    torch.set_num_threads(1) # Several actors share the cores; inference is tiny
+    logging.getLogger("poke_env").setLevel(logging.ERROR)
+    run_uuid = f"a{actor_id}{uuid.uuid4().hex[:6]}"
+
+    if opponent_name == "random": BaseOpponent = RandomPlayer
+    elif opponent_name == "maxbp": BaseOpponent = MaxBasePowerPlayer
+    else: BaseOpponent = SimpleHeuristicsPlayer
+
+    opponent = get_unique_player_class(BaseOpponent, "Opp", run_uuid)(
+        battle_format="gen1randombattle", server_configuration=LocalhostServerConfiguration, max_concurrent_battles=1)
+    actor = get_unique_player_class(DQNPlayer, "Act", run_uuid)(
+        battle_format="gen1randombattle", server_configuration=LocalhostServerConfiguration, max_concurrent_battles=1,
+        epsilon=get_epsilon(start_ep), device="cpu")
+    actor.memory = TransitionRing(*ring_spec[:2], locks['ring'], name=ring_spec[2]) # Transitions go to the learner
+    weights = SharedWeights(*weights_spec[:1], locks['weights'], name=weights_spec[1])
+
+    while weights.version == 0 and not stop.is_set(): # Learner publishes once its checkpoint is loaded
+        await asyncio.sleep(0.5)
+    weights.load_into(actor.model)
+
+    battles = 0
+    while not stop.is_set():
+        try:
+            await asyncio.wait_for(actor.battle_against(opponent, n_battles=1), timeout=BATTLE_TIMEOUT)
+        except asyncio.TimeoutError:
+            continue
+        # Running counts from the battles just finished; n_won_battles would rescan every
+        # battle ever played, and poke_env would hold them all
+        finished, won = release_finished(actor)
+        release_finished(opponent)
+        battles += 1
+        with counters['battles'].get_lock(): counters['battles'].value += finished
+        with counters['wins'].get_lock(): counters['wins'].value += won
+
+        if battles % ACTOR_SYNC_BATTLES == 0:
+            weights.load_into(actor.model)
+            actor.epsilon = get_epsilon(start_ep + counters['battles'].value)
+
+def actor_main(*args):
+    try:
+        asyncio.run(actor_loop(*args))
+    except KeyboardInterrupt:
+        pass
+
+# --- LEARNER ---
+def learner_main(ring_specs, weights_spec, locks, counters, stop, model_file, prioritized):
+    from dqn_player import DQNPlayer
+    from shared_buffers import TransitionRing, SharedWeights
+
+    # Never connects: only the model / buffer / optimize_model machinery is used
+    learner = DQNPlayer(battle_format="gen1randombattle", prioritized=prioritized, start_listening=False)
+    if os.path.exists(model_file):
+        learner.load_checkpoint(model_file)
+    rings = [TransitionRing(*spec[:2], lock, name=spec[2]) for spec, lock in zip(ring_specs, locks['rings'])]
+    weights = SharedWeights(*weights_spec[:1], locks['weights'], name=weights_spec[1])
+    weights.publish(learner.model)
+
+    updates, last_save = 0, time.time()
+    try:
+        while not stop.is_set():
+            for ring in rings: ring.drain_into(learner.memory)
+            counters['buffer'].value = len(learner.memory)
+            if len(learner.memory) < learner.batch_size:
+                time.sleep(0.05)
+                continue
+
+            learner.optimize_model()
+            updates += 1
+            counters['updates'].value = updates
+            if updates % TARGET_UPDATE_UPDATES == 0: learner.update_target_net()
+            if updates % PUBLISH_EVERY_UPDATES == 0: weights.publish(learner.model)
+            if time.time() - last_save > SAVE_SECONDS:
+                learner.save_checkpoint(model_file)
+                last_save = time.time()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        learner.save_checkpoint(model_file)
+
+# --- DRIVER ---
+def main(args):
+    from dqn_model import DQN
+    from features_v4 import FeatureExtractor
+    from shared_buffers import TransitionRing, SharedWeights
+    from run_loop import get_last_stats, get_epsilon
+    from train_dqn import log_stats
+    from metrics_log import METRICS_EXT
+
+    model_file = f"v4_models/dqn_{args.opponent}.pth"
+    log_file = f"v4_logs/dqn_log_{args.opponent}{METRICS_EXT}"
+    al_log = f"v4_logs/dqn_actor_learner_{args.opponent}.csv"
+
+    start_ep, historic_wins = get_last_stats(log_file)
+    state_dim = FeatureExtractor().total_dim
+    n_params = sum(p.numel() for p in DQN(state_dim).parameters())
+
+    ctx = mp.get_context("spawn")
+    ring_locks = [ctx.Lock() for _ in range(args.actors)]
+    rings = [TransitionRing(RING_CAPACITY, state_dim, lock) for lock in ring_locks]
+    weights = SharedWeights(n_params, ctx.Lock())
+    counters = {name: ctx.Value('q', 0) for name in ('battles', 'wins', 'updates', 'buffer')}
+    stop = ctx.Event()
+
+    replay = "PER" if args.prioritized else "Uniform"
+    print(f"🚀 DQN ACTOR/LEARNER x{args.actors} vs {args.opponent.upper()} (Bat {start_ep}, Eps {get_epsilon(start_ep):.3f}, Replay {replay})")
+
+    learner = ctx.Process(target=learner_main, args=([r.spec() for r in rings], weights.spec(),
+                          {'rings': ring_locks, 'weights': weights.lock}, counters, stop, model_file, args.prioritized))
+    learner.start()
+    actors = []
+    for i, (ring, lock) in enumerate(zip(rings, ring_locks)):
+        p = ctx.Process(target=actor_main, args=(i, args.opponent, ring.spec(), weights.spec(),
+                        {'ring': lock, 'weights': weights.lock}, counters, stop, start_ep), daemon=True)
+        p.start()
+        actors.append(p)
+
+    start_time = last_time = time.time()
+    last_battles = last_wins = last_updates = 0
+    try:
+        while counters['battles'].value < args.battles:
+            time.sleep(REPORT_SECONDS)
+            now = time.time()
+            battles, wins, updates = counters['battles'].value, counters['wins'].value, counters['updates'].value
+            actor_speed = (battles - last_battles) / (now - last_time)
+            learner_speed = (updates - last_updates) / (now - last_time)
+            interval = battles - last_battles
+            rolling_win = (wins - last_wins) / interval if interval else 0.0
+            total = start_ep + battles
+            overall_win = (historic_wins + wins) / total if total else 0.0
+            eps = get_epsilon(total)
+            dropped = sum(r.dropped for r in rings)
+
+            print(f"Ep {total}: RollWin {rolling_win:.2%} | Overall {overall_win:.2%} | Eps {eps:.3f} | Actors {actor_speed:.1f} bat/s | Learner {learner_speed:.1f} upd/s | Buffer {counters['buffer'].value} | Dropped {dropped}")
+            log_actor_learner(al_log, total, actor_speed, learner_speed, counters['buffer'].value, dropped, eps, args.opponent)
+            # Keep the regular log going so run_loop.py / plot_v4.py can resume from it
+            if interval: log_stats(log_file, total, rolling_win, overall_win, eps, battles / (now - start_time), args.opponent)
+            last_time, last_battles, last_wins, last_updates = now, battles, wins, updates
+    except KeyboardInterrupt:
+        print("\n🛑 Stopping actors and learner...")
+    finally:
+        stop.set()
+        for p in actors: p.join(timeout=BATTLE_TIMEOUT)
+        learner.join(timeout=60) # Saves the final checkpoint on the way out
+        for r in rings: r.close()
+        weights.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("opponent", nargs="?", type=str, default="heuristic")
+    parser.add_argument("--actors", type=int, default=max(1, (os.cpu_count() or 2) - 1))
+    parser.add_argument("--battles", type=int, default=1000000)
+    parser.add_argument("--prioritized", action="store_true", help="Sum-tree prioritized replay in the learner")
+    args = parser.parse_args()
+    main(args)
@@ -0,0 +1,63 @@
+import os
+import time
+import argparse
+from dqn_player import DQNPlayer
+from battle_log import read_index, iter_battles, replay_battles
+from train_dqn import TARGET_UPDATE_FREQ, LOG_INTERVAL
+
+# --- CONFIG ---
+LOG_DIR = "battle_logs"
+OPTIMIZE_STEPS = 5 # Per replayed battle, as in train_dqn.py
+
+def main(args):
+    MODEL_FILE = f"v4_models/dqn_{args.opponent}.pth"
+    extractor = None
+    if args.hash_bits:
+        from features_hashed import HashedFeatureExtractor
+        extractor = HashedFeatureExtractor(args.hash_bits)
+        MODEL_FILE = f"v4_models/dqn_{args.opponent}_hashed{args.hash_bits}.pth"
+    os.makedirs("v4_models", exist_ok=True)
+
+    # Pinned to the logged actions, so epsilon only matters on a replay miss (then greedy)
+    learner = DQNPlayer(battle_format="gen1randombattle", start_listening=False, epsilon=0.0,
+                        prioritized=args.prioritized, device=args.device, extractor=extractor)
+    if os.path.exists(MODEL_FILE):
+        learner.load_checkpoint(MODEL_FILE)
+
+    n_logged = len(read_index(args.logs))
+    if args.limit is not None: n_logged = min(n_logged, args.limit)
+    print(f"--- DQN OFFLINE REPLAY: {n_logged} battles x {args.epochs} epoch(s) from {args.logs} -> {MODEL_FILE} ---")
+
+    done = [0]
+    start_time = time.time()
+    def after_battle(player, battle):
+        for _ in range(OPTIMIZE_STEPS):
+            player.optimize_model()
+        done[0] += 1
+        if done[0] % TARGET_UPDATE_FREQ == 0: player.update_target_net()
+        if done[0] % LOG_INTERVAL == 0:
+            speed = done[0] / (time.time() - start_time)
+            print(f"Ep {done[0]}: Misses {player.replay_misses} | Speed {speed:.1f}")
+            player.save_checkpoint(MODEL_FILE)
+
+    for epoch in range(args.epochs):
+        epoch_start = time.time()
+        stats = replay_battles(learner, iter_battles(args.logs, args.limit), after_battle)
+        elapsed = time.time() - epoch_start
+        win_rate = stats['wins'] / stats['battles'] if stats['battles'] else 0.0
+        print(f"✅ Epoch {epoch + 1}: {stats['battles']} battles, {stats['decisions']} decisions in {elapsed:.1f}s "
+              f"({stats['battles'] / max(elapsed, 1e-9):.1f} bat/s) | Logged win rate {win_rate:.2%} | Misses {learner.replay_misses}")
+
+    learner.save_checkpoint(MODEL_FILE)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the DQN from battle logs (train_dqn.py --record) without a server.")
+    parser.add_argument("--logs", type=str, default=LOG_DIR)
+    parser.add_argument("--opponent", type=str, default="heuristic", help="Which dqn_<opponent> checkpoint to update")
+    parser.add_argument("--epochs", type=int, default=1)
+    parser.add_argument("--limit", type=int, default=None, help="Replay only the first N logged battles")
+    parser.add_argument("--prioritized", action="store_true")
+    parser.add_argument("--device", type=str, default=None)
+    parser.add_argument("--hash_bits", type=int, default=None)
+    args = parser.parse_args()
+    main(args)
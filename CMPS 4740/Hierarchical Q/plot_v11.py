@@ -3,6 +3,7 @@ import matplotlib.pyplot as plt
 import os
 import argparse
 from datetime import datetime
+from metrics_log import METRICS_EXT, read_frame
 
 # --- CONFIGURATION ---
 LOG_DIR = "v11_logs"
@@ -16,7 +17,9 @@ def clean_percentage(val):
     return val
 
 def get_log_file(opponent):
-    """Determines the log file name based on the opponent argument."""
+    """Determines the log file name based on the opponent argument (CSV if not yet converted)."""
+    log_file = os.path.join(LOG_DIR, f"{PLOT_FILE_PREFIX}_{opponent}{METRICS_EXT}")
+    if os.path.exists(log_file): return log_file
     return os.path.join(LOG_DIR, f"{PLOT_FILE_PREFIX}_{opponent}.csv")
 
 def plot_training(opponent):
@@ -29,7 +32,7 @@ def plot_training(opponent):
     print(f"Plotting V11 Tabular data from: {log_file}")
     
     try:
-        data = pd.read_csv(log_file)
+        data = read_frame(log_file) if log_file.endswith(METRICS_EXT) else pd.read_csv(log_file)
     except Exception as e:
         print(f"Error reading log file: {e}")
         return
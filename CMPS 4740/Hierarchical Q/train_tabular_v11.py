@@ -1,6 +1,5 @@
 import asyncio
 import os
-import csv
 import time
 import logging
 import uuid
@@ -10,6 +9,8 @@ import traceback
 from poke_env.ps_client.server_configuration import LocalhostServerConfiguration
 from poke_env.player import SimpleHeuristicsPlayer, RandomPlayer, MaxBasePowerPlayer
 from tabular_player_v11 import TabularQPlayerV11
+from metrics_log import METRICS_EXT, append_metrics
+from worker_state import state_path, load_state, save_state, linear_epsilon, release_finished, memory_gauges, format_gauges, log_gauges
 
 # --- CONFIG ---
 BATTLES_PER_LOG = 1000 
@@ -24,12 +25,8 @@ logging.basicConfig(level=logging.CRITICAL)
 logging.getLogger("poke_env").setLevel(logging.CRITICAL)
 
 def log_stats(filename, battles, rolling_win, overall_win, epsilon, speed, table_size, opponent):
-    file_exists = os.path.isfile(filename)
-    with open(filename, mode='a', newline='') as f:
-        writer = csv.writer(f)
-        if not file_exists:
-            writer.writerow(['Battles', 'RollingWin', 'OverallWin', 'Epsilon', 'Speed', 'TableSize', 'Opponent'])
-        writer.writerow([battles, f"{rolling_win:.2%}", f"{overall_win:.2%}", f"{epsilon:.4f}", speed, table_size, opponent])
+    append_metrics(filename, battles=battles, rolling_win=rolling_win, overall_win=overall_win, epsilon=epsilon,
+                   speed=speed, table_size=table_size, opponent=opponent)
 
 def get_unique_player_class(base_class, prefix, run_uuid):
     return type(f"{prefix}_{run_uuid}", (base_class,), {})
@@ -60,6 +57,20 @@ async def main(args):
     if os.path.exists(MODEL_FILE):
         learner.load_table(MODEL_FILE)
 
+    STATE_FILE = state_path(MODEL_FILE)
+    if args.persistent:
+        # Counters saved with the table we just loaded win over the supervisor's CSV guess
+        state = load_state(STATE_FILE)
+        if state is not None:
+            args.historic_battles, args.historic_wins = state['battles'], state['wins']
+        args.batch_size = max(0, args.target_battles - args.historic_battles)
+        print(f"   [Persistent] Bat {args.historic_battles}, {args.batch_size} to go")
+
+    def save_checkpoint():
+        learner.save_table(MODEL_FILE)
+        save_state(STATE_FILE, battles=args.historic_battles + battles_collected,
+                   wins=args.historic_wins + session_wins, epsilon=learner.epsilon)
+
     learner.logger.setLevel(logging.CRITICAL)
     opponent.logger.setLevel(logging.CRITICAL)
 
@@ -70,20 +81,23 @@ async def main(args):
     total_wins_overall = args.historic_wins
     
     session_wins = 0
-    last_total_wins = learner.n_won_battles
     
     next_log = BATTLES_PER_LOG
 
     while battles_collected < args.batch_size:
         try:
             if battles_collected > 0 and battles_collected % SAVE_FREQ == 0:
-                 learner.save_table(MODEL_FILE)
+                 save_checkpoint()
             
+            if args.decay_battles:
+                learner.epsilon = linear_epsilon(args.historic_battles + battles_collected, args.epsilon, args.eps_end, args.decay_battles)
+            wins_before = learner.n_won_battles
             await asyncio.wait_for(learner.battle_against(opponent, n_battles=1), timeout=BATTLE_TIMEOUT)
             
-            current_p1_wins = learner.n_won_battles
-            won = 1 if current_p1_wins > last_total_wins else 0
-            last_total_wins = current_p1_wins
+            won = 1 if learner.n_won_battles > wins_before else 0
+            # poke_env would otherwise hold every finished battle forever
+            release_finished(learner)
+            release_finished(opponent)
             
             session_wins += won
             battles_collected += 1
@@ -102,22 +116,29 @@ async def main(args):
                 print(f"Bat {total_battles_processed}: Win {rolling_wr:.0%} | Overall {overall_wr:.0%} | Eps {learner.epsilon:.3f} | States {table_size} | Speed {speed:.1f}/s")
                 
                 log_stats(
-                    f"v11_logs/tabular_log_{args.opponent}.csv",
+                    f"v11_logs/tabular_log_{args.opponent}{METRICS_EXT}",
                     total_battles_processed, rolling_wr, overall_wr, learner.epsilon, speed, table_size, args.opponent
                 )
+                gauges = memory_gauges(learner, opponent, states=table_size)
+                print(f"   Memory: {format_gauges(gauges)}")
+                log_gauges(f"v11_logs/tabular_memory_{args.opponent}.csv", total_battles_processed, gauges)
                 next_log += BATTLES_PER_LOG
 
         except Exception as e:
             pass
 
-    learner.save_table(MODEL_FILE)
+    save_checkpoint()
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--historic_battles", type=int, default=0)
     parser.add_argument("--historic_wins", type=int, default=0)
     parser.add_argument("--batch_size", type=int, default=2000)
-    parser.add_argument("--epsilon", type=float, default=1.0)
+    parser.add_argument("--epsilon", type=float, default=1.0, help="Fixed epsilon, or the schedule's start with --decay_battles")
+    parser.add_argument("--eps_end", type=float, default=0.05)
+    parser.add_argument("--decay_battles", type=int, default=0, help="Decay epsilon linearly to --eps_end over this many total battles")
+    parser.add_argument("--persistent", action="store_true", help="Run to --target_battles in this process, resuming from the saved worker state")
+    parser.add_argument("--target_battles", type=int, default=0)
     parser.add_argument("--opponent", type=str, default="random")
     args = parser.parse_args()
     asyncio.run(main(args))
\ No newline at end of file
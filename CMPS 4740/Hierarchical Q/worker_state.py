@@ -0,0 +1,83 @@
+import os
+import sys
+import csv
+import json
+import resource
+
+# --- CONFIG ---
+STATE_EXT = ".state.json"
+
+# Persistent training workers keep one interpreter (table, imports, Showdown login) for
+# the whole run. Their progress (battles, wins) is written next to every checkpoint, so
+# a restart after a real failure resumes the counters and the epsilon schedule from the
+# checkpoint it reloads instead of re-reading the CSV log.
+
+def state_path(model_file):
+    return os.path.splitext(model_file)[0] + STATE_EXT
+
+def load_state(path):
+    if not os.path.exists(path): return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def save_state(path, **state):
+    tmp = path + ".tmp"
+    with open(tmp, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp, path) # Never a half-written state next to a good checkpoint
+
+def linear_epsilon(battles, start, end, decay_battles):
+    if battles >= decay_battles: return end
+    return max(end, start - (battles / decay_battles) * (start - end))
+
+
+# --- LEAK BOUNDING ---
+def release_finished(player):
+    """
+    poke_env keeps every Battle in player._battles for the life of the process. Call after
+    each chunk: returns (finished, won) for battles that finished since the last call, and
+    releases the ones already reported last time. The one-chunk grace lets the server's
+    |deinit| arrive first; a frame for a released tag would block in Player._get_battle
+    forever. Our players learn from and free a battle's per-battle state in their terminal
+    update (_battle_finished_callback); drop_context only frees what a battle that ended
+    without one left behind (one the watchdog abandoned).
+    """
+    drop_context = getattr(player, 'drop_context', None)
+    for tag in getattr(player, '_released_next', ()):
+        if player._battles.pop(tag, None) is None: continue
+        player.ps_client._battle_locks.pop(tag, None)
+        if drop_context is not None: drop_context(tag)
+
+    finished = [battle for battle in player._battles.values() if battle.finished] # All new now
+    player._released_next = [battle.battle_tag for battle in finished]
+    return len(finished), sum(1 for battle in finished if battle.won)
+
+
+# --- GAUGES ---
+def rss_mb():
+    """Current resident set size (peak where /proc is unavailable, e.g. macOS)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10
+
+def memory_gauges(*players, **sizes):
+    """RSS plus the containers that grow with battles played; sizes adds per-model ones."""
+    gauges = {'rss_mb': round(rss_mb(), 1),
+              'battles_held': sum(len(p._battles) for p in players),
+              'battle_locks': sum(len(p.ps_client._battle_locks) for p in players)}
+    gauges.update(sizes)
+    return gauges
+
+def format_gauges(gauges):
+    return " | ".join(f"{name} {value}" for name, value in gauges.items())
+
+def log_gauges(filename, battles, gauges):
+    file_exists = os.path.isfile(filename)
+    with open(filename, mode='a', newline='') as f:
+        writer = csv.writer(f)
+        if not file_exists:
+            writer.writerow(['Battles'] + list(gauges))
+        writer.writerow([battles] + list(gauges.values()))
@@ -0,0 +1,205 @@
+import os
+import csv
+import glob
+import json
+import uuid
+import zlib
+import struct
+import asyncio
+import logging
+
+# --- CONFIG ---
+CHUNK_EXT = ".blog"
+INDEX_EXT = ".index.csv"
+CHUNK_BATTLES = 1000 # Battles per chunk file before rotating to the next one
+COMPRESSION_LEVEL = 6
+RECORD_HEADER = struct.Struct('<II') # payload length, crc32 (same framing as delta_log)
+INDEX_FIELDS = ['chunk', 'offset', 'length', 'tag', 'player', 'role', 'won', 'turns', 'choices']
+
+# Battle logs: every battle a player sees, as the raw websocket frames it received plus
+# the "/choose ..." it answered each request with. A log directory holds any number of
+# writers (one per process), each with its own chunk files and index, so Hogwild workers
+# and actor processes can record side by side without locking:
+#   <writer>_00000.blog    zlib-compressed JSON battles, RECORD_HEADER-framed
+#   <writer>.index.csv     one row per battle: chunk, offset, length, tag, outcome, ...
+# A record uses mock_showdown's stream layout ({'format', 'tag', 'players', <role>:
+# [[frame, choice or None], ...]}), so a log directory also serves as mock server input.
+
+class BattleLogWriter:
+    def __init__(self, directory, chunk_battles=CHUNK_BATTLES, level=COMPRESSION_LEVEL):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.chunk_battles = chunk_battles
+        self.level = level
+        self.writer_id = uuid.uuid4().hex[:8]
+        self.index_path = os.path.join(directory, self.writer_id + INDEX_EXT)
+        self.chunk_number = -1
+        self.chunk_file = None
+        self.in_chunk = 0
+        self.battles = 0
+        self.bytes = 0
+
+    def _rotate(self):
+        if self.chunk_file is not None: self.chunk_file.close()
+        self.chunk_number += 1
+        self.chunk_name = f"{self.writer_id}_{self.chunk_number:05d}{CHUNK_EXT}"
+        self.chunk_file = open(os.path.join(self.directory, self.chunk_name), 'ab')
+        self.in_chunk = 0
+
+    def append(self, record):
+        if self.chunk_file is None or self.in_chunk >= self.chunk_battles: self._rotate()
+        payload = zlib.compress(json.dumps(record, separators=(',', ':')).encode(), self.level)
+        offset = self.chunk_file.tell()
+        self.chunk_file.write(RECORD_HEADER.pack(len(payload), zlib.crc32(payload)))
+        self.chunk_file.write(payload)
+        self.chunk_file.flush()
+        # Index row only after the record is complete: an indexed battle is always readable
+        role = record['role']
+        with open(self.index_path, 'a', newline='') as f:
+            writer = csv.writer(f)
+            if f.tell() == 0: writer.writerow(INDEX_FIELDS)
+            writer.writerow([self.chunk_name, offset, RECORD_HEADER.size + len(payload), record['tag'], record.get('player', ''),
+                             role, record.get('won'), record.get('turns', 0), sum(1 for _, c in record[role] if c)])
+        self.in_chunk += 1
+        self.battles += 1
+        self.bytes += RECORD_HEADER.size + len(payload)
+
+    def close(self):
+        if self.chunk_file is not None:
+            self.chunk_file.close()
+            self.chunk_file = None
+
+
+def read_index(directory):
+    rows = []
+    for path in sorted(glob.glob(os.path.join(directory, "*" + INDEX_EXT))):
+        with open(path, newline='') as f:
+            rows.extend(csv.DictReader(f))
+    return rows
+
+def _decode(blob, path, offset):
+    length, crc = RECORD_HEADER.unpack_from(blob)
+    payload = blob[RECORD_HEADER.size:RECORD_HEADER.size + length]
+    if len(payload) < length or zlib.crc32(payload) != crc:
+        logging.warning(f"Skipping corrupt battle record in {path} at byte {offset}")
+        return None
+    return json.loads(zlib.decompress(payload))
+
+def iter_battles(directory, limit=None):
+    """Yields every indexed battle, reading each chunk file once, sequentially."""
+    rows = read_index(directory)
+    if limit is not None: rows = rows[:limit]
+    by_chunk = {}
+    for row in rows: by_chunk.setdefault(row['chunk'], []).append(row)
+    for chunk, chunk_rows in by_chunk.items():
+        path = os.path.join(directory, chunk)
+        with open(path, 'rb') as f: data = f.read()
+        for row in chunk_rows:
+            offset, length = int(row['offset']), int(row['length'])
+            record = _decode(data[offset:offset + length], path, offset)
+            if record is not None: yield record
+
+def read_battle(directory, row):
+    """Random access to one battle through its index row."""
+    path = os.path.join(directory, row['chunk'])
+    with open(path, 'rb') as f:
+        f.seek(int(row['offset']))
+        return _decode(f.read(int(row['length'])), path, row['offset'])
+
+
+# --- RECORDING ---
+class BattleRecorderMixin:
+    """
+    Player mixin. record_to(BattleLogWriter) logs every frame of every battle together
+    with the choice sent back; the offline trainer (replay_battles) sets _replay_order
+    and the player's action selection pins it through replay_index().
+    """
+    recorder = None
+    _replay_order = None
+    replay_misses = 0
+
+    def record_to(self, writer):
+        self.recorder = writer
+        self._recordings = {} # battle_tag -> [[frame, choice], ...]
+        send_message = self.ps_client.send_message
+
+        async def recording_send_message(message, room="", message_2=None):
+            frames = self._recordings.get(room)
+            if frames is not None and message.startswith("/choose"):
+                # Answers the latest request (a retry after [Invalid choice] overwrites it)
+                for entry in reversed(frames):
+                    if "|request|" in entry[0]:
+                        entry[1] = message
+                        break
+            await send_message(message, room, message_2)
+        self.ps_client.send_message = recording_send_message
+
+    async def _handle_battle_message(self, split_messages):
+        if self.recorder is None:
+            return await super()._handle_battle_message(split_messages)
+
+        tag = split_messages[0][0][1:]
+        frames = self._recordings.setdefault(tag, [])
+        frames.append(["\n".join("|".join(m) for m in split_messages), None])
+        await super()._handle_battle_message(split_messages)
+
+        battle = self._battles.get(tag)
+        if battle is not None and battle.finished:
+            role = battle.player_role
+            opponent_role = 'p2' if role == 'p1' else 'p1'
+            self.recorder.append({
+                'format': self.format, 'tag': tag, 'role': role, 'player': type(self).__name__,
+                'players': {role: self.username, opponent_role: battle.opponent_username},
+                'won': battle.won, 'turns': battle.turn, role: self._recordings.pop(tag)})
+
+    def replay_index(self, orders):
+        """
+        Offline replay only: index of the logged action among the candidate orders (a None
+        candidate stands for "some switch"), or None to let the player choose as usual.
+        """
+        logged = self._replay_order
+        if logged is None: return None
+        for i, order in enumerate(orders):
+            if order is not None and self.create_order(order).message == logged: return i
+        if logged.startswith("/choose switch"):
+            for i, order in enumerate(orders):
+                if order is None: return i
+        self.replay_misses += 1
+        return None
+
+
+# --- OFFLINE REPLAY ---
+async def _discard_message(message, room="", message_2=None):
+    pass
+
+async def _replay(player, battles, after_battle):
+    player.ps_client.send_message = _discard_message # Offline: orders and /leave go nowhere
+    stats = {'battles': 0, 'decisions': 0, 'wins': 0}
+    for n, record in enumerate(battles):
+        role = record.get('role') or next(r for r in ('p1', 'p2') if r in record)
+        # Fresh tag per replay (poke_env keys battles on it) and our username in place of the logged one
+        tag = f"{record['tag']}-replay{n}"
+        subs = [(record['tag'], tag), (record['players'][role], player.username)]
+        for frame, choice in record[role]:
+            for old, new in subs: frame = frame.replace(old, new)
+            player._replay_order = choice if isinstance(choice, str) else None
+            stats['decisions'] += player._replay_order is not None
+            await player._handle_battle_message([line.split('|') for line in frame.split('\n')])
+        player._replay_order = None
+
+        # The |win| frame already ran the player's terminal update (_battle_finished_callback)
+        battle = player._battles.pop(tag, None)
+        if battle is not None and battle.finished:
+            stats['wins'] += bool(battle.won)
+        stats['battles'] += 1
+        if after_battle is not None: after_battle(player, battle)
+    return stats
+
+def replay_battles(player, battles, after_battle=None):
+    """
+    Re-feeds logged battles through the player's own protocol handling and update paths
+    (choose_move learning, terminal callbacks) with the logged actions pinned, on
+    poke_env's loop and without a server. The player must be built with start_listening=False.
+    """
+    from poke_env.concurrency import POKE_LOOP
+    return asyncio.run_coroutine_threadsafe(_replay(player, battles, after_battle), POKE_LOOP).result()
@@ -1,4 +1,5 @@
 import numpy as np
+from type_chart import type_effectiveness
 from poke_env.battle.move import Move
 from poke_env.battle.pokemon import Pokemon
 # Confirmed import paths from your debugging
@@ -6,6 +7,9 @@ from poke_env.battle.effect import Effect
 from poke_env.battle.status import Status
 
 class FeatureExtractor:
+    # Saved with the weights; the player refuses weights from another version
+    feature_version = 2 # 2: real type multipliers (type_chart.py); 1: the title-case chart, every lookup 1.0
+
     def __init__(self):
         self.types = [
             'Normal', 'Fire', 'Water', 'Electric', 'Grass', 'Ice', 
@@ -13,33 +17,12 @@ class FeatureExtractor:
             'Bug', 'Rock', 'Ghost', 'Dragon'
         ]
         self.special_types = {'Fire', 'Water', 'Grass', 'Ice', 'Electric', 'Psychic', 'Dragon'}
-        
-        # Gen 1 Type Chart (Attacker -> Defender)
-        self.gen1_chart = {
-            ('Normal', 'Ghost'): 0.0, ('Normal', 'Rock'): 0.5,
-            ('Fire', 'Fire'): 0.5, ('Fire', 'Water'): 0.5, ('Fire', 'Grass'): 2.0, ('Fire', 'Ice'): 2.0, ('Fire', 'Bug'): 2.0, ('Fire', 'Rock'): 0.5, ('Fire', 'Dragon'): 0.5,
-            ('Water', 'Fire'): 2.0, ('Water', 'Water'): 0.5, ('Water', 'Grass'): 0.5, ('Water', 'Ground'): 2.0, ('Water', 'Rock'): 2.0, ('Water', 'Dragon'): 0.5,
-            ('Electric', 'Water'): 2.0, ('Electric', 'Electric'): 0.5, ('Electric', 'Grass'): 0.5, ('Electric', 'Ground'): 0.0, ('Electric', 'Flying'): 2.0, ('Electric', 'Dragon'): 0.5,
-            ('Grass', 'Fire'): 0.5, ('Grass', 'Water'): 2.0, ('Grass', 'Grass'): 0.5, ('Grass', 'Poison'): 0.5, ('Grass', 'Ground'): 2.0, ('Grass', 'Flying'): 0.5, ('Grass', 'Bug'): 0.5, ('Grass', 'Rock'): 2.0, ('Grass', 'Dragon'): 0.5,
-            ('Ice', 'Water'): 0.5, ('Ice', 'Grass'): 2.0, ('Ice', 'Ice'): 0.5, ('Ice', 'Ground'): 2.0, ('Ice', 'Flying'): 2.0, ('Ice', 'Dragon'): 2.0,
-            ('Fighting', 'Normal'): 2.0, ('Fighting', 'Ice'): 2.0, ('Fighting', 'Poison'): 0.5, ('Fighting', 'Flying'): 0.5, ('Fighting', 'Psychic'): 0.5, ('Fighting', 'Bug'): 0.5, ('Fighting', 'Rock'): 2.0, ('Fighting', 'Ghost'): 0.0,
-            ('Poison', 'Grass'): 2.0, ('Poison', 'Poison'): 0.5, ('Poison', 'Ground'): 0.5, ('Poison', 'Bug'): 2.0, ('Poison', 'Rock'): 0.5, ('Poison', 'Ghost'): 0.5,
-            ('Ground', 'Fire'): 2.0, ('Ground', 'Electric'): 2.0, ('Ground', 'Grass'): 0.5, ('Ground', 'Poison'): 2.0, ('Ground', 'Flying'): 0.0, ('Ground', 'Bug'): 0.5, ('Ground', 'Rock'): 2.0,
-            ('Flying', 'Electric'): 0.5, ('Flying', 'Grass'): 2.0, ('Flying', 'Fighting'): 2.0, ('Flying', 'Bug'): 2.0, ('Flying', 'Rock'): 0.5,
-            ('Psychic', 'Fighting'): 2.0, ('Psychic', 'Poison'): 2.0, ('Psychic', 'Psychic'): 0.5,
-            ('Bug', 'Fire'): 0.5, ('Bug', 'Grass'): 2.0, ('Bug', 'Fighting'): 0.5, ('Bug', 'Poison'): 2.0, ('Bug', 'Flying'): 0.5, ('Bug', 'Ghost'): 0.5,
-            ('Rock', 'Fire'): 2.0, ('Rock', 'Ice'): 2.0, ('Rock', 'Fighting'): 0.5, ('Rock', 'Ground'): 0.5, ('Rock', 'Flying'): 2.0, ('Rock', 'Bug'): 2.0,
-            ('Ghost', 'Normal'): 0.0, ('Ghost', 'Psychic'): 0.0, ('Ghost', 'Ghost'): 2.0,
-            ('Dragon', 'Dragon'): 2.0
-        }
 
     # --- CRITICAL HELPER METHOD ---
     # This must be public (no underscore) for sarsa_player.py to use it
     def get_effectiveness(self, move_type, def_type1, def_type2=None):
-        eff = self.gen1_chart.get((move_type, def_type1), 1.0)
-        if def_type2:
-            eff *= self.gen1_chart.get((move_type, def_type2), 1.0)
-        return eff
+        # Shared dense chart (type_chart.py); accepts PokemonType or type names in any case
+        return type_effectiveness(move_type, def_type1, def_type2)
 
     def get_features(self, battle, move_obj=None):
         # --- STATE FEATURES (s) ---
@@ -1,10 +1,14 @@
 import numpy as np
+from type_chart import type_effectiveness
 from poke_env.battle.move import Move
 from poke_env.battle.pokemon import Pokemon
 from poke_env.battle.effect import Effect
 from poke_env.battle.status import Status
 
 class FeatureExtractor:
+    # Saved with the weights; the player refuses weights from another version
+    feature_version = 2 # 2: real type multipliers (type_chart.py); 1: the title-case chart, every lookup 1.0
+
     def __init__(self):
         # --- GEN 1 DATABASE (151 Pokemon) ---
         self.pokedex = [
@@ -61,88 +65,127 @@ class FeatureExtractor:
             'whirlwind', 'wingattack', 'withdraw'
         ]
         
-        self.gen1_chart = {
-            ('Normal', 'Ghost'): 0.0, ('Normal', 'Rock'): 0.5,
-            ('Fire', 'Fire'): 0.5, ('Fire', 'Water'): 0.5, ('Fire', 'Grass'): 2.0, ('Fire', 'Ice'): 2.0, ('Fire', 'Bug'): 2.0, ('Fire', 'Rock'): 0.5, ('Fire', 'Dragon'): 0.5,
-            ('Water', 'Fire'): 2.0, ('Water', 'Water'): 0.5, ('Water', 'Grass'): 0.5, ('Water', 'Ground'): 2.0, ('Water', 'Rock'): 2.0, ('Water', 'Dragon'): 0.5,
-            ('Electric', 'Water'): 2.0, ('Electric', 'Electric'): 0.5, ('Electric', 'Grass'): 0.5, ('Electric', 'Ground'): 0.0, ('Electric', 'Flying'): 2.0, ('Electric', 'Dragon'): 0.5,
-            ('Grass', 'Fire'): 0.5, ('Grass', 'Water'): 2.0, ('Grass', 'Grass'): 0.5, ('Grass', 'Poison'): 0.5, ('Grass', 'Ground'): 2.0, ('Grass', 'Flying'): 0.5, ('Grass', 'Bug'): 0.5, ('Grass', 'Rock'): 2.0, ('Grass', 'Dragon'): 0.5,
-            ('Ice', 'Water'): 0.5, ('Ice', 'Grass'): 2.0, ('Ice', 'Ice'): 0.5, ('Ice', 'Ground'): 2.0, ('Ice', 'Flying'): 2.0, ('Ice', 'Dragon'): 2.0,
-            ('Fighting', 'Normal'): 2.0, ('Fighting', 'Ice'): 2.0, ('Fighting', 'Poison'): 0.5, ('Fighting', 'Flying'): 0.5, ('Fighting', 'Psychic'): 0.5, ('Fighting', 'Bug'): 0.5, ('Fighting', 'Rock'): 2.0, ('Fighting', 'Ghost'): 0.0,
-            ('Poison', 'Grass'): 2.0, ('Poison', 'Poison'): 0.5, ('Poison', 'Ground'): 0.5, ('Poison', 'Bug'): 2.0, ('Poison', 'Rock'): 0.5, ('Poison', 'Ghost'): 0.5,
-            ('Ground', 'Fire'): 2.0, ('Ground', 'Electric'): 2.0, ('Ground', 'Grass'): 0.5, ('Ground', 'Poison'): 2.0, ('Ground', 'Flying'): 0.0, ('Ground', 'Bug'): 0.5, ('Ground', 'Rock'): 2.0,
-            ('Flying', 'Electric'): 0.5, ('Flying', 'Grass'): 2.0, ('Flying', 'Fighting'): 2.0, ('Flying', 'Bug'): 2.0, ('Flying', 'Rock'): 0.5,
-            ('Psychic', 'Fighting'): 2.0, ('Psychic', 'Poison'): 2.0, ('Psychic', 'Psychic'): 0.5,
-            ('Bug', 'Fire'): 0.5, ('Bug', 'Grass'): 2.0, ('Bug', 'Fighting'): 0.5, ('Bug', 'Poison'): 2.0, ('Bug', 'Flying'): 0.5, ('Bug', 'Ghost'): 0.5,
-            ('Rock', 'Fire'): 2.0, ('Rock', 'Ice'): 2.0, ('Rock', 'Fighting'): 0.5, ('Rock', 'Ground'): 0.5, ('Rock', 'Flying'): 2.0, ('Rock', 'Bug'): 2.0,
-            ('Ghost', 'Normal'): 0.0, ('Ghost', 'Psychic'): 0.0, ('Ghost', 'Ghost'): 2.0,
-            ('Dragon', 'Dragon'): 2.0
-        }
         self.special_types = {'Fire', 'Water', 'Grass', 'Ice', 'Electric', 'Psychic', 'Dragon'}
 
+        # One-hot positions; first occurrence wins, as with list.index (self.moves has repeats)
+        self.species_index = {}
+        for i, name in enumerate(self.pokedex): self.species_index.setdefault(name, i)
+        self.move_index = {}
+        for i, m_id in enumerate(self.moves): self.move_index.setdefault(m_id, i)
+        self.status_index = {Status.SLP:0, Status.PSN:1, Status.BRN:2, Status.FRZ:3, Status.PAR:4, Status.TOX:5}
+        self.volatile_effects = [Effect.CONFUSION, Effect.SUBSTITUTE, Effect.LEECH_SEED] # 5 slots, 2 unused
+
+        self.mon_size = 1 + 4 + 6 + 8 + 5 + len(self.pokedex)
+        self.state_dim = (self.mon_size * 2) + 4 + 1
+        self._matrix = np.zeros((9, self.total_dim)) # Reused by get_action_matrix (4 moves + 5 switches)
+
     def get_effectiveness(self, move_type, def_type1, def_type2=None):
-        eff = self.gen1_chart.get((move_type, def_type1), 1.0)
-        if def_type2:
-            eff *= self.gen1_chart.get((move_type, def_type2), 1.0)
-        return eff
+        # Shared dense chart (type_chart.py); accepts PokemonType or type names in any case
+        return type_effectiveness(move_type, def_type1, def_type2)
 
-    def get_features(self, battle, move_obj=None):
-        state_parts = []
-        
-        def get_mon_features(mon):
-            hp = mon.current_hp_fraction
-            
-            stats = mon.base_stats
-            boosts = mon.boosts
-            
-            stat_vec = np.array([
-                stats.get('atk', 100)/255.0, stats.get('def', 100)/255.0, 
-                stats.get('spa', 100)/255.0, stats.get('spe', 100)/255.0
-            ])
-            boost_vec = np.array([
-                boosts.get('atk', 0)/6.0, boosts.get('def', 0)/6.0, 
-                boosts.get('spa', 0)/6.0, boosts.get('spe', 0)/6.0,
-                boosts.get('accuracy', 0)/6.0, boosts.get('evasion', 0)/6.0
-            ])
-            
-            status_vec = np.zeros(8)
-            if mon.fainted: status_vec[6] = 1.0
-            elif mon.status is None: status_vec[7] = 1.0
-            else:
-                s_map = {Status.SLP:0, Status.PSN:1, Status.BRN:2, Status.FRZ:3, Status.PAR:4, Status.TOX:5}
-                if mon.status in s_map: status_vec[s_map[mon.status]] = 1.0
+    # --- SPARSE ENCODING ---
+    # phi is mostly one-hot blocks, so every encoder below emits (indices, values) lists of
+    # the entries that can be non-zero; the dense vectors are scattered from the same lists.
+    def _mon_entries(self, mon, base, idx, vals):
+        stats = mon.base_stats
+        boosts = mon.boosts
+        idx.extend(range(base, base + 11))
+        vals.extend((
+            mon.current_hp_fraction,
+            stats.get('atk', 100)/255.0, stats.get('def', 100)/255.0, 
+            stats.get('spa', 100)/255.0, stats.get('spe', 100)/255.0,
+            boosts.get('atk', 0)/6.0, boosts.get('def', 0)/6.0, 
+            boosts.get('spa', 0)/6.0, boosts.get('spe', 0)/6.0,
+            boosts.get('accuracy', 0)/6.0, boosts.get('evasion', 0)/6.0
+        ))
 
-            vol_vec = np.zeros(5) 
-            if Effect.CONFUSION in mon.effects: vol_vec[0] = 1.0
-            if Effect.SUBSTITUTE in mon.effects: vol_vec[1] = 1.0
-            if Effect.LEECH_SEED in mon.effects: vol_vec[2] = 1.0
-            
-            species_vec = np.zeros(len(self.pokedex))
-            s_name = mon.species.lower()
-            if s_name in self.pokedex: species_vec[self.pokedex.index(s_name)] = 1.0
-            
-            return np.concatenate([[hp], stat_vec, boost_vec, status_vec, vol_vec, species_vec])
+        if mon.fainted: status = 6
+        elif mon.status is None: status = 7
+        else: status = self.status_index.get(mon.status)
+        if status is not None:
+            idx.append(base + 11 + status)
+            vals.append(1.0)
+
+        for j, effect in enumerate(self.volatile_effects):
+            if effect in mon.effects:
+                idx.append(base + 19 + j)
+                vals.append(1.0)
 
+        s_idx = self.species_index.get(mon.species.lower())
+        if s_idx is not None:
+            idx.append(base + 24 + s_idx)
+            vals.append(1.0)
+
+    def _state_entries(self, battle):
+        idx, vals = [], []
         if battle.active_pokemon:
-            state_parts.append(get_mon_features(battle.active_pokemon))
-        else:
-            state_parts.append(np.zeros(1 + 4 + 6 + 8 + 5 + 151)) 
-            
+            self._mon_entries(battle.active_pokemon, 0, idx, vals)
         if battle.opponent_active_pokemon:
-            state_parts.append(get_mon_features(battle.opponent_active_pokemon))
-        else:
-            state_parts.append(np.zeros(1 + 4 + 6 + 8 + 5 + 151)) 
+            self._mon_entries(battle.opponent_active_pokemon, self.mon_size, idx, vals)
 
-        side_vec = np.zeros(4) 
-        if 'reflect' in battle.side_conditions: side_vec[0] = 1.0
-        if 'lightscreen' in battle.side_conditions: side_vec[1] = 1.0
-        if 'reflect' in battle.opponent_side_conditions: side_vec[2] = 1.0
-        if 'lightscreen' in battle.opponent_side_conditions: side_vec[3] = 1.0
-        
-        state_parts.append(side_vec)
-        state_parts.append([1.0]) 
-        
-        state_vec = np.concatenate(state_parts)
+        side = 2 * self.mon_size
+        for j, active in enumerate(('reflect' in battle.side_conditions, 'lightscreen' in battle.side_conditions,
+                                    'reflect' in battle.opponent_side_conditions, 'lightscreen' in battle.opponent_side_conditions)):
+            if active:
+                idx.append(side + j)
+                vals.append(1.0)
+        idx.append(side + 4) # Bias
+        vals.append(1.0)
+        return idx, vals
+
+    def get_sparse_state(self, battle):
+        """(indices, values) arrays of the state block of phi."""
+        idx, vals = self._state_entries(battle)
+        return np.array(idx, dtype=np.intp), np.array(vals)
+
+    def get_sparse_action(self, battle, move):
+        """(indices, values) arrays of the action block of phi(s, move), indexed in the full vector."""
+        scalars, one_hot = self._action_entries(battle, move)
+        base = self.state_dim
+        idx = list(range(base, base + 8))
+        vals = list(scalars)
+        if one_hot is not None:
+            idx.append(base + one_hot)
+            vals.append(1.0)
+        return np.array(idx, dtype=np.intp), np.array(vals)
+
+    def get_sparse_actions(self, battle, actions):
+        """
+        All candidate action blocks at once as (n, 9) index / value arrays: the 8 scalars and
+        the one-hot, padded with index -1 / value 0.0 when the move or species is unknown.
+        (weights[idx] * vals).sum(1) gives every action's Q contribution in one op; drop the
+        -1 padding (idx >= 0) before using a row for an update.
+        """
+        base = self.state_dim
+        scalar_idx = list(range(base, base + 8))
+        idx, vals = [], []
+        for move in actions:
+            scalars, one_hot = self._action_entries(battle, move)
+            if one_hot is None:
+                idx.append(scalar_idx + [-1])
+                vals.append(scalars + (0.0,))
+            else:
+                idx.append(scalar_idx + [base + one_hot])
+                vals.append(scalars + (1.0,))
+        return np.array(idx, dtype=np.intp), np.array(vals)
+
+    def get_sparse_features(self, battle, move_obj=None):
+        """(indices, values) with phi[indices] == values and phi zero elsewhere (phi = get_features)."""
+        s_idx, s_vals = self.get_sparse_state(battle)
+        if move_obj is None:
+            return s_idx, s_vals
+        a_idx, a_vals = self.get_sparse_action(battle, move_obj)
+        return np.concatenate([s_idx, a_idx]), np.concatenate([s_vals, a_vals])
+
+    # --- DENSE ENCODING ---
+    def _encode_state(self, battle, out):
+        out[:] = 0.0
+        idx, vals = self._state_entries(battle)
+        out[idx] = vals
+        return out
+
+    def get_features(self, battle, move_obj=None):
+        state_vec = self._encode_state(battle, np.zeros(self.state_dim))
 
         if move_obj is None:
             return state_vec
@@ -150,10 +193,38 @@ class FeatureExtractor:
         action_vec = self._get_action_features(battle, move_obj)
         return np.concatenate([state_vec, action_vec])
 
+    def get_action_matrix(self, battle, actions, out=None):
+        """
+        (len(actions), total_dim) matrix of phi(s, a) for every candidate action, equal to
+        stacking get_features(battle, a). Both Pokemon vectors are encoded once and
+        broadcast; action features are written straight into the zeroed rows. Without `out`
+        the rows live in a buffer reused by the next call, so copy any row you keep.
+        """
+        n = len(actions)
+        if out is None:
+            if self._matrix.shape[0] < n: self._matrix = np.zeros((n, self.total_dim))
+            out = self._matrix[:n]
+        state_dim = self.state_dim
+        self._encode_state(battle, out[0, :state_dim])
+        out[1:, :state_dim] = out[0, :state_dim]
+        out[:, state_dim:] = 0.0
+        for row, action in zip(out, actions):
+            self._fill_action_features(battle, action, row[state_dim:])
+        return out
+
     def _get_action_features(self, battle, move):
-        move_id_vec = np.zeros(len(self.moves))
-        switch_id_vec = np.zeros(len(self.pokedex))
-        
+        return self._fill_action_features(battle, move, np.zeros(self.total_dim - self.state_dim))
+
+    def _fill_action_features(self, battle, move, row):
+        """Writes the action block into the zeroed row: 8 scalars, move one-hot, switch one-hot."""
+        scalars, one_hot = self._action_entries(battle, move)
+        row[:8] = scalars
+        if one_hot is not None: row[one_hot] = 1.0
+        return row
+
+    def _action_entries(self, battle, move):
+        """The 8 action scalars and the position of the move / switch one-hot within the action block (or None)."""
+        one_hot = None
         is_switch = 0.0
         dmg_pot = 0.0
         accuracy = 0.0
@@ -166,8 +237,8 @@ class FeatureExtractor:
         if not isinstance(move, Move):
             is_switch = 1.0
             
-            s_name = move.species.lower()
-            if s_name in self.pokedex: switch_id_vec[self.pokedex.index(s_name)] = 1.0
+            s_idx = self.species_index.get(move.species.lower())
+            if s_idx is not None: one_hot = 8 + len(self.moves) + s_idx
 
             if battle.opponent_active_pokemon:
                 opp_type = battle.opponent_active_pokemon.type_1.name
@@ -177,9 +248,8 @@ class FeatureExtractor:
                 if def_eff < 1.0: switch_def_adv = 1.0 
                 elif def_eff > 1.0: switch_def_adv = -1.0
         else:
-            m_id = move.id
-            if m_id in self.moves:
-                move_id_vec[self.moves.index(m_id)] = 1.0
+            m_idx = self.move_index.get(move.id)
+            if m_idx is not None: one_hot = 8 + m_idx
             
             if move.base_power > 0:
                 bp = move.base_power
@@ -207,11 +277,7 @@ class FeatureExtractor:
             if move.id in ['recover', 'softboiled', 'rest']:
                 is_recovery = 1.0
 
-        return np.concatenate([
-            [is_switch, dmg_pot, accuracy, stat_aligned, is_stab, is_status_move, is_recovery, switch_def_adv],
-            move_id_vec,
-            switch_id_vec
-        ])
+        return (is_switch, dmg_pot, accuracy, stat_aligned, is_stab, is_status_move, is_recovery, switch_def_adv), one_hot
 
     @property
     def total_dim(self):
@@ -2,13 +2,14 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import os
 import glob
+from metrics_log import METRICS_EXT, read_frame
 
 LOG_DIR = "logs"
 PLOT_DIR = "plots"
 
 def get_latest_log():
-    """Finds the most recently modified CSV file in the logs directory."""
-    list_of_files = glob.glob(os.path.join(LOG_DIR, '*.csv'))
+    """Finds the most recently modified log (.metrics, or a not yet converted CSV) in the logs directory."""
+    list_of_files = glob.glob(os.path.join(LOG_DIR, '*' + METRICS_EXT)) + glob.glob(os.path.join(LOG_DIR, '*.csv'))
     if not list_of_files:
         return None
     return max(list_of_files, key=os.path.getctime)
@@ -22,7 +23,10 @@ def plot_training():
     print(f"Plotting data from: {log_file}")
     
     try:
-        data = pd.read_csv(log_file)
+        if log_file.endswith(METRICS_EXT):
+            data = read_frame(log_file, {'battles': 'Episode', 'overall_win': 'WinRate'})
+        else:
+            data = pd.read_csv(log_file)
     except pd.errors.EmptyDataError:
         print("Log file is empty.")
         return
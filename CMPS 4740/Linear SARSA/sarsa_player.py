@@ -4,6 +4,7 @@ import random
 from poke_env.player.player import Player
 from poke_env.battle.pokemon import Pokemon
 from poke_env.battle.move import Move
+from type_chart import type_effectiveness
 # IMPORTANT: Importing from the _orig file
 from features_orig import FeatureExtractor
 
@@ -129,22 +130,16 @@ class LinearSARSAPlayer(Player):
         # 2. RULE-BASED LOGIC
         last_action = self._last_action.get(battle_id)
         if isinstance(last_action, Move) and battle.opponent_active_pokemon:
-            move_type = last_action.type.name
-            def_t1 = battle.opponent_active_pokemon.type_1.name
-            def_t2 = battle.opponent_active_pokemon.type_2.name if battle.opponent_active_pokemon.type_2 else None
-            
-            eff = self.extractor.get_effectiveness(move_type, def_t1, def_t2)
+            opp = battle.opponent_active_pokemon
+            eff = type_effectiveness(last_action.type, opp.type_1, opp.type_2)
             
             if eff > 1.0: reward += 10.0 
             elif eff == 0.0 and last_action.base_power > 0: reward -= 20.0 
             elif eff < 1.0: reward -= 2.0 
 
         if battle.active_pokemon and battle.opponent_active_pokemon:
-            opp_type = battle.opponent_active_pokemon.type_1.name
-            my_t1 = battle.active_pokemon.type_1.name
-            my_t2 = battle.active_pokemon.type_2.name if battle.active_pokemon.type_2 else None
-            
-            defensive_eff = self.extractor.get_effectiveness(opp_type, my_t1, my_t2)
+            mine = battle.active_pokemon
+            defensive_eff = type_effectiveness(battle.opponent_active_pokemon.type_1, mine.type_1, mine.type_2)
             if defensive_eff > 1.0: reward -= 5.0 
             elif defensive_eff < 1.0: reward += 5.0 
 
@@ -163,6 +158,10 @@ class LinearSARSAPlayer(Player):
 
         return reward
 
+    def _battle_finished_callback(self, battle):
+        # The only terminal hook poke_env 0.16 calls live (at |win| / |tie|)
+        self.battle_finished_callback(battle)
+
     def battle_finished_callback(self, battle):
         battle_id = battle.battle_tag
         if battle_id in self._last_features:
@@ -184,13 +183,17 @@ class LinearSARSAPlayer(Player):
 
     def save_model(self, path):
         with open(path, 'wb') as f:
-            pickle.dump(self.weights, f)
+            pickle.dump({'weights': self.weights, 'feature_version': self.extractor.feature_version}, f)
 
     def load_model(self, path):
         try:
             with open(path, 'rb') as f:
-                saved_weights = pickle.load(f)
-                if hasattr(saved_weights, 'shape') and saved_weights.shape != self.weights.shape:
+                saved = pickle.load(f)
+                # Untagged files (bare arrays) predate the version tag: version 1
+                saved_weights, version = (saved['weights'], saved['feature_version']) if isinstance(saved, dict) else (saved, 1)
+                if version != self.extractor.feature_version:
+                    print(f"⚠️ FEATURE VERSION MISMATCH: Saved v{version} != Current v{self.extractor.feature_version}. Starting fresh.")
+                elif hasattr(saved_weights, 'shape') and saved_weights.shape != self.weights.shape:
                     print(f"⚠️ SHAPE MISMATCH: Saved {saved_weights.shape} != Current {self.weights.shape}. Starting fresh.")
                 else:
                     self.weights = saved_weights
@@ -5,7 +5,9 @@ import sys
 from poke_env.player.player import Player
 from poke_env.battle.pokemon import Pokemon
 from poke_env.battle.move import Move
+from type_chart import type_effectiveness
 from features_full import FeatureExtractor
+from battle_log import BattleRecorderMixin
 
 _original_available_moves = Pokemon.available_moves_from_request
 def patched_available_moves(self, request_moves):
@@ -15,11 +17,12 @@ def patched_available_moves(self, request_moves):
         return []
 Pokemon.available_moves_from_request = patched_available_moves
 
-class LinearSARSAPlayer(Player):
-    def __init__(self, battle_format="gen1randombattle", alpha=0.001, gamma=0.99, tau=1e9, epsilon=1.0, **kwargs):
+class LinearSARSAPlayer(BattleRecorderMixin, Player):
+    def __init__(self, battle_format="gen1randombattle", alpha=0.001, gamma=0.99, tau=1e9, epsilon=1.0, extractor=None, **kwargs):
         super().__init__(battle_format=battle_format, **kwargs)
         
-        self.extractor = FeatureExtractor()
+        # features_full by default; features_hashed.HashedFeatureExtractor gives fixed-size weights
+        self.extractor = extractor or FeatureExtractor()
         # Initialize small random weights
         self.weights = np.random.uniform(-0.0001, 0.0001, self.extractor.total_dim)
         
@@ -38,7 +41,15 @@ class LinearSARSAPlayer(Player):
         self._last_action = {}
 
     def get_q(self, features):
-        return np.dot(self.weights, features)
+        # features: sparse (indices, values) from FeatureExtractor.get_sparse_features
+        idx, vals = features
+        return np.dot(self.weights[idx], vals)
+
+    def update_weights(self, features, error):
+        # weights += alpha * error * phi, touching only phi's non-zero entries.
+        # np.add.at accumulates repeated indices (hashed state / action features can share a bucket)
+        idx, vals = features
+        np.add.at(self.weights, idx, self.alpha * error * vals)
 
     def choose_move(self, battle):
         # 1. ACTION VALIDATION
@@ -56,20 +67,19 @@ class LinearSARSAPlayer(Player):
             return self.choose_random_move(battle)
 
         # 2. Q CALCULATION
-        candidate_features = []
-        q_values = []
-        real_actions = []
-
-        for action_obj, action_idx in valid_actions:
-            phi = self.extractor.get_features(battle, action_obj)
-            q = self.get_q(phi)
-            candidate_features.append(phi)
-            q_values.append(q)
-            real_actions.append(action_obj)
+        # Sparse phi: Q(s, a) = w . phi_state + w . phi_action, the state part shared by all actions
+        real_actions = [action_obj for action_obj, _ in valid_actions]
+        state_idx, state_vals = self.extractor.get_sparse_state(battle)
+        state_q = self.get_q((state_idx, state_vals))
+        action_idx, action_vals = self.extractor.get_sparse_actions(battle, real_actions)
+        q_values = state_q + (self.weights[action_idx] * action_vals).sum(axis=1)
             
         # 3. HYBRID SELECTION (EPSILON + SOFTMAX)
-        # First check Epsilon (Randomness)
-        if random.random() < self.epsilon:
+        # Offline replay pins the logged action; otherwise first check Epsilon (Randomness)
+        logged_idx = self.replay_index(real_actions)
+        if logged_idx is not None:
+            choice_idx = logged_idx
+        elif random.random() < self.epsilon:
             choice_idx = random.randint(0, len(valid_actions) - 1)
         else:
             # If not epsilon-random, use Softmax based on Tau
@@ -84,7 +94,9 @@ class LinearSARSAPlayer(Player):
                 choice_idx = np.random.choice(len(valid_actions), p=probabilities)
             
         chosen_action = real_actions[choice_idx]
-        chosen_features = candidate_features[choice_idx]
+        a_idx, a_vals = action_idx[choice_idx], action_vals[choice_idx]
+        keep = a_idx >= 0 # Drop the padding slot
+        chosen_features = (np.concatenate([state_idx, a_idx[keep]]), np.concatenate([state_vals, a_vals[keep]]))
         chosen_q = q_values[choice_idx]
         
         # 4. UPDATE
@@ -97,7 +109,7 @@ class LinearSARSAPlayer(Player):
             
             target = reward + self.gamma * chosen_q
             error = target - last_q
-            self.weights += self.alpha * error * last_phi
+            self.update_weights(last_phi, error)
 
         self._last_features[battle_id] = chosen_features
         self._last_q[battle_id] = chosen_q
@@ -132,11 +144,8 @@ class LinearSARSAPlayer(Player):
         # Rule Based Rewards
         last_action = self._last_action.get(battle_id)
         if isinstance(last_action, Move) and battle.opponent_active_pokemon:
-            move_type = last_action.type.name
-            def_t1 = battle.opponent_active_pokemon.type_1.name
-            def_t2 = battle.opponent_active_pokemon.type_2.name if battle.opponent_active_pokemon.type_2 else None
-            
-            eff = self.extractor.get_effectiveness(move_type, def_t1, def_t2)
+            opp = battle.opponent_active_pokemon
+            eff = type_effectiveness(last_action.type, opp.type_1, opp.type_2)
             if eff > 1.0: reward += 10.0 
             elif eff == 0.0 and last_action.base_power > 0: reward -= 20.0 
             elif eff < 1.0: reward -= 2.0 
@@ -156,6 +165,10 @@ class LinearSARSAPlayer(Player):
 
         return reward
 
+    def _battle_finished_callback(self, battle):
+        # The only terminal hook poke_env 0.16 calls live (at |win| / |tie|)
+        self.battle_finished_callback(battle)
+
     def battle_finished_callback(self, battle):
         battle_id = battle.battle_tag
         if battle_id in self._last_features:
@@ -166,7 +179,7 @@ class LinearSARSAPlayer(Player):
             
             target = reward
             error = target - last_q
-            self.weights += self.alpha * error * last_phi
+            self.update_weights(last_phi, error)
             
             del self._last_features[battle_id]
             del self._last_q[battle_id]
@@ -177,13 +190,17 @@ class LinearSARSAPlayer(Player):
 
     def save_model(self, path):
         with open(path, 'wb') as f:
-            pickle.dump(self.weights, f)
+            pickle.dump({'weights': self.weights, 'feature_version': self.extractor.feature_version}, f)
 
     def load_model(self, path):
         try:
             with open(path, 'rb') as f:
-                saved_weights = pickle.load(f)
-                if hasattr(saved_weights, 'shape') and saved_weights.shape != self.weights.shape:
+                saved = pickle.load(f)
+                # Untagged files (bare arrays) predate the version tag: version 1
+                saved_weights, version = (saved['weights'], saved['feature_version']) if isinstance(saved, dict) else (saved, 1)
+                if version != self.extractor.feature_version:
+                    print(f"⚠️ FEATURE VERSION MISMATCH: Saved v{version} != Current v{self.extractor.feature_version}. Starting fresh.")
+                elif hasattr(saved_weights, 'shape') and saved_weights.shape != self.weights.shape:
                     print(f"⚠️ SHAPE MISMATCH: Saved {saved_weights.shape} != Current {self.weights.shape}. Starting fresh.")
                 else:
                     self.weights = saved_weights
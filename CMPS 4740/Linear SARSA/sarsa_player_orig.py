@@ -140,6 +140,10 @@ class LinearSARSAPlayer(Player):
 
         return reward
 
+    def _battle_finished_callback(self, battle):
+        # The only terminal hook poke_env 0.16 calls live (at |win| / |tie|)
+        self.battle_finished_callback(battle)
+
     def battle_finished_callback(self, battle):
         battle_id = battle.battle_tag
         if battle_id in self._last_features:
@@ -160,13 +164,17 @@ class LinearSARSAPlayer(Player):
 
     def save_model(self, path):
         with open(path, 'wb') as f:
-            pickle.dump(self.weights, f)
+            pickle.dump({'weights': self.weights, 'feature_version': self.extractor.feature_version}, f)
 
     def load_model(self, path):
         try:
             with open(path, 'rb') as f:
-                saved_weights = pickle.load(f)
-                if hasattr(saved_weights, 'shape') and saved_weights.shape != self.weights.shape:
+                saved = pickle.load(f)
+                # Untagged files (bare arrays) predate the version tag: version 1
+                saved_weights, version = (saved['weights'], saved['feature_version']) if isinstance(saved, dict) else (saved, 1)
+                if version != self.extractor.feature_version:
+                    print(f"⚠️ FEATURE VERSION MISMATCH: Saved v{version} != Current v{self.extractor.feature_version}. Starting fresh.")
+                elif hasattr(saved_weights, 'shape') and saved_weights.shape != self.weights.shape:
                     print(f"⚠️ SHAPE MISMATCH: Saved {saved_weights.shape} != Current {self.weights.shape}. Starting fresh.")
                 else:
                     self.weights = saved_weights
@@ -1,6 +1,5 @@
 import asyncio
 import os
-import csv
 import time
 import logging
 from collections import deque
@@ -9,6 +8,8 @@ from poke_env.player import SimpleHeuristicsPlayer
 from poke_env.ps_client.server_configuration import LocalhostServerConfiguration
 # Import the FULL player
 from sarsa_player_full import LinearSARSAPlayer
+from battle_log import BattleLogWriter
+from metrics_log import METRICS_EXT, append_metrics, read_last
 
 # --- CONFIGURATION ---
 TOTAL_EPISODES = 1000000   
@@ -19,6 +20,8 @@ BATTLE_TIMEOUT = 60
 VERBOSE = False            
 
 TRAIN_NEW_MODEL = False    
+HASH_BITS = None           # e.g. 18: hashed features (features_hashed.py) with 2^18 fixed-size weights
+RECORD_DIR = None          # e.g. "battle_logs": log every battle for train_offline_full.py
 
 # --- EXPLORATION SCHEDULE ---
 # Epsilon: Linear 1.0 -> 0.0 over first 5% of battles
@@ -42,38 +45,40 @@ os.makedirs("models", exist_ok=True)
 
 if TRAIN_NEW_MODEL:
     run_id = datetime.now().strftime("%Y%m%d_%H%M%S")
-    LOG_FILE = f"logs/training_log_full_{run_id}.csv"
+    LOG_FILE = f"logs/training_log_full_{run_id}{METRICS_EXT}"
     MODEL_FILE = f"models/sarsa_weights_full_{run_id}.pkl"
-    print(f"--- STARTING NEW RUN (FULL): {run_id} ---")
+elif HASH_BITS:
+    LOG_FILE = f"logs/training_log_master_hashed{HASH_BITS}{METRICS_EXT}"
+    MODEL_FILE = f"models/sarsa_master_hashed{HASH_BITS}.pkl"
 else:
-    LOG_FILE = "logs/training_log_master_full.csv"
+    LOG_FILE = f"logs/training_log_master_full{METRICS_EXT}"
     MODEL_FILE = "models/sarsa_master_full.pkl"
-    print(f"--- CONTINUING MASTER RUN (FULL) ---")
 
 def get_start_stats():
     start_ep = 0
     start_wins = 0
-    if not os.path.exists(LOG_FILE): return 0, 0
     try:
-        with open(LOG_FILE, 'r') as f:
-            reader = csv.reader(f)
-            data = list(reader)
-            if len(data) > 1: 
-                last_row = data[-1]
-                if len(last_row) >= 2:
-                    start_ep = int(last_row[0])
-                    win_rate = float(last_row[1])
-                    start_wins = int(start_ep * win_rate)
+        last = read_last(LOG_FILE) # One seek, however long the log
+        if last:
+            start_ep = last[0]['battles']
+            start_wins = int(start_ep * last[0]['overall_win'])
     except: pass
     return start_ep, start_wins
 
+def make_extractor():
+    """None keeps the player's features_full extractor."""
+    if not HASH_BITS: return None
+    from features_hashed import HashedFeatureExtractor
+    return HashedFeatureExtractor(HASH_BITS)
+
+def exploration_at(episode):
+    """(epsilon, tau) the schedule reaches after `episode` battles."""
+    progress = min(1.0, episode / EPS_DECAY_STEPS)
+    epsilon = max(EPS_END, EPS_START - (progress * (EPS_START - EPS_END)))
+    return epsilon, TAU_START * (TAU_DECAY_RATE ** episode)
+
 def log_stats(episode, win_rate, tau, epsilon, opponent_name):
-    file_exists = os.path.isfile(LOG_FILE)
-    with open(LOG_FILE, mode='a', newline='') as f:
-        writer = csv.writer(f)
-        if not file_exists:
-            writer.writerow(['Episode', 'WinRate', 'Tau', 'Epsilon', 'Opponent'])
-        writer.writerow([episode, win_rate, tau, epsilon, opponent_name])
+    append_metrics(LOG_FILE, battles=episode, overall_win=win_rate, tau=tau, epsilon=epsilon, opponent=opponent_name)
 
 def silence_player(player):
     if not VERBOSE:
@@ -149,6 +154,8 @@ async def battle_worker(worker_id, learner, opponent, state):
 
 async def main():
     FORMAT = "gen1randombattle"
+    if TRAIN_NEW_MODEL: print(f"--- STARTING NEW RUN (FULL): {LOG_FILE} ---")
+    else: print(f"--- CONTINUING MASTER RUN (FULL) ---")
     
     # 1. Setup Learner (No PlayerConfiguration, let poke-env handle names)
     learner = LinearSARSAPlayer(
@@ -158,9 +165,11 @@ async def main():
         epsilon=EPS_START,
         alpha=0.001, 
         gamma=0.99,
+        extractor=make_extractor(),
         max_concurrent_battles=MAX_CONCURRENT
     )
     silence_player(learner)
+    if RECORD_DIR: learner.record_to(BattleLogWriter(RECORD_DIR))
     
     start_episode = 0
     start_wins = 0
@@ -172,9 +181,7 @@ async def main():
         
         # Fast-forward parameters if resuming
         if start_episode > 0:
-            progress = min(1.0, start_episode / EPS_DECAY_STEPS)
-            learner.epsilon = max(EPS_END, EPS_START - (progress * (EPS_START - EPS_END)))
-            learner.tau = TAU_START * (TAU_DECAY_RATE ** start_episode)
+            learner.epsilon, learner.tau = exploration_at(start_episode)
             
             print(f"   Adjusted Params -> Eps: {learner.epsilon:.4f}, Tau: {learner.tau:.2e}")
     
@@ -201,6 +208,7 @@ async def main():
 
     print("Training finished.")
     learner.save_model(MODEL_FILE)
+    if learner.recorder is not None: learner.recorder.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
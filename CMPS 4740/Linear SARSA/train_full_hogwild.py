@@ -0,0 +1,197 @@
+import asyncio
+import os
+import csv
+import time
+import uuid
+import pickle
+import logging
+import traceback
+import argparse
+import numpy as np
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from train_full import MODEL_FILE, BATTLE_TIMEOUT, RECORD_DIR, exploration_at, get_start_stats, log_stats, make_extractor
+
+# --- CONFIGURATION ---
+CONCURRENT_PER_WORKER = 4  # Battles each worker process keeps in flight
+SNAPSHOT_SECONDS = 120     # Copy the shared weights to MODEL_FILE this often
+REPORT_SECONDS = 30
+BENCH_WARMUP = 15          # Seconds for workers to log in before the benchmark clock starts
+SCALING_LOG = "logs/hogwild_scaling_full.csv"
+
+# Hogwild (Recht et al. 2011): every worker process reads and updates one weight vector
+# in shared memory with no locks. Updates touch ~18 of 664 entries (sparse phi; a similar
+# count of 2^k with train_full.HASH_BITS), so conflicting writes are rare and an
+# occasional lost update is tolerated.
+
+# terminal the following first:
+# node pokemon-showdown start --no-security
+
+def get_unique_player_class(base_class, prefix, run_uuid):
+    return type(f"{prefix}{run_uuid}", (base_class,), {})
+
+def save_snapshot(weights, path, feature_version):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f:
+        pickle.dump({'weights': weights.copy(), 'feature_version': feature_version}, f) # Same format as LinearSARSAPlayer.save_model
+    os.replace(tmp, path)
+
+# --- WORKER ---
+async def worker_loop(worker_id, shm_name, dim, counters, stop, start_ep, concurrent):
+    from poke_env.player import SimpleHeuristicsPlayer
+    from poke_env.ps_client.server_configuration import LocalhostServerConfiguration
+    from sarsa_player_full import LinearSARSAPlayer
+    from worker_state import release_finished
+
+    logging.getLogger("poke_env").setLevel(logging.ERROR)
+    logging.getLogger("asyncio").setLevel(logging.ERROR)
+    run_uuid = f"{worker_id}{uuid.uuid4().hex[:6]}" # Usernames must differ across processes
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    learner = get_unique_player_class(LinearSARSAPlayer, "HW", run_uuid)(
+        battle_format="gen1randombattle", server_configuration=LocalhostServerConfiguration,
+        alpha=0.001, gamma=0.99, extractor=make_extractor(), max_concurrent_battles=concurrent)
+    # get_q / update_weights index this array in place, so every update lands in shared memory
+    learner.weights = np.ndarray((dim,), dtype=np.float64, buffer=shm.buf)
+    if RECORD_DIR: # Each worker writes its own chunk files and index in the shared directory
+        from battle_log import BattleLogWriter
+        learner.record_to(BattleLogWriter(RECORD_DIR))
+    opponent = get_unique_player_class(SimpleHeuristicsPlayer, "HO", run_uuid)(
+        battle_format="gen1randombattle", server_configuration=LocalhostServerConfiguration,
+        max_concurrent_battles=concurrent)
+    learner.logger.setLevel(logging.ERROR)
+    opponent.logger.setLevel(logging.ERROR)
+
+    while not stop.is_set():
+        learner.epsilon, learner.tau = exploration_at(start_ep + counters['battles'].value)
+        try:
+            await asyncio.wait_for(learner.battle_against(opponent, n_battles=concurrent), timeout=BATTLE_TIMEOUT)
+        except asyncio.TimeoutError:
+            print(f"⚠️ Worker {worker_id} timed out. Skipping...")
+        except Exception:
+            print(f"⚠️ Worker {worker_id} battle error:")
+            traceback.print_exc() # Keep going; a worker that fails every chunk shows up here
+        # Counts only what finished, and frees it: poke_env would hold every battle forever
+        finished, won = release_finished(learner)
+        release_finished(opponent)
+        with counters['battles'].get_lock(): counters['battles'].value += finished
+        with counters['wins'].get_lock(): counters['wins'].value += won
+
+    if learner.recorder is not None: learner.recorder.close()
+    del learner.weights # Release the view before detaching
+    shm.close()
+
+def worker_main(*args):
+    try:
+        asyncio.run(worker_loop(*args))
+    except KeyboardInterrupt:
+        pass
+
+# --- DRIVER ---
+class SharedWeights:
+    def __init__(self, init):
+        self.shm = shared_memory.SharedMemory(create=True, size=init.nbytes)
+        self.array = np.ndarray(init.shape, dtype=np.float64, buffer=self.shm.buf)
+        self.array[:] = init
+
+    def close(self):
+        del self.array
+        self.shm.close()
+        self.shm.unlink()
+
+def initial_weights():
+    from sarsa_player_full import LinearSARSAPlayer
+    player = LinearSARSAPlayer(battle_format="gen1randombattle", start_listening=False, extractor=make_extractor())
+    if os.path.exists(MODEL_FILE):
+        player.load_model(MODEL_FILE)
+    return np.asarray(player.weights, dtype=np.float64), player.extractor.feature_version
+
+def start_workers(ctx, n_workers, shared, counters, stop, start_ep, concurrent):
+    procs = []
+    for i in range(n_workers):
+        p = ctx.Process(target=worker_main, args=(i, shared.shm.name, shared.array.shape[0], counters, stop, start_ep, concurrent), daemon=True)
+        p.start()
+        procs.append(p)
+    return procs
+
+def stop_workers(procs, stop):
+    stop.set()
+    for p in procs: p.join(timeout=BATTLE_TIMEOUT)
+    for p in procs:
+        if p.is_alive(): p.terminate()
+
+def train(args):
+    start_ep, start_wins = get_start_stats()
+    init, feature_version = initial_weights()
+    shared = SharedWeights(init)
+    ctx = mp.get_context("spawn")
+    counters = {name: ctx.Value('q', 0) for name in ('battles', 'wins')}
+    stop = ctx.Event()
+
+    print(f"🚀 HOGWILD SARSA (FULL) x{args.workers} processes, {args.concurrent} battles each | Resuming from Episode {start_ep}")
+    procs = start_workers(ctx, args.workers, shared, counters, stop, start_ep, args.concurrent)
+
+    start_time = last_time = last_snapshot = time.time()
+    last_battles = last_wins = 0
+    try:
+        while start_ep + counters['battles'].value < args.episodes:
+            time.sleep(REPORT_SECONDS)
+            now = time.time()
+            battles, wins = counters['battles'].value, counters['wins'].value
+            delta = battles - last_battles
+            rolling_wr = (wins - last_wins) / delta if delta else 0.0
+            total = start_ep + battles
+            cumulative_wr = (start_wins + wins) / total if total else 0.0
+            epsilon, tau = exploration_at(total)
+            print(f"Ep {total}: Rolling {rolling_wr:.2%} | Overall {cumulative_wr:.2%} | Tau {tau:.2e} | Eps {epsilon:.3f} | Speed {delta / (now - last_time):.1f} bat/s | |w| {np.abs(shared.array).max():.2f}")
+            if delta: log_stats(total, cumulative_wr, tau, epsilon, "SimpleHeuristics")
+            last_time, last_battles, last_wins = now, battles, wins
+
+            if now - last_snapshot >= SNAPSHOT_SECONDS:
+                save_snapshot(shared.array, MODEL_FILE, feature_version)
+                last_snapshot = now
+    except KeyboardInterrupt:
+        print("\n🛑 Stopping workers...")
+    finally:
+        stop_workers(procs, stop)
+        save_snapshot(shared.array, MODEL_FILE, feature_version)
+        print(f"💾 Saved {MODEL_FILE} after {counters['battles'].value} battles in {time.time() - start_time:.0f}s")
+        shared.close()
+
+def benchmark(args):
+    """Battles/s for 1..N worker processes; every run starts from the same weights and saves nothing."""
+    init, _ = initial_weights()
+    ctx = mp.get_context("spawn")
+    results = []
+    print(f"--- HOGWILD SCALING BENCHMARK (1..{args.bench} processes, {args.bench_seconds}s each, {args.concurrent} battles/process) ---")
+    for n in range(1, args.bench + 1):
+        shared = SharedWeights(init)
+        counters = {name: ctx.Value('q', 0) for name in ('battles', 'wins')}
+        stop = ctx.Event()
+        procs = start_workers(ctx, n, shared, counters, stop, 0, args.concurrent)
+        time.sleep(BENCH_WARMUP)
+        b0, t0 = counters['battles'].value, time.time()
+        time.sleep(args.bench_seconds)
+        speed = (counters['battles'].value - b0) / (time.time() - t0)
+        stop_workers(procs, stop)
+        shared.close()
+
+        results.append(speed)
+        speedup = speed / results[0] if results[0] else 0.0
+        print(f"{n:2d} procs | {speed:7.2f} bat/s | x{speedup:4.2f} | efficiency {speedup / n:.0%}")
+        file_exists = os.path.isfile(SCALING_LOG)
+        with open(SCALING_LOG, mode='a', newline='') as f:
+            writer = csv.writer(f)
+            if not file_exists: writer.writerow(['Processes', 'BattlesPerSec', 'Speedup', 'ConcurrentPerProcess'])
+            writer.writerow([n, f"{speed:.3f}", f"{speedup:.3f}", args.concurrent])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) - 1))
+    parser.add_argument("--concurrent", type=int, default=CONCURRENT_PER_WORKER)
+    parser.add_argument("--episodes", type=int, default=1000000)
+    parser.add_argument("--bench", type=int, default=0, help="Run the 1..N process scaling benchmark instead of training")
+    parser.add_argument("--bench_seconds", type=int, default=60)
+    args = parser.parse_args()
+    if args.bench: benchmark(args)
+    else: train(args)
@@ -0,0 +1,52 @@
+import os
+import time
+import argparse
+from sarsa_player_full import LinearSARSAPlayer
+from battle_log import read_index, iter_battles, replay_battles
+from train_full import MODEL_FILE, SAVE_INTERVAL, make_extractor
+
+# --- CONFIG ---
+LOG_DIR = "battle_logs"
+ALPHA = 0.001
+GAMMA = 0.99
+REPORT_EVERY = 1000
+
+def main(args):
+    # Pinned to the logged actions; epsilon 0 and a tiny tau make a replay miss greedy
+    learner = LinearSARSAPlayer(battle_format="gen1randombattle", start_listening=False,
+                                alpha=args.alpha, gamma=GAMMA, tau=1e-6, epsilon=0.0,
+                                extractor=make_extractor())
+    if os.path.exists(MODEL_FILE):
+        learner.load_model(MODEL_FILE)
+
+    n_logged = len(read_index(args.logs))
+    if args.limit is not None: n_logged = min(n_logged, args.limit)
+    print(f"--- SARSA OFFLINE REPLAY: {n_logged} battles x {args.epochs} epoch(s) from {args.logs} -> {MODEL_FILE} ---")
+
+    done = [0]
+    start_time = time.time()
+    def after_battle(player, battle):
+        done[0] += 1
+        if done[0] % SAVE_INTERVAL == 0: player.save_model(MODEL_FILE)
+        if done[0] % REPORT_EVERY == 0:
+            speed = done[0] / (time.time() - start_time)
+            print(f"Bat {done[0]}: Misses {player.replay_misses} | Speed {speed:.1f}/s")
+
+    for epoch in range(args.epochs):
+        epoch_start = time.time()
+        stats = replay_battles(learner, iter_battles(args.logs, args.limit), after_battle)
+        elapsed = time.time() - epoch_start
+        win_rate = stats['wins'] / stats['battles'] if stats['battles'] else 0.0
+        print(f"✅ Epoch {epoch + 1}: {stats['battles']} battles, {stats['decisions']} decisions in {elapsed:.1f}s "
+              f"({stats['battles'] / max(elapsed, 1e-9):.1f} bat/s) | Logged win rate {win_rate:.2%} | Misses {learner.replay_misses}")
+
+    learner.save_model(MODEL_FILE)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the full Linear SARSA model from battle logs without a server.")
+    parser.add_argument("--logs", type=str, default=LOG_DIR)
+    parser.add_argument("--epochs", type=int, default=1)
+    parser.add_argument("--limit", type=int, default=None, help="Replay only the first N logged battles")
+    parser.add_argument("--alpha", type=float, default=ALPHA)
+    args = parser.parse_args()
+    main(args)
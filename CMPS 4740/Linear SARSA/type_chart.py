@@ -0,0 +1,119 @@
+import time
+import numpy as np
+from poke_env.battle.pokemon_type import PokemonType
+
+# --- TYPE CHART ---
+# Matrices are indexed by PokemonType enum value (ordinal) for both the attacking and the
+# defending type. Index 0 is "no type" (missing second type / unknown), and it is neutral
+# along with every type the generation does not have, matching the old dict .get(..., 1.0).
+GEN1_TYPES = [
+    'NORMAL', 'FIRE', 'WATER', 'ELECTRIC', 'GRASS', 'ICE',
+    'FIGHTING', 'POISON', 'GROUND', 'FLYING', 'PSYCHIC',
+    'BUG', 'ROCK', 'GHOST', 'DRAGON'
+]
+
+# (attacking, defending): multiplier. Only non-neutral entries.
+GEN1_CHART = {
+    ('NORMAL', 'GHOST'): 0.0, ('NORMAL', 'ROCK'): 0.5,
+    ('FIRE', 'FIRE'): 0.5, ('FIRE', 'WATER'): 0.5, ('FIRE', 'GRASS'): 2.0, ('FIRE', 'ICE'): 2.0, ('FIRE', 'BUG'): 2.0, ('FIRE', 'ROCK'): 0.5, ('FIRE', 'DRAGON'): 0.5,
+    ('WATER', 'FIRE'): 2.0, ('WATER', 'WATER'): 0.5, ('WATER', 'GRASS'): 0.5, ('WATER', 'GROUND'): 2.0, ('WATER', 'ROCK'): 2.0, ('WATER', 'DRAGON'): 0.5,
+    ('ELECTRIC', 'WATER'): 2.0, ('ELECTRIC', 'ELECTRIC'): 0.5, ('ELECTRIC', 'GRASS'): 0.5, ('ELECTRIC', 'GROUND'): 0.0, ('ELECTRIC', 'FLYING'): 2.0, ('ELECTRIC', 'DRAGON'): 0.5,
+    ('GRASS', 'FIRE'): 0.5, ('GRASS', 'WATER'): 2.0, ('GRASS', 'GRASS'): 0.5, ('GRASS', 'POISON'): 0.5, ('GRASS', 'GROUND'): 2.0, ('GRASS', 'FLYING'): 0.5, ('GRASS', 'BUG'): 0.5, ('GRASS', 'ROCK'): 2.0, ('GRASS', 'DRAGON'): 0.5,
+    ('ICE', 'WATER'): 0.5, ('ICE', 'GRASS'): 2.0, ('ICE', 'ICE'): 0.5, ('ICE', 'GROUND'): 2.0, ('ICE', 'FLYING'): 2.0, ('ICE', 'DRAGON'): 2.0,
+    ('FIGHTING', 'NORMAL'): 2.0, ('FIGHTING', 'ICE'): 2.0, ('FIGHTING', 'POISON'): 0.5, ('FIGHTING', 'FLYING'): 0.5, ('FIGHTING', 'PSYCHIC'): 0.5, ('FIGHTING', 'BUG'): 0.5, ('FIGHTING', 'ROCK'): 2.0, ('FIGHTING', 'GHOST'): 0.0,
+    ('POISON', 'GRASS'): 2.0, ('POISON', 'POISON'): 0.5, ('POISON', 'GROUND'): 0.5, ('POISON', 'BUG'): 2.0, ('POISON', 'ROCK'): 0.5, ('POISON', 'GHOST'): 0.5,
+    ('GROUND', 'FIRE'): 2.0, ('GROUND', 'ELECTRIC'): 2.0, ('GROUND', 'GRASS'): 0.5, ('GROUND', 'POISON'): 2.0, ('GROUND', 'FLYING'): 0.0, ('GROUND', 'BUG'): 0.5, ('GROUND', 'ROCK'): 2.0,
+    ('FLYING', 'ELECTRIC'): 0.5, ('FLYING', 'GRASS'): 2.0, ('FLYING', 'FIGHTING'): 2.0, ('FLYING', 'BUG'): 2.0, ('FLYING', 'ROCK'): 0.5,
+    ('PSYCHIC', 'FIGHTING'): 2.0, ('PSYCHIC', 'POISON'): 2.0, ('PSYCHIC', 'PSYCHIC'): 0.5,
+    ('BUG', 'FIRE'): 0.5, ('BUG', 'GRASS'): 2.0, ('BUG', 'FIGHTING'): 0.5, ('BUG', 'POISON'): 2.0, ('BUG', 'FLYING'): 0.5, ('BUG', 'GHOST'): 0.5,
+    ('ROCK', 'FIRE'): 2.0, ('ROCK', 'ICE'): 2.0, ('ROCK', 'FIGHTING'): 0.5, ('ROCK', 'GROUND'): 0.5, ('ROCK', 'FLYING'): 2.0, ('ROCK', 'BUG'): 2.0,
+    ('GHOST', 'NORMAL'): 0.0, ('GHOST', 'PSYCHIC'): 0.0, ('GHOST', 'GHOST'): 2.0,
+    ('DRAGON', 'DRAGON'): 2.0
+}
+
+# Gen 2-5 add DARK and STEEL (17 types); FAIRY arrives in gen 6
+GEN4_TYPES = GEN1_TYPES + ['DARK', 'STEEL']
+
+N_ORDINALS = max(t.value for t in PokemonType) + 1
+_ORDINALS = {t.name: t.value for t in PokemonType}
+# One dict for every spelling callers use: the enum itself, 'FIRE', 'Fire', 'fire'
+_LOOKUP = {}
+for _t in PokemonType:
+    _LOOKUP.update({_t: _t.value, _t.name: _t.value, _t.name.title(): _t.value, _t.name.lower(): _t.value})
+
+def ordinal(t):
+    """PokemonType, type name or None -> matrix index (0 = no type / unknown)."""
+    return _LOOKUP.get(t, 0)
+
+def build_matrix(chart):
+    matrix = np.ones((N_ORDINALS, N_ORDINALS), dtype=np.float32)
+    for (atk, dfn), mult in chart.items():
+        matrix[_ORDINALS[atk], _ORDINALS[dfn]] = mult
+    return matrix
+
+def _chart_from_gen_data(gen, types):
+    from poke_env.data import GenData
+    type_chart = GenData.from_gen(gen).type_chart # {defending: {attacking: mult}}
+    return {(atk, dfn): float(type_chart[dfn][atk]) for atk in types for dfn in types}
+
+_MATRICES = {1: build_matrix(GEN1_CHART)}
+_ROWS = {}
+
+def chart_matrix(gen=1):
+    """Dense float32 (N_ORDINALS, N_ORDINALS) chart: [attacking ordinal, defending ordinal]."""
+    matrix = _MATRICES.get(gen)
+    if matrix is None:
+        matrix = _MATRICES[gen] = build_matrix(_chart_from_gen_data(gen, GEN4_TYPES))
+    return matrix
+
+def effectiveness(move_types, def_types, gen=1):
+    """
+    Batched lookup. move_types: (n,) attacking ordinals; def_types: (n, 2) defending
+    ordinals (0 for a missing second type). Returns float32 (n,) multipliers.
+    """
+    matrix = chart_matrix(gen)
+    move_types = np.asarray(move_types, dtype=np.intp)
+    def_types = np.asarray(def_types, dtype=np.intp)
+    return matrix[move_types, def_types[..., 0]] * matrix[move_types, def_types[..., 1]]
+
+def type_effectiveness(move_type, def_type1, def_type2=None, gen=1):
+    """Scalar lookup for a single move against one or two defending types."""
+    if not move_type or not def_type1: return 1.0
+    rows = _ROWS.get(gen)
+    if rows is None: rows = _ROWS[gen] = chart_matrix(gen).tolist() # Plain lists index faster than NumPy scalars
+    row = rows[_LOOKUP.get(move_type, 0)]
+    return row[_LOOKUP.get(def_type1, 0)] * row[_LOOKUP.get(def_type2, 0)]
+
+def _dict_effectiveness(move_type, def_type1, def_type2=None):
+    """The old per-extractor dict lookup, kept for the benchmark."""
+    m_t = move_type.upper()
+    eff = GEN1_CHART.get((m_t, def_type1.upper()), 1.0)
+    if def_type2: eff *= GEN1_CHART.get((m_t, def_type2.upper()), 1.0)
+    return eff
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    types = [PokemonType[t] for t in GEN1_TYPES]
+    n = 100000
+    moves = [types[i] for i in rng.integers(0, len(types), n)]
+    defs = [(types[i], types[j] if j < len(types) else None) for i, j in zip(rng.integers(0, len(types), n), rng.integers(0, len(types) + 5, n))]
+
+    start = time.perf_counter()
+    old = [_dict_effectiveness(m.name, d1.name, d2.name if d2 else None) for m, (d1, d2) in zip(moves, defs)]
+    t_dict = time.perf_counter() - start
+
+    start = time.perf_counter()
+    new = [type_effectiveness(m, d1, d2) for m, (d1, d2) in zip(moves, defs)]
+    t_scalar = time.perf_counter() - start
+
+    m_ord = np.array([m.value for m in moves])
+    d_ord = np.array([(d1.value, ordinal(d2)) for d1, d2 in defs])
+    start = time.perf_counter()
+    batched = effectiveness(m_ord, d_ord)
+    t_batch = time.perf_counter() - start
+
+    assert old == new and np.array_equal(np.array(old, dtype=np.float32), batched)
+    print(f"--- TYPE CHART BENCHMARK ({n} lookups) ---")
+    print(f"dict + upper() : {t_dict / n * 1e9:7.1f} ns/lookup")
+    print(f"matrix scalar  : {t_scalar / n * 1e9:7.1f} ns/lookup")
+    print(f"matrix batched : {t_batch / n * 1e9:7.1f} ns/lookup")
@@ -0,0 +1,145 @@
+import time
+import asyncio
+import traceback
+from collections import Counter
+
+# --- CONFIG ---
+STALL_SECONDS = 10.0 # No protocol message for this long in an unfinished battle = stuck
+ABANDON_SECONDS = 10.0 # After /forfeit, how long the server gets to end the battle before we leave it locally
+CHECK_INTERVAL = 1.0
+CAUSES = ('unanswered_request', 'invalid_choice', 'server_silent')
+
+class BattleWatchdog:
+    """
+    Per-battle stall detection for training workers, on poke_env's loop. A battle that
+    has received no protocol message for stall_seconds is forfeited (the server then ends
+    it for both sides through the normal |win| path); one the server still hasn't ended
+    abandon_seconds later is finished locally and left, which frees the player's
+    battle slot so battle_against() returns. The server can still end an abandoned battle
+    after that; poke_env would then wait on the slot a second time and hang the loop, so
+    every later frame for an abandoned battle is dropped. Either way the learner's traces for it are
+    dropped and the process keeps running. Stalls are counted by cause:
+      unanswered_request  a side received a |request| and never sent /choose
+      invalid_choice      the last thing a side heard was [Invalid choice]
+      server_silent       every side had answered; the server or opponent went quiet
+    and, per watched player, by outcome: forfeit_ended or abandoned.
+    """
+    def __init__(self, *players, stall_seconds=STALL_SECONDS, abandon_seconds=ABANDON_SECONDS, interval=CHECK_INTERVAL):
+        self.players = players
+        self.stall_seconds = stall_seconds
+        self.abandon_seconds = abandon_seconds
+        self.interval = interval
+        self.last_message = {} # battle_tag -> monotonic time of the last frame any player got
+        self.last_event = {} # battle_tag -> {username: 'request' / 'choice' / 'invalid'}
+        self.forfeited = {} # battle_tag -> monotonic time /forfeit was sent
+        self.settled = set() # (username, battle_tag) of forfeited battles already counted
+        self.abandoned = set() # (username, battle_tag) finished locally; kept for the run (rare, and late frames can come any time)
+        self.counts = Counter()
+        self._future = None
+        for player in players: self._attach(player)
+
+    @property
+    def worst_case(self):
+        """Longest a stuck battle can hold up battle_against() before the watchdog frees it."""
+        return self.stall_seconds + self.abandon_seconds + 2 * self.interval
+
+    def _attach(self, player):
+        client = player.ps_client
+        on_battle_message = client._on_battle_message
+        send_message = client.send_message
+
+        async def stamped_battle_message(split_messages):
+            tag = split_messages[0][0][1:]
+            if (player.username, tag) in self.abandoned: return # Its slot was already freed; a late |win| would block on it
+            self.last_message[tag] = time.monotonic()
+            for message in split_messages[1:]:
+                if len(message) < 3: continue
+                if message[1] == 'request' and message[2].startswith('{') and '"wait":true' not in message[2]:
+                    self.last_event.setdefault(tag, {})[player.username] = 'request'
+                elif message[1] == 'error' and message[2].startswith('[Invalid choice]'):
+                    self.last_event.setdefault(tag, {})[player.username] = 'invalid'
+            await on_battle_message(split_messages)
+
+        async def stamped_send_message(message, room="", message_2=None):
+            if room and message.startswith("/choose"):
+                self.last_event.setdefault(room, {})[player.username] = 'choice'
+            await send_message(message, room, message_2)
+
+        client._on_battle_message = stamped_battle_message
+        client.send_message = stamped_send_message
+
+    def _cause(self, tag):
+        events = self.last_event.get(tag, {}).values()
+        if 'invalid' in events: return 'invalid_choice'
+        if 'request' in events: return 'unanswered_request'
+        return 'server_silent'
+
+    def _holders(self, tag):
+        return [(player, player._battles[tag]) for player in self.players if tag in player._battles]
+
+    async def _forfeit(self, player, tag):
+        cause = self._cause(tag)
+        self.counts[cause] += 1
+        self.forfeited[tag] = time.monotonic()
+        print(f"\n⚠️ Watchdog: {tag} silent for {self.stall_seconds:.0f}s ({cause}). Forfeiting.")
+        for holder, _ in self._holders(tag):
+            if hasattr(holder, 'drop_context'): holder.drop_context(tag) # No terminal update for a forfeit
+        await player.ps_client.send_message("/forfeit", tag)
+
+    def _settle(self, player, tag, outcome):
+        self.counts[outcome] += 1
+        self.settled.add((player.username, tag))
+        if all(battle.finished for _, battle in self._holders(tag)):
+            del self.forfeited[tag]
+            self.settled -= {(holder.username, tag) for holder in self.players}
+
+    async def _abandon(self, tag):
+        for player, battle in self._holders(tag):
+            if battle.finished: continue
+            self.abandoned.add((player.username, tag))
+            battle.tied() # Finished locally, neither won nor lost, so release_finished() frees it
+            try:
+                player._battle_count_queue.get_nowait() # The slot |win| would have freed
+                player._battle_count_queue.task_done()
+            except asyncio.QueueEmpty:
+                pass
+            async with player._battle_end_condition:
+                player._battle_end_condition.notify_all()
+            await player.ps_client.send_message(f"/leave {tag}")
+            self._settle(player, tag, 'abandoned')
+
+    async def check(self):
+        now = time.monotonic()
+        for player in self.players:
+            for tag, battle in list(player._battles.items()):
+                if battle.finished:
+                    if tag in self.forfeited and (player.username, tag) not in self.settled:
+                        self._settle(player, tag, 'forfeit_ended')
+                elif tag in self.forfeited:
+                    if now - self.forfeited[tag] >= self.abandon_seconds: await self._abandon(tag)
+                elif now - self.last_message.setdefault(tag, now) >= self.stall_seconds:
+                    await self._forfeit(player, tag)
+
+        live = set().union(*(player._battles for player in self.players))
+        for tag in [tag for tag in self.last_message if tag not in live]: # Released by release_finished()
+            self.last_message.pop(tag)
+            self.last_event.pop(tag, None)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.check()
+            except Exception:
+                traceback.print_exc() # Keep watching
+
+    def start(self):
+        loop = self.players[0].ps_client.loop
+        self._future = asyncio.run_coroutine_threadsafe(self._run(), loop)
+
+    def stop(self):
+        if self._future is not None: self._future.cancel()
+
+    def metrics(self):
+        """Cumulative counts, always the same keys (for CSV logging)."""
+        return {name: self.counts[name] for name in CAUSES + ('forfeit_ended', 'abandoned', 'chunk_timeouts')}
@@ -0,0 +1,742 @@
+import os
+import json
+import time
+import random
+import argparse
+import traceback
+from collections import Counter
+
+from poke_env.data import GenData
+from poke_env.battle.pokemon_type import PokemonType
+from poke_env.battle.move_category import MoveCategory
+from poke_env.battle.status import Status
+
+# --- CONFIG ---
+GEN = 1
+TEAM_SIZE = 6
+MAX_TURNS = 500
+PARITY_TOLERANCE = 0.015 # 1.5% HP slack when comparing damage rolls
+
+# Gen 1 treats the category as a property of the type
+SPECIAL_TYPES = {
+    PokemonType.FIRE, PokemonType.WATER, PokemonType.GRASS, PokemonType.ICE,
+    PokemonType.ELECTRIC, PokemonType.PSYCHIC, PokemonType.DRAGON
+}
+BOOST_TABLE = [25, 28, 33, 40, 50, 66, 100, 150, 200, 250, 300, 350, 400]
+STATUS_MAP = {
+    'brn': Status.BRN, 'frz': Status.FRZ, 'par': Status.PAR,
+    'psn': Status.PSN, 'slp': Status.SLP, 'tox': Status.TOX
+}
+HIGH_CRIT_MOVES = {'slash', 'razorleaf', 'crabhammer', 'karatechop'}
+
+_DATA = None
+
+def get_data():
+    global _DATA
+    if _DATA is None: _DATA = GenData.from_gen(GEN)
+    return _DATA
+
+def to_id(name):
+    return ''.join(c for c in name.lower() if c.isalnum())
+
+def gen1_species_pool():
+    pool = []
+    for species, entry in get_data().pokedex.items():
+        if 1 <= entry.get('num', 0) <= 151 and 'forme' not in entry and species != 'missingno':
+            pool.append(species)
+    return sorted(pool)
+
+def calc_stat(base, level, is_hp=False):
+    # DV 15, max stat exp (floor(ceil(sqrt(65535)) / 4) = 63)
+    core = ((base + 15) * 2 + 63) * level // 100
+    return core + level + 10 if is_hp else core + 5
+
+def random_level(base_stats):
+    # Rough stand-in for Showdown's tiered levels: weaker species get higher levels
+    bst = sum(base_stats.values())
+    return max(60, min(100, int(round(88 + (420 - bst) / 10))))
+
+
+class SimMove:
+    """Mirrors the poke_env Move attributes our extractors and heuristics read."""
+    def __init__(self, move_id):
+        self.id = move_id
+        self.entry = get_data().moves[move_id]
+        self.type = PokemonType.from_name(self.entry['type'])
+        self.base_power = self.entry.get('basePower', 0)
+        acc = self.entry.get('accuracy', True)
+        self.accuracy = 1.0 if acc is True else acc / 100.0
+        self.priority = self.entry.get('priority', 0)
+        self.max_pp = self.entry.get('pp', 10) * 8 // 5
+        self.current_pp = self.max_pp
+
+        status = self.entry.get('status')
+        self.status = STATUS_MAP.get(status) if status else None
+        self.volatile_status = self.entry.get('volatileStatus')
+        self.boosts = self.entry.get('boosts')
+        self.self_boost = (self.entry.get('self') or {}).get('boosts')
+        self.heal = self.entry.get('heal')
+        self.drain = self.entry.get('drain')
+        self.recoil = self.entry.get('recoil')
+        self.secondary = self.entry.get('secondary')
+        self.multihit = self.entry.get('multihit')
+
+    @property
+    def category(self):
+        if self.entry.get('category') == 'Status': return MoveCategory.STATUS
+        return MoveCategory.SPECIAL if self.type in SPECIAL_TYPES else MoveCategory.PHYSICAL
+
+    @property
+    def expected_hits(self):
+        if self.id == 'triplekick': return 1 + 2 * 0.9 + 3 * 0.81
+        if isinstance(self.multihit, list):
+            lo, hi = self.multihit
+            return (2 + 3) / 3 + (4 + 5) / 6 if (lo, hi) == (2, 5) else (lo + hi) / 2
+        return self.multihit or 1
+
+    def __repr__(self):
+        return f"SimMove({self.id})"
+
+
+class SimPokemon:
+    """Mirrors the poke_env Pokemon attributes read by the feature extractors."""
+    def __init__(self, species, level=None, move_ids=None):
+        entry = get_data().pokedex[species]
+        self.species = species
+        self.name = entry.get('name', species)
+        self.base_stats = dict(entry['baseStats'])
+        self.level = level or random_level(self.base_stats)
+        types = [PokemonType.from_name(t) for t in entry['types']]
+        self.type_1 = types[0]
+        self.type_2 = types[1] if len(types) > 1 else None
+        self.ability = None
+        self.item = None
+
+        self.stats = {k: calc_stat(v, self.level, k == 'hp') for k, v in self.base_stats.items()}
+        self.max_hp = self.stats['hp']
+        self.current_hp = self.max_hp
+        self.status = None
+        self.status_counter = 0
+        self.boosts = {'accuracy': 0, 'atk': 0, 'def': 0, 'evasion': 0, 'spa': 0, 'spd': 0, 'spe': 0}
+        self.effects = {}
+        self.active = False
+        self.revealed = False
+        self.must_recharge = False
+        self.moves = {m: SimMove(m) for m in (move_ids or [])}
+
+    @property
+    def types(self):
+        return (self.type_1, self.type_2)
+
+    @property
+    def fainted(self):
+        return self.current_hp <= 0
+
+    @property
+    def current_hp_fraction(self):
+        return self.current_hp / self.max_hp if self.max_hp else 0.0
+
+    def damage_multiplier(self, type_or_move):
+        atk_type = getattr(type_or_move, 'type', type_or_move)
+        chart = get_data().type_chart
+        mult = 1.0
+        for def_type in self.types:
+            if def_type is not None:
+                mult *= chart.get(def_type.name, {}).get(atk_type.name, 1.0)
+        return mult
+
+    def boosted_stat(self, stat):
+        value = self.stats[stat] * BOOST_TABLE[self.boosts[stat] + 6] // 100
+        if stat == 'spe' and self.status == Status.PAR: value //= 4
+        if stat == 'atk' and self.status == Status.BRN: value //= 2
+        return max(1, value)
+
+    def switch_out(self):
+        self.active = False
+        self.boosts = {k: 0 for k in self.boosts}
+        self.effects = {}
+        self.must_recharge = False
+        if self.status == Status.TOX: self.status_counter = 0
+
+    def __repr__(self):
+        return f"SimPokemon({self.species}, {self.current_hp}/{self.max_hp})"
+
+
+_MOVE_POOLS = {}
+
+def _move_pool(species):
+    pool = _MOVE_POOLS.get(species)
+    if pool is not None: return pool
+    data = get_data()
+    learnset = data.learnset.get(species, {}).get('learnset', {})
+    legal = [m for m, src in learnset.items() if m in data.moves and any(s.startswith('1') for s in src)]
+    if not legal:
+        legal = [m for m in learnset if m in data.moves]
+    types = {t.lower() for t in data.pokedex[species]['types']}
+    attacks = [m for m in legal if data.moves[m].get('basePower', 0) > 0]
+    stab = [m for m in attacks if data.moves[m]['type'].lower() in types]
+    pool = (legal, attacks, stab)
+    _MOVE_POOLS[species] = pool
+    return pool
+
+def random_moveset(species, rng):
+    legal, attacks, stab = _move_pool(species)
+    if not legal:
+        return ['struggle']
+
+    picks = []
+    if stab: picks.append(rng.choice(stab))
+    elif attacks: picks.append(rng.choice(attacks))
+    rest = [m for m in legal if m not in picks]
+    picks.extend(rng.sample(rest, min(len(rest), 4 - len(picks))))
+    return picks
+
+def random_team(rng, pool):
+    team = []
+    for species in rng.sample(pool, TEAM_SIZE):
+        team.append(SimPokemon(species, move_ids=random_moveset(species, rng)))
+    return team
+
+
+class SimSide:
+    def __init__(self, role, team):
+        self.role = role
+        self.team = team
+        self.active = None
+
+    def switch_in(self, mon):
+        if self.active is not None: self.active.switch_out()
+        self.active = mon
+        mon.active = True
+        mon.revealed = True
+
+    def alive(self):
+        return [m for m in self.team if not m.fainted]
+
+
+class SimBattle:
+    """
+    One player's view of an engine battle. Exposes the attribute surface of
+    poke_env's Battle that AdvancedFeatureExtractor / FeatureExtractor / HeuristicEngine use.
+    """
+    def __init__(self, battle_tag, side, opp_side):
+        self.battle_tag = battle_tag
+        self.player_role = side.role
+        self.gen = GEN
+        self.turn = 0
+        self.won = None
+        self.finished = False
+        self._side = side
+        self._opp_side = opp_side
+        self.side_conditions = {}
+        self.opponent_side_conditions = {}
+        self.weather = {}
+        self.fields = {}
+
+    @property
+    def lost(self):
+        return None if self.won is None else not self.won
+
+    @property
+    def team(self):
+        return {f"{self._side.role}: {m.name}": m for m in self._side.team}
+
+    @property
+    def opponent_team(self):
+        return {f"{self._opp_side.role}: {m.name}": m for m in self._opp_side.team if m.revealed}
+
+    @property
+    def active_pokemon(self):
+        return self._side.active
+
+    @property
+    def opponent_active_pokemon(self):
+        return self._opp_side.active
+
+    @property
+    def force_switch(self):
+        return self._side.active is None or self._side.active.fainted
+
+    @property
+    def trapped(self):
+        return False
+
+    @property
+    def available_moves(self):
+        mon = self._side.active
+        if mon is None or mon.fainted: return []
+        moves = [m for m in mon.moves.values() if m.current_pp > 0]
+        return moves or [SimMove('struggle')]
+
+    @property
+    def available_switches(self):
+        return [m for m in self._side.team if not m.fainted and not m.active]
+
+
+# --- POLICIES (stand-ins for poke_env's baseline players) ---
+def random_policy(battle, rng=random):
+    options = battle.available_moves + battle.available_switches
+    return rng.choice(options) if options else None
+
+def max_bp_policy(battle, rng=random):
+    if battle.available_moves and not battle.force_switch:
+        return max(battle.available_moves, key=lambda m: m.base_power)
+    return random_policy(battle, rng)
+
+def heuristic_policy(battle, rng=random):
+    from player_v16 import HeuristicEngine
+    active = battle.active_pokemon
+    opponent = battle.opponent_active_pokemon
+    if battle.force_switch or not battle.available_moves:
+        if not battle.available_switches: return None
+        return max(battle.available_switches, key=lambda m: HeuristicEngine.get_switch_score(battle, m, opponent))
+    return max(battle.available_moves, key=lambda m: HeuristicEngine.get_move_score(battle, m, active, opponent))
+
+POLICIES = {'random': random_policy, 'maxbp': max_bp_policy, 'heuristic': heuristic_policy}
+
+
+class Gen1Engine:
+    """
+    In-process Gen 1 random battle simulator. Drives any poke_env Player (constructed with
+    start_listening=False) or a plain policy function without a Showdown server.
+
+    Approximations: random sets are sampled from the gen 1 learnset, and trapping moves,
+    Counter, Substitute, Transform, Mimic and Metronome only deal their listed damage (if any).
+    """
+    def __init__(self, seed=None):
+        self.rng = random.Random(seed)
+        self.pool = gen1_species_pool()
+        self.n_battles = 0
+
+    # --- DECISIONS ---
+    def _decide(self, agent, battle):
+        if hasattr(agent, 'choose_move'):
+            try:
+                order = agent.choose_move(battle)
+            except ValueError as e:
+                # poke_env's choose_random_move (the players' no-legal-order fallback) rejects
+                # non-Battle objects; a ValueError from anywhere else is a real bug
+                if traceback.extract_tb(e.__traceback__)[-1].name != 'choose_random_move': raise
+                order = random_policy(battle, self.rng)
+            choice = getattr(order, 'order', order)
+        else:
+            choice = agent(battle, self.rng)
+
+        legal = battle.available_switches if battle.force_switch else battle.available_moves + battle.available_switches
+        if choice not in legal and not (isinstance(choice, SimMove) and choice.id in {getattr(c, 'id', None) for c in legal}):
+            choice = self.rng.choice(legal) if legal else None
+        if isinstance(choice, SimMove) and battle.active_pokemon:
+            choice = battle.active_pokemon.moves.get(choice.id, choice)
+        return choice
+
+    # --- MECHANICS ---
+    def _can_act(self, mon):
+        if mon.must_recharge:
+            mon.must_recharge = False
+            return False
+        if mon.status == Status.SLP:
+            mon.status_counter -= 1
+            if mon.status_counter <= 0: mon.status = None
+            return False
+        if mon.status == Status.FRZ: return False
+        if mon.status == Status.PAR and self.rng.random() < 0.25: return False
+        return True
+
+    def _hit_check(self, move, user, target):
+        if move.entry.get('accuracy', True) is True: return True
+        acc = move.accuracy * BOOST_TABLE[user.boosts['accuracy'] + 6] / 100
+        acc = acc * 100 / BOOST_TABLE[target.boosts['evasion'] + 6]
+        # Gen 1 1/256 miss
+        return self.rng.random() < min(acc, 255 / 256)
+
+    def damage_range(self, move, user, target, crit=False):
+        """(min, max) damage for one hit, before accuracy. Used by both play and parity checks."""
+        fixed = move.entry.get('damage')
+        if fixed == 'level': return user.level, user.level
+        if isinstance(fixed, int): return fixed, fixed
+        if move.base_power <= 0: return 0, 0
+
+        eff = target.damage_multiplier(move.type)
+        if eff == 0: return 0, 0
+
+        special = move.category == MoveCategory.SPECIAL
+        a_stat, d_stat = ('spa', 'spd') if special else ('atk', 'def')
+        if crit:
+            atk, dfn = user.stats[a_stat], target.stats[d_stat]
+        else:
+            atk, dfn = user.boosted_stat(a_stat), target.boosted_stat(d_stat)
+        if atk > 255 or dfn > 255:
+            atk, dfn = max(1, atk // 4), max(1, dfn // 4)
+
+        level = user.level * (2 if crit else 1)
+        base = ((2 * level // 5 + 2) * move.base_power * atk // dfn) // 50 + 2
+        if move.type in user.types: base = base * 3 // 2
+        base = int(base * eff)
+        return max(1, base * 217 // 255), max(1, base)
+
+    def _apply_status(self, target, status_id):
+        status = STATUS_MAP.get(status_id)
+        if status is None or target.status is not None or target.fainted: return
+        if status in (Status.BRN, Status.FRZ) and move_type_blocks(target, status): return
+        target.status = status
+        target.status_counter = self.rng.randint(1, 7) if status == Status.SLP else 0
+
+    def _apply_boosts(self, mon, boosts):
+        for stat, amount in boosts.items():
+            if stat in mon.boosts:
+                mon.boosts[stat] = max(-6, min(6, mon.boosts[stat] + amount))
+
+    def _use_move(self, user, target, move):
+        if move.id != 'struggle': move.current_pp -= 1
+        if not self._hit_check(move, user, target): return
+
+        if move.category == MoveCategory.STATUS:
+            if move.status: self._apply_status(target, move.entry['status'])
+            if move.boosts:
+                self._apply_boosts(user if move.entry.get('target') == 'self' else target, move.boosts)
+            if move.heal:
+                user.current_hp = min(user.max_hp, user.current_hp + user.max_hp * move.heal[0] // move.heal[1])
+            if move.id == 'rest':
+                user.current_hp = user.max_hp
+                user.status, user.status_counter = Status.SLP, 2
+            if move.id == 'haze':
+                for mon in (user, target): mon.boosts = {k: 0 for k in mon.boosts}
+            return
+
+        crit_rate = user.base_stats['spe'] / 512 * (8 if move.id in HIGH_CRIT_MOVES else 1)
+        hits = 1
+        if isinstance(move.multihit, list):
+            hits = self.rng.choice([2, 2, 2, 3, 3, 3, 4, 5])
+        elif move.multihit:
+            hits = move.multihit
+
+        dealt = 0
+        for _ in range(hits):
+            lo, hi = self.damage_range(move, user, target, crit=self.rng.random() < min(crit_rate, 255 / 256))
+            if move.entry.get('ohko'):
+                lo = hi = target.current_hp if user.boosted_stat('spe') >= target.boosted_stat('spe') else 0
+            dmg = self.rng.randint(lo, hi) if hi > lo else hi
+            dmg = min(dmg, target.current_hp)
+            target.current_hp -= dmg
+            dealt += dmg
+            if target.fainted: break
+
+        if move.drain and dealt:
+            user.current_hp = min(user.max_hp, user.current_hp + max(1, dealt * move.drain[0] // move.drain[1]))
+        if move.recoil and dealt:
+            user.current_hp = max(0, user.current_hp - max(1, dealt * move.recoil[0] // move.recoil[1]))
+        if move.entry.get('selfdestruct'):
+            user.current_hp = 0
+        if move.self_boost:
+            self._apply_boosts(user, move.self_boost)
+        if move.entry.get('self', {}).get('volatileStatus') == 'mustrecharge' and not target.fainted:
+            user.must_recharge = True
+        if target.status == Status.FRZ and move.type == PokemonType.FIRE:
+            target.status = None
+
+        sec = move.secondary
+        if sec and not target.fainted and self.rng.random() * 100 < sec.get('chance', 100):
+            if sec.get('status'): self._apply_status(target, sec['status'])
+            if sec.get('boosts'): self._apply_boosts(target, sec['boosts'])
+
+    def _residual(self, mon):
+        if mon.fainted: return
+        if mon.status in (Status.BRN, Status.PSN):
+            mon.current_hp = max(0, mon.current_hp - max(1, mon.max_hp // 16))
+        elif mon.status == Status.TOX:
+            mon.status_counter += 1
+            mon.current_hp = max(0, mon.current_hp - max(1, mon.max_hp * mon.status_counter // 16))
+
+    def _order_moves(self, side_a, move_a, side_b, move_b):
+        def key(side, move):
+            return (move.priority, side.active.boosted_stat('spe'), self.rng.random())
+        if key(side_a, move_a) >= key(side_b, move_b):
+            return [(side_a, move_a, side_b), (side_b, move_b, side_a)]
+        return [(side_b, move_b, side_a), (side_a, move_a, side_b)]
+
+    # --- BATTLE LOOP ---
+    def play_battle(self, agent_1, agent_2):
+        self.n_battles += 1
+        tag = f"battle-gen1randombattle-sim{self.n_battles}"
+        side_1 = SimSide('p1', random_team(self.rng, self.pool))
+        side_2 = SimSide('p2', random_team(self.rng, self.pool))
+        view_1 = SimBattle(tag, side_1, side_2)
+        view_2 = SimBattle(tag, side_2, side_1)
+        side_1.switch_in(side_1.team[0])
+        side_2.switch_in(side_2.team[0])
+
+        pairs = [(agent_1, view_1, side_1), (agent_2, view_2, side_2)]
+        while view_1.turn < MAX_TURNS:
+            view_1.turn += 1
+            view_2.turn = view_1.turn
+
+            choices = [self._decide(agent, view) for agent, view, _ in pairs]
+
+            # Switches resolve before moves
+            moving = []
+            for (agent, view, side), choice in zip(pairs, choices):
+                if isinstance(choice, SimPokemon): side.switch_in(choice)
+                elif isinstance(choice, SimMove): moving.append((side, choice))
+
+            if len(moving) == 2:
+                order = self._order_moves(moving[0][0], moving[0][1], moving[1][0], moving[1][1])
+            else:
+                order = [(side, move, side_2 if side is side_1 else side_1) for side, move in moving]
+
+            for side, move, opp_side in order:
+                user, target = side.active, opp_side.active
+                if user.fainted or target is None: continue
+                if self._can_act(user): self._use_move(user, target, move)
+
+            for side in (side_1, side_2): self._residual(side.active)
+
+            if not side_1.alive() or not side_2.alive(): break
+
+            # Forced replacements happen between turns
+            for agent, view, side in pairs:
+                if side.active.fainted and side.alive():
+                    replacement = self._decide(agent, view)
+                    if not isinstance(replacement, SimPokemon):
+                        replacement = self.rng.choice(view.available_switches)
+                    side.switch_in(replacement)
+
+        won_1 = bool(side_1.alive()) and not side_2.alive()
+        won_2 = bool(side_2.alive()) and not side_1.alive()
+        for (agent, view, _), won in zip(pairs, (won_1, won_2)):
+            view.won = won
+            view.finished = True
+            self._notify_finished(agent, view, won)
+        return won_1
+
+    @staticmethod
+    def _notify_finished(agent, battle, won):
+        if hasattr(agent, '_battle_finished'):
+            # Older poke_env kept these counters on the Player; newer versions derive them from _battles
+            for counter in ('_n_finished_battles', '_n_won_battles'):
+                if not hasattr(agent, counter): setattr(agent, counter, 0)
+            agent._battle_finished(battle, won)
+        if hasattr(agent, 'battle_finished_callback'):
+            agent.battle_finished_callback(battle)
+
+    def play(self, agent_1, agent_2, n_battles):
+        wins = 0
+        start = time.time()
+        for _ in range(n_battles):
+            if self.play_battle(agent_1, agent_2): wins += 1
+        elapsed = time.time() - start
+        return {'battles': n_battles, 'wins': wins, 'seconds': elapsed,
+                'speed': n_battles / elapsed if elapsed > 0 else 0.0}
+
+
+def move_type_blocks(target, status):
+    # Fire types can't be burned, Ice types can't be frozen
+    if status == Status.BRN: return PokemonType.FIRE in target.types
+    if status == Status.FRZ: return PokemonType.ICE in target.types
+    return False
+
+
+# --- PARITY MODE ---
+def read_protocol_log(path):
+    """Accepts raw protocol logs (.log/.txt) and Showdown server logs (.log.json with a 'log' list)."""
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    if path.endswith('.json'):
+        data = json.loads(text)
+        lines = data.get('log', [])
+        if isinstance(lines, str): lines = lines.split('\n')
+        return lines
+    return text.split('\n')
+
+def _parse_hp(hp_status):
+    hp = hp_status.split()[0]
+    if hp == '0' or 'fnt' in hp_status: return 0.0
+    cur, _, mx = hp.partition('/')
+    return float(cur) / float(mx or 100)
+
+def _parse_details(details):
+    parts = [p.strip() for p in details.split(',')]
+    species = to_id(parts[0])
+    level = 100
+    for p in parts[1:]:
+        if p.startswith('L') and p[1:].isdigit(): level = int(p[1:])
+    return species, level
+
+class ParityChecker:
+    """
+    Replays recorded Showdown battles through the engine's damage / type / speed model
+    and counts every place where the recorded outcome is impossible under the engine.
+    """
+    def __init__(self, tolerance=PARITY_TOLERANCE, max_examples=20):
+        self.engine = Gen1Engine(seed=0)
+        self.tolerance = tolerance
+        self.max_examples = max_examples
+        self.checks = Counter()
+        self.mismatches = Counter()
+        self.examples = []
+
+    def _record(self, kind, ok, detail):
+        self.checks[kind] += 1
+        if not ok:
+            self.mismatches[kind] += 1
+            if len(self.examples) < self.max_examples: self.examples.append((kind, detail))
+
+    def check_log(self, path):
+        lines = read_protocol_log(path)
+        active = {}
+        hp = {}
+        pending = None     # (attacker_slot, move, target_slot, crit)
+        turn_moves = []
+        turn_switched = False
+
+        for raw in lines:
+            parts = raw.split('|')
+            if len(parts) < 2: continue
+            cmd = parts[1]
+
+            if cmd in ('switch', 'drag') and len(parts) >= 5:
+                slot = parts[2][:2]
+                species, level = _parse_details(parts[3])
+                if species not in get_data().pokedex: continue
+                mon = SimPokemon(species, level=level)
+                active[slot] = mon
+                hp[slot] = _parse_hp(parts[4])
+                mon.current_hp = max(1, int(round(hp[slot] * mon.max_hp)))
+                turn_switched = True
+                pending = None
+
+            elif cmd == 'turn':
+                if len(turn_moves) == 2 and not turn_switched:
+                    self._check_order(path, turn_moves, active)
+                turn_moves, turn_switched = [], False
+
+            elif cmd == 'move' and len(parts) >= 4:
+                slot = parts[2][:2]
+                move_id = to_id(parts[3])
+                target = parts[4][:2] if len(parts) > 4 and parts[4] else None
+                if slot in active and move_id in get_data().moves:
+                    move = SimMove(move_id)
+                    turn_moves.append((slot, move))
+                    pending = (slot, move, target, False) if target in active else None
+                else:
+                    pending = None
+
+            elif cmd == '-crit' and pending:
+                pending = pending[:3] + (True,)
+
+            elif cmd in ('-supereffective', '-resisted', '-immune') and pending:
+                _, move, target, _ = pending
+                eff = active[target].damage_multiplier(move.type)
+                expected = {'-supereffective': eff > 1, '-resisted': 0 < eff < 1, '-immune': eff == 0}[cmd]
+                self._record('effectiveness', expected, f"{path}: {move.id} vs {active[target].species} tag {cmd} engine x{eff}")
+
+            elif cmd == '-damage' and len(parts) >= 4:
+                slot = parts[2][:2]
+                new_hp = _parse_hp(parts[3])
+                from_effect = len(parts) > 4 and parts[4].startswith('[from]')
+                if pending and pending[2] == slot and not from_effect and slot in hp:
+                    attacker, move, target, crit = pending
+                    self._check_damage(path, active[attacker], active[target], move, crit, hp[slot] - new_hp, new_hp)
+                    pending = None
+                if slot in hp: hp[slot] = new_hp
+
+            elif cmd == '-heal' and len(parts) >= 4:
+                slot = parts[2][:2]
+                if slot in hp: hp[slot] = _parse_hp(parts[3])
+
+            elif cmd == '-boost' or cmd == '-unboost':
+                slot = parts[2][:2]
+                if slot in active and parts[3] in active[slot].boosts:
+                    amount = int(parts[4]) * (1 if cmd == '-boost' else -1)
+                    self.engine._apply_boosts(active[slot], {parts[3]: amount})
+
+            elif cmd == '-status' and len(parts) >= 4:
+                slot = parts[2][:2]
+                if slot in active: active[slot].status = STATUS_MAP.get(parts[3])
+
+            elif cmd == '-curestatus':
+                slot = parts[2][:2]
+                if slot in active: active[slot].status = None
+
+    def _check_damage(self, path, attacker, defender, move, crit, observed, new_hp):
+        if move.entry.get('ohko') or move.multihit or (move.base_power <= 0 and not move.entry.get('damage')):
+            return
+        lo, hi = self.engine.damage_range(move, attacker, defender, crit=crit)
+        lo_frac, hi_frac = lo / defender.max_hp, hi / defender.max_hp
+        # A KO can be caused by any roll above the remaining HP
+        if new_hp == 0:
+            ok = hi_frac + self.tolerance >= observed
+        else:
+            ok = lo_frac - self.tolerance <= observed <= hi_frac + self.tolerance
+        self._record('damage', ok, f"{path}: {attacker.species} {move.id} -> {defender.species} observed {observed:.1%} engine [{lo_frac:.1%}, {hi_frac:.1%}]{' crit' if crit else ''}")
+
+    def _check_order(self, path, turn_moves, active):
+        (first_slot, first_move), (second_slot, second_move) = turn_moves
+        if first_move.priority != second_move.priority:
+            ok = first_move.priority > second_move.priority
+        else:
+            s1 = active[first_slot].boosted_stat('spe')
+            s2 = active[second_slot].boosted_stat('spe')
+            ok = s1 >= s2
+        self._record('move_order', ok, f"{path}: {active[first_slot].species} moved before {active[second_slot].species}")
+
+    def report(self):
+        lines = ["--- PARITY REPORT ---"]
+        for kind in sorted(self.checks):
+            total = self.checks[kind]
+            bad = self.mismatches[kind]
+            lines.append(f"{kind:>14}: {total - bad}/{total} agree ({bad} mismatches)")
+        if self.examples:
+            lines.append("Examples:")
+            lines.extend(f"  [{kind}] {detail}" for kind, detail in self.examples)
+        return "\n".join(lines)
+
+def run_parity(log_dir):
+    checker = ParityChecker()
+    paths = []
+    for root, _, files in os.walk(log_dir):
+        paths.extend(os.path.join(root, f) for f in files if f.endswith(('.log', '.json', '.txt')))
+    for path in sorted(paths):
+        try:
+            checker.check_log(path)
+        except Exception as e:
+            print(f"⚠️ Skipping {path}: {e}")
+    print(f"Checked {len(paths)} logs.")
+    print(checker.report())
+    return checker
+
+
+# --- BENCHMARK / TRAINING ENTRY POINT ---
+def main(args):
+    if args.parity:
+        run_parity(args.parity)
+        return
+
+    engine = Gen1Engine(seed=args.seed)
+    opponent = POLICIES[args.opponent]
+    if args.learner == "v16":
+        from player_v16 import TabularQPlayerV16
+        learner = TabularQPlayerV16(battle_format="gen1randombattle", epsilon=args.epsilon, start_listening=False)
+        if args.table and os.path.exists(args.table): learner.load_table(args.table)
+    else:
+        learner = POLICIES[args.learner]
+
+    print(f"--- GEN 1 ENGINE: {args.learner} vs {args.opponent} ({args.battles} battles) ---")
+    stats = engine.play(learner, opponent, args.battles)
+    print(f"Win {stats['wins'] / stats['battles']:.2%} | Speed {stats['speed']:.1f}/s")
+    if args.learner == "v16": print(learner.extractor.cache_stats())
+
+    if args.learner == "v16" and args.table:
+        learner.checkpoint(args.table)
+        learner.wait_for_compaction()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--battles", type=int, default=1000)
+    parser.add_argument("--learner", type=str, default="v16", help="v16 or a policy name (random/maxbp/heuristic)")
+    parser.add_argument("--opponent", type=str, default="maxbp")
+    parser.add_argument("--epsilon", type=float, default=0.1)
+    parser.add_argument("--table", type=str, default=None)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--parity", type=str, default=None, help="Directory of recorded Showdown logs")
+    args = parser.parse_args()
+    main(args)
@@ -0,0 +1,423 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+import logging
+import argparse
+import itertools
+import multiprocessing as mp
+
+import websockets
+from gen1_engine import Gen1Engine, POLICIES, get_data, to_id
+
+# --- CONFIG ---
+HOST = "localhost"
+PORT = 8000 # Same endpoint as poke_env's LocalhostServerConfiguration
+FORMAT = "gen1randombattle"
+PLAYER_NAMES = ("MockP1", "MockP2") # Written into engine streams, swapped for the real usernames on replay
+STREAM_BATTLES = 200 # Engine streams generated at startup when no --streams file is given
+STREAM_POLICY = "maxbp"
+STREAM_SEED = 0
+
+# Mock Showdown server for client-side benchmarks: no Node, no simulator, no variance.
+# It speaks the slice of the protocol poke_env's PSClient uses (challstr -> /trn ->
+# updateuser, /challenge + /accept, /search, battle rooms, /choose) and replays pre-built
+# per-side battle streams as fast as the clients answer. A stream is the exact sequence
+# of websocket frames one player receives in a battle; a frame holding a |request| that
+# needs an answer blocks that side until its /choose arrives. The choice itself is not
+# simulated, so a battle costs the server one dict lookup and a send per frame.
+
+# --- STREAMS ---
+class StreamRecorder(Gen1Engine):
+    """
+    Gen1Engine that also writes every battle as the two per-side Showdown streams a server
+    would have sent: |init| header, |switch| / |move| / |-damage| / |faint| ... log frames
+    diffed from the engine state, and one |request| per decision.
+    """
+    def __init__(self, seed=None, names=PLAYER_NAMES):
+        super().__init__(seed=seed)
+        self.names = dict(zip(('p1', 'p2'), names))
+        self.streams = []
+
+    def play_battle(self, agent_1, agent_2):
+        self._sides = None # Set up at the first decision, once the engine has built them
+        self._log = []
+        self._frames = {'p1': [], 'p2': []}
+        won_1 = super().play_battle(agent_1, agent_2)
+
+        self._sync()
+        alive = {role: bool(side.alive()) for role, side in self._sides.items()}
+        if alive['p1'] != alive['p2']:
+            self._log.append(f"|win|{self.names['p1' if alive['p1'] else 'p2']}")
+        else:
+            self._log.append("|tie")
+        self._flush()
+        self.streams.append({'format': FORMAT, 'tag': self._tag, 'players': dict(self.names),
+                             'p1': self._frames['p1'], 'p2': self._frames['p2']})
+        return won_1
+
+    def _begin(self, battle):
+        self._tag = battle.battle_tag
+        self._sides = {battle._side.role: battle._side, battle._opp_side.role: battle._opp_side}
+        self._slots = {id(mon): f"{role}a: {mon.name}" for role, side in self._sides.items() for mon in side.team}
+        self._seen = {}
+        self._active = {}
+        self._turn = 0
+        self._rqid = 0
+        p1, p2 = self.names['p1'], self.names['p2']
+        self._log += ["|init|battle", f"|title|{p1} vs. {p2}", f"|j|☆{p1}", f"|j|☆{p2}", "|gametype|singles",
+                      f"|player|p1|{p1}|1|", f"|player|p2|{p2}|2|", "|teamsize|p1|6", "|teamsize|p2|6",
+                      "|gen|1", "|tier|[Gen 1] Random Battle", "|", "|start"]
+
+    # --- PROTOCOL FORMATTING ---
+    @staticmethod
+    def _details(mon):
+        return f"{mon.name}, L{mon.level}"
+
+    @staticmethod
+    def _condition(mon, exact):
+        if mon.fainted: return "0 fnt"
+        hp = f"{mon.current_hp}/{mon.max_hp}" if exact else f"{max(1, round(100 * mon.current_hp_fraction))}/100"
+        return f"{hp} {mon.status.name.lower()}" if mon.status else hp
+
+    @staticmethod
+    def _snapshot(mon):
+        return mon.current_hp, mon.status, tuple(mon.boosts.values())
+
+    def _sync(self):
+        """Append log lines for everything that changed since the last call."""
+        log = self._log
+        for role, side in self._sides.items():
+            mon = side.active
+            if mon is not self._active.get(role):
+                self._active[role] = mon
+                if mon is not None:
+                    log.append(f"|switch|{self._slots[id(mon)]}|{self._details(mon)}|{self._condition(mon, False)}")
+                    self._seen[id(mon)] = self._snapshot(mon)
+                continue
+            if mon is None: continue
+
+            slot = self._slots[id(mon)]
+            old_hp, old_status, old_boosts = self._seen[id(mon)]
+            if mon.current_hp != old_hp:
+                log.append(f"|{'-heal' if mon.current_hp > old_hp else '-damage'}|{slot}|{self._condition(mon, False)}")
+                if mon.fainted: log.append(f"|faint|{slot}")
+            if mon.status != old_status and not mon.fainted:
+                if mon.status is None: log.append(f"|-curestatus|{slot}|{old_status.name.lower()}")
+                else: log.append(f"|-status|{slot}|{mon.status.name.lower()}")
+            for stat, old, new in zip(mon.boosts, old_boosts, mon.boosts.values()):
+                if new != old: log.append(f"|{'-boost' if new > old else '-unboost'}|{slot}|{stat}|{abs(new - old)}")
+            self._seen[id(mon)] = self._snapshot(mon)
+
+    def _flush(self):
+        if not self._log: return
+        frame = f">{self._tag}\n" + "\n".join(self._log)
+        for frames in self._frames.values(): frames.append((frame, False))
+        self._log = []
+
+    def _request(self, battle):
+        side, role = battle._side, battle.player_role
+        pokemon = []
+        for mon in sorted(side.team, key=lambda m: not m.active): # Active mon first, as Showdown sends it
+            pokemon.append({
+                'ident': f"{role}: {mon.name}", 'details': self._details(mon), 'condition': self._condition(mon, True),
+                'active': mon.active, 'stats': {k: v for k, v in mon.stats.items() if k != 'hp'},
+                'moves': list(mon.moves), 'baseAbility': 'noability', 'item': '', 'pokeball': 'pokeball'})
+        self._rqid += 1
+        request = {'side': {'name': self.names[role], 'id': role, 'pokemon': pokemon}, 'rqid': self._rqid}
+        if battle.force_switch:
+            request['forceSwitch'] = [True]
+            request['noCancel'] = True
+        else:
+            moves = get_data().moves
+            request['active'] = [{'moves': [
+                {'move': moves[m.id]['name'], 'id': m.id, 'pp': m.current_pp, 'maxpp': m.max_pp,
+                 'target': moves[m.id].get('target', 'normal'), 'disabled': False} for m in battle.available_moves]}]
+        return f">{self._tag}\n|request|{json.dumps(request, separators=(',', ':'))}"
+
+    # --- ENGINE HOOKS ---
+    def _decide(self, agent, battle):
+        if self._sides is None: self._begin(battle)
+        self._sync()
+        if battle.turn != self._turn:
+            self._turn = battle.turn
+            self._log += ["|", f"|turn|{battle.turn}"]
+        self._flush()
+        self._frames[battle.player_role].append((self._request(battle), True))
+        return super()._decide(agent, battle)
+
+    def _can_act(self, mon):
+        self._sync()
+        status = mon.status
+        can = super()._can_act(mon)
+        if not can: self._log.append(f"|cant|{self._slots[id(mon)]}|{status.name.lower() if status else 'recharge'}")
+        self._sync()
+        return can
+
+    def _use_move(self, user, target, move):
+        self._sync()
+        self._log.append(f"|move|{self._slots[id(user)]}|{get_data().moves[move.id]['name']}|{self._slots[id(target)]}")
+        super()._use_move(user, target, move)
+        self._sync()
+
+    def _residual(self, mon):
+        self._sync()
+        super()._residual(mon)
+        self._sync()
+
+
+def record_streams(n_battles, seed=STREAM_SEED, policy=STREAM_POLICY):
+    recorder = StreamRecorder(seed=seed)
+    recorder.play(POLICIES[policy], POLICIES[policy], n_battles)
+    return recorder.streams
+
+def save_streams(streams, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        for stream in streams: f.write(json.dumps(stream) + "\n")
+
+def load_streams(path):
+    """JSONL, one battle per line: {'format', 'tag', 'players': {'p1', 'p2'}, 'p1': [[frame, needs_choice], ...], 'p2': ...},
+    or a battle_log.py directory. Either side may be missing (a recording of one player); those streams serve /search only."""
+    if os.path.isdir(path):
+        from battle_log import iter_battles
+        return list(iter_battles(path))
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+# --- SERVER ---
+class MockBattle:
+    def __init__(self, tag, stream, seats):
+        self.tag = tag
+        self.stream = stream
+        self.seats = seats # role -> MockUser
+        self.choices = {role: asyncio.Event() for role in seats}
+        self.subs = [(stream['tag'], tag)] + [(stream['players'][role], user.name) for role, user in seats.items()]
+        self.task = None
+
+    def render(self, frame):
+        for old, new in self.subs: frame = frame.replace(old, new)
+        return frame
+
+    async def _play_side(self, role, user, stats):
+        choice = self.choices[role]
+        for frame, needs_choice in self.stream[role]:
+            await user.conn.send(self.render(frame))
+            stats['frames'] += 1
+            if needs_choice:
+                await choice.wait()
+                choice.clear()
+
+    async def run(self, stats):
+        await asyncio.gather(*(self._play_side(role, user, stats) for role, user in self.seats.items()))
+
+    def role_of(self, user):
+        return next((role for role, seat in self.seats.items() if seat is user), None)
+
+class MockUser:
+    def __init__(self, conn, name):
+        self.conn = conn
+        self.name = name
+        self.id = to_id(name)
+
+class MockShowdownServer:
+    def __init__(self, streams, host=HOST, port=PORT):
+        self.streams = streams
+        self.duel_streams = itertools.cycle([s for s in streams if 'p1' in s and 'p2' in s] or [None])
+        self.solo_streams = itertools.cycle(streams)
+        self.host, self.port = host, port
+        self.users = {} # id -> MockUser
+        self.challenges = {} # challenged id -> [(challenger id, format)]
+        self.battles = {} # tag -> MockBattle
+        self.stats = {'battles': 0, 'finished': 0, 'frames': 0, 'choices': 0}
+        self._counter = itertools.count(1)
+
+    async def serve_forever(self):
+        async with websockets.serve(self._handler, self.host, self.port, max_queue=None, ping_interval=None):
+            print(f"🧪 Mock Showdown on ws://{self.host}:{self.port}/showdown/websocket | {len(self.streams)} streams")
+            await asyncio.Future()
+
+    async def _handler(self, conn):
+        user = None
+        await conn.send(f"|challstr|4|{uuid.uuid4().hex}")
+        try:
+            async for message in conn:
+                room, _, text = message.partition('|')
+                command, _, arg = text.partition(' ')
+                if command == '/trn':
+                    user = await self._login(conn, arg.split(',')[0])
+                elif user is None:
+                    continue
+                elif command == '/choose':
+                    battle = self.battles.get(room)
+                    role = battle.role_of(user) if battle else None
+                    if role:
+                        self.stats['choices'] += 1
+                        battle.choices[role].set()
+                elif command == '/challenge':
+                    await self._challenge(user, *[part.strip() for part in arg.split(',', 1)])
+                elif command == '/accept':
+                    await self._accept(user, to_id(arg))
+                elif command == '/search':
+                    self._start(arg.strip(), [user], self.solo_streams)
+                elif command == '/forfeit':
+                    await self._forfeit(room, user)
+                # /utm, /avatar, /timer, /leave, /cancelsearch: nothing to simulate
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            if user is not None and self.users.get(user.id) is user:
+                del self.users[user.id]
+                for battle in list(self.battles.values()):
+                    if battle.role_of(user) and battle.task: battle.task.cancel()
+
+    async def _login(self, conn, name):
+        if to_id(name) in self.users:
+            await conn.send(f"|nametaken|{name}|Someone is already using the name \"{name}\".")
+            return None
+        user = self.users[to_id(name)] = MockUser(conn, name)
+        await conn.send(f"|updateuser| {name}|1|1|{{}}")
+        return user
+
+    async def _challenge(self, user, opponent, format_=FORMAT):
+        target = self.users.get(to_id(opponent))
+        if target is None:
+            await user.conn.send(f"|popup|The user '{opponent}' was not found.")
+            return
+        self.challenges.setdefault(target.id, []).append((user.id, format_))
+        await target.conn.send(f"|pm| {user.name}| {target.name}|/challenge {format_}|{format_}|||")
+
+    async def _accept(self, user, challenger_id):
+        pending = self.challenges.get(user.id, [])
+        for i, (cid, format_) in enumerate(pending):
+            if cid == challenger_id and cid in self.users:
+                del pending[i]
+                if self._start(format_, [self.users[cid], user], self.duel_streams) is None:
+                    await user.conn.send("|popup|No two-sided streams loaded; use /search for one-sided recordings.")
+                return
+
+    def _start(self, format_, users, streams):
+        stream = next(streams)
+        if stream is None: return None
+        roles = ('p1', 'p2') if len(users) == 2 else [r for r in ('p1', 'p2') if r in stream][:1]
+        tag = f"battle-{stream.get('format', format_)}-mock{next(self._counter)}"
+        battle = self.battles[tag] = MockBattle(tag, stream, dict(zip(roles, users)))
+        battle.task = asyncio.create_task(battle.run(self.stats))
+        battle.task.add_done_callback(lambda task, tag=tag: self._finished(tag, task))
+        self.stats['battles'] += 1
+        return battle
+
+    def _finished(self, tag, task):
+        self.battles.pop(tag, None)
+        if not task.cancelled(): self.stats['finished'] += 1
+
+    async def _forfeit(self, tag, user):
+        battle = self.battles.get(tag)
+        if battle is None or battle.task is None: return
+        battle.task.cancel()
+        winners = [seat.name for seat in battle.seats.values() if seat is not user]
+        winner = winners[0] if winners else next(n for r, n in battle.stream['players'].items() if r not in battle.seats)
+        for seat in battle.seats.values():
+            await seat.conn.send(f">{tag}\n|\n|-message|{user.name} forfeited.\n|win|{winner}")
+
+def serve(streams, host=HOST, port=PORT):
+    logging.getLogger("websockets").setLevel(logging.ERROR)
+    try:
+        asyncio.run(MockShowdownServer(streams, host, port).serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+def get_streams(args):
+    if args.streams: return load_streams(args.streams)
+    return record_streams(args.stream_battles, args.seed, args.policy)
+
+
+# --- CLIENT BENCHMARK ---
+def make_player(kind, server_configuration, concurrent):
+    from poke_env.player import RandomPlayer, MaxBasePowerPlayer, SimpleHeuristicsPlayer
+    classes = {'random': RandomPlayer, 'maxbp': MaxBasePowerPlayer, 'heuristic': SimpleHeuristicsPlayer}
+    kwargs = dict(battle_format=FORMAT, server_configuration=server_configuration, max_concurrent_battles=concurrent)
+    if kind == 'v16':
+        from player_v16 import TabularQPlayerV16
+        return TabularQPlayerV16(epsilon=0.0, **kwargs)
+    return classes[kind](**kwargs)
+
+def time_choose_move(player, totals):
+    choose_move = player.choose_move
+    def timed(battle):
+        start = time.perf_counter()
+        order = choose_move(battle)
+        totals['choose_move'] += time.perf_counter() - start
+        totals['decisions'] += 1
+        return order
+    player.choose_move = timed
+
+async def wait_for_server(url, timeout=60):
+    deadline = time.time() + timeout
+    while True:
+        try:
+            async with websockets.connect(url):
+                return
+        except OSError:
+            if time.time() > deadline: raise
+            await asyncio.sleep(0.1)
+
+async def run_benchmark(args):
+    from poke_env.ps_client.server_configuration import ServerConfiguration, LocalhostServerConfiguration
+    url = f"ws://{args.host}:{args.port}/showdown/websocket"
+    await wait_for_server(url)
+    config = ServerConfiguration(url, LocalhostServerConfiguration.authentication_url)
+    totals = {'choose_move': 0.0, 'decisions': 0}
+    players = [make_player(args.player, config, args.concurrent), make_player(args.opponent, config, args.concurrent)]
+    for player in players:
+        player.logger.setLevel(logging.ERROR)
+        time_choose_move(player, totals)
+
+    await players[0].battle_against(players[1], n_battles=min(10, args.bench)) # Warm-up: logins, imports, caches
+    totals.update(choose_move=0.0, decisions=0)
+    wall, cpu = time.perf_counter(), time.process_time()
+    await players[0].battle_against(players[1], n_battles=args.bench)
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+
+    n = args.bench
+    choose_ms = totals['choose_move'] * 1000 / n
+    print(f"--- MOCK SERVER BENCHMARK: {args.player} vs {args.opponent}, {n} battles, {args.concurrent} concurrent ---")
+    print(f"Speed {n / wall:.1f} bat/s | {totals['decisions'] / wall:.0f} decisions/s | {totals['decisions'] / n:.1f} decisions/battle")
+    print(f"Client CPU {cpu * 1000 / n:.2f} ms/battle = choose_move {choose_ms:.2f} ms + protocol/parsing/poke_env {cpu * 1000 / n - choose_ms:.2f} ms")
+    print(f"choose_move {totals['choose_move'] * 1e6 / max(1, totals['decisions']):.1f} us/decision")
+    for player in players: await player.ps_client.stop_listening()
+
+def main(args):
+    streams = get_streams(args)
+    if args.write_streams:
+        save_streams(streams, args.write_streams)
+        print(f"💾 Wrote {len(streams)} streams to {args.write_streams}")
+        return
+    if not args.bench:
+        serve(streams, args.host, args.port)
+        return
+
+    # Server in its own process so its CPU time stays out of the client measurement
+    server = mp.get_context("spawn").Process(target=serve, args=(streams, args.host, args.port), daemon=True)
+    server.start()
+    try:
+        asyncio.run(run_benchmark(args))
+    finally:
+        server.terminate()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", type=str, default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--streams", type=str, default=None, help="JSONL battle streams or a battle_log directory (default: generate with the engine)")
+    parser.add_argument("--stream_battles", type=int, default=STREAM_BATTLES)
+    parser.add_argument("--policy", type=str, default=STREAM_POLICY, help="Engine policy that plays the generated streams")
+    parser.add_argument("--seed", type=int, default=STREAM_SEED)
+    parser.add_argument("--write_streams", type=str, default=None, help="Save the generated streams to this JSONL file and exit")
+    parser.add_argument("--bench", type=int, default=0, help="Start the server and time N client battles against it")
+    parser.add_argument("--player", type=str, default="random", help="random / maxbp / heuristic / v16")
+    parser.add_argument("--opponent", type=str, default="random")
+    parser.add_argument("--concurrent", type=int, default=1)
+    args = parser.parse_args()
+    main(args)
@@ -15,7 +15,8 @@ async def main():
         max_concurrent_battles=1
     )
 
-    TABLE_PATH = "v16_models/qtable_maxbp.pkl" 
+    TABLE_PATH = "v16_models/qtable_maxbp.qmap" 
+    if not os.path.exists(TABLE_PATH): TABLE_PATH = "v16_models/qtable_maxbp.pkl"
     
     if os.path.exists(TABLE_PATH):
         agent.load_table(TABLE_PATH)
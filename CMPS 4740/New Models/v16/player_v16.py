@@ -6,10 +6,16 @@ import numpy as np
 import logging
 import gc
 import math
+from collections import OrderedDict
 from poke_env.player.player import Player
 from poke_env.battle.pokemon import Pokemon
 from poke_env.battle.move_category import MoveCategory
 from features_v16 import AdvancedFeatureExtractor
+from qstore import QStore
+import qtable_mmap
+from delta_log import IncrementalCheckpointMixin
+from battle_log import BattleRecorderMixin
+from traces import SparseTraces, table_slot
 
 # Fix Gen 1/4 moves issue
 _original_available_moves = Pokemon.available_moves_from_request
@@ -34,8 +40,8 @@ class HeuristicEngine:
         return ((2 * mon.base_stats.get(stat, 100) + 31) + 5) * multiplier
 
     @staticmethod
-    def _estimate_matchup(mon, opponent):
-        if not opponent: return 0
+    def _type_speed_matchup(mon, opponent):
+        """HP-independent part of _estimate_matchup (depends only on the two species)."""
         # Type effectiveness
         score = max([opponent.damage_multiplier(t) for t in mon.types if t is not None])
         score -= max([mon.damage_multiplier(t) for t in opponent.types if t is not None])
@@ -45,6 +51,12 @@ class HeuristicEngine:
             score += HeuristicEngine.SPEED_TIER_COEFICIENT
         elif opponent.base_stats.get("spe", 0) > mon.base_stats.get("spe", 0):
             score -= HeuristicEngine.SPEED_TIER_COEFICIENT
+        return score
+
+    @staticmethod
+    def _estimate_matchup(mon, opponent, type_speed=None):
+        if not opponent: return 0
+        score = HeuristicEngine._type_speed_matchup(mon, opponent) if type_speed is None else type_speed
             
         # HP
         score += mon.current_hp_fraction * HeuristicEngine.HP_FRACTION_COEFICIENT
@@ -78,31 +90,155 @@ class HeuristicEngine:
     def get_switch_score(battle, candidate, opponent):
         return HeuristicEngine._estimate_matchup(candidate, opponent)
 
-class TabularQPlayerV16(Player):
-    def __init__(self, battle_format="gen1randombattle", alpha=0.1, gamma=0.99, lam=0.8, epsilon=0.1, **kwargs):
+class PriorCache:
+    """
+    Memoized HeuristicEngine scores used to initialize new Q / switch entries.
+
+    Move scores are keyed by (attacker species, move id, defender species, boost bucket),
+    the bucket being the two stat stages the move's category reads, so a hit returns
+    exactly what get_move_score would. Switch scores cache the type/speed part of the
+    matchup per (candidate species, opponent species) and add the HP terms on top.
+    LRU-bounded; save() merges into the file on disk so workers share one warm cache.
+    """
+    MAX_ENTRIES = 500000
+
+    def __init__(self, path=None, max_entries=MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if path and os.path.exists(path): self.load(path)
+
+    def _lookup(self, key):
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        return value
+
+    def _store(self, key, value):
+        self.entries[key] = value
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def move_score(self, battle, move, active, opponent):
+        if not opponent or not active: return 0.0
+        atk, defn = ("atk", "def") if move.category == MoveCategory.PHYSICAL else ("spa", "spd")
+        key = (active.species, move.id, opponent.species, (active.boosts.get(atk), opponent.boosts.get(defn)))
+        score = self._lookup(key)
+        if score is None:
+            score = HeuristicEngine.get_move_score(battle, move, active, opponent)
+            self._store(key, score)
+        return score
+
+    def switch_score(self, battle, candidate, opponent):
+        if not opponent: return 0
+        key = ("switch", candidate.species, opponent.species)
+        type_speed = self._lookup(key)
+        if type_speed is None:
+            type_speed = HeuristicEngine._type_speed_matchup(candidate, opponent)
+            self._store(key, type_speed)
+        return HeuristicEngine._estimate_matchup(candidate, opponent, type_speed)
+
+    def stats(self):
+        total = self.hits + self.misses
+        rate = self.hits / total if total else 0.0
+        return f"Prior cache: {len(self.entries)} entries | {self.hits} hits / {self.misses} misses ({rate:.1%})"
+
+    def load(self, path):
+        try:
+            with open(path, 'rb') as f:
+                self.entries.update(pickle.load(f))
+            while len(self.entries) > self.max_entries: self.entries.popitem(last=False)
+        except Exception as e:
+            logging.critical(f"Ignoring prior cache {path}. Error: {e}")
+
+    def save(self, path=None):
+        path = path or self.path
+        if not path: return
+        merged = OrderedDict()
+        if os.path.exists(path): # Keep what other workers saved since we loaded
+            try:
+                with open(path, 'rb') as f: merged.update(pickle.load(f))
+            except Exception: pass
+        merged.update(self.entries)
+        while len(merged) > self.max_entries: merged.popitem(last=False)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            pickle.dump(merged, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
+
+class BattleContext:
+    """
+    Learner state that belongs to a single battle. Keyed by battle_tag so that
+    many battles can be in flight at once without clobbering each other's traces.
+    """
+    __slots__ = ('last_state_key', 'last_action_hash', 'last_switch_context',
+                 'last_switch_action_was_greedy', 'last_reward_snapshot',
+                 'active_traces', 'switch_traces')
+
+    def __init__(self):
+        self.last_state_key = None
+        self.last_action_hash = None
+        self.last_switch_context = None
+        self.last_switch_action_was_greedy = False
+        self.last_reward_snapshot = None
+        self.active_traces = SparseTraces()
+        self.switch_traces = SparseTraces()
+
+class TabularQPlayerV16(BattleRecorderMixin, IncrementalCheckpointMixin, Player):
+    def __init__(self, battle_format="gen1randombattle", alpha=0.1, gamma=0.99, lam=0.8, epsilon=0.1, prior_cache=None, use_qstore=True, **kwargs):
         super().__init__(battle_format=battle_format, **kwargs)
         
         self.extractor = AdvancedFeatureExtractor()
+        # Heuristic initial values (shared PriorCache so workers can warm-start from disk)
+        self.priors = prior_cache if prior_cache is not None else PriorCache()
+        self.use_qstore = use_qstore
         
-        # Tables
-        self.q_table = {}
+        # Tables (shared by every battle; choose_move runs to completion on the
+        # event loop, so each Q update is applied atomically)
+        self.q_table = QStore() if use_qstore else {}
         self.switch_table = {} 
         
-        self.active_traces = {}
-        self.switch_traces = {}
-        
         self.alpha = alpha
         self.gamma = gamma
         self.lam = lam
         self.epsilon = epsilon
         
-        self.last_state_key = None
-        self.last_action_hash = None
-        self.last_switch_context = None 
-        self.last_switch_action_was_greedy = False
-        
-        self.last_reward_snapshot = None
+        # Per-battle traces / last step, keyed by battle_tag
+        self.contexts = {}
         self.step_buffer = []
+        
+        # Per-key update counts since the last sync (None = not tracked).
+        # The sharded driver uses these as visit-count weights when merging.
+        self.q_update_counts = None
+        self.switch_update_counts = None
+
+        # Keys written since the last checkpoint(); flushed to the delta log
+        self._init_checkpointing()
+
+    def enable_update_counts(self):
+        self.q_update_counts = {}
+        self.switch_update_counts = {}
+
+    def pop_update_counts(self):
+        q_counts, s_counts = self.q_update_counts, self.switch_update_counts
+        self.q_update_counts, self.switch_update_counts = {}, {}
+        return q_counts, s_counts
+
+    def get_context(self, battle):
+        ctx = self.contexts.get(battle.battle_tag)
+        if ctx is None:
+            ctx = BattleContext()
+            self.contexts[battle.battle_tag] = ctx
+        return ctx
+
+    def drop_context(self, battle_tag):
+        self.contexts.pop(battle_tag, None)
+        self.extractor.forget(battle_tag)
 
     # --- INITIALIZATION LOGIC ---
     def _initialize_state_if_needed(self, battle, state_key, possible_actions):
@@ -126,7 +262,7 @@ class TabularQPlayerV16(Player):
                 # Or a small penalty/bonus depending on if we are trapped
                 score = 50.0 # Arbitrary mid-range score for "Switching general option"
             else:
-                score = HeuristicEngine.get_move_score(battle, move_obj, active, opponent)
+                score = self.priors.move_score(battle, move_obj, active, opponent)
             raw_scores.append(score)
             
         # 2. Softmax Normalization
@@ -142,6 +278,9 @@ class TabularQPlayerV16(Player):
             if (state_key, action_hash) not in self.q_table:
                 # Initialize with the heuristic probability [0.0, 1.0]
                 self.q_table[(state_key, action_hash)] = normalized_scores[i]
+                self.dirty_q.add((state_key, action_hash))
+                if self.q_update_counts is not None:
+                    self.q_update_counts[(state_key, action_hash)] = self.q_update_counts.get((state_key, action_hash), 0) + 1
 
     def _initialize_switch_if_needed(self, battle, candidates):
         """
@@ -163,7 +302,7 @@ class TabularQPlayerV16(Player):
         # Calculate scores
         raw_scores = []
         for mon in candidates:
-            score = HeuristicEngine.get_switch_score(battle, mon, opponent)
+            score = self.priors.switch_score(battle, mon, opponent)
             raw_scores.append(score)
             
         # Softmax
@@ -176,6 +315,9 @@ class TabularQPlayerV16(Player):
         for i, ctx in enumerate(contexts):
             if ctx not in self.switch_table:
                 self.switch_table[ctx] = normalized_scores[i]
+                self.dirty_switch.add(ctx)
+                if self.switch_update_counts is not None:
+                    self.switch_update_counts[ctx] = self.switch_update_counts.get(ctx, 0) + 1
 
     # --- STANDARD Q-LEARNING METHODS ---
     def _get_dense_reward_snapshot(self, battle):
@@ -192,9 +334,9 @@ class TabularQPlayerV16(Player):
                 'opp_fainted': opp_fainted, 'my_status': my_status, 
                 'opp_status': opp_status, 'my_boosts': my_boosts}
 
-    def _calculate_step_reward(self, current_snapshot):
-        if self.last_reward_snapshot is None: return 0.0
-        prev = self.last_reward_snapshot
+    def _calculate_step_reward(self, ctx, current_snapshot):
+        if ctx.last_reward_snapshot is None: return 0.0
+        prev = ctx.last_reward_snapshot
         curr = current_snapshot
         reward = 0.0
         
@@ -226,44 +368,48 @@ class TabularQPlayerV16(Player):
         old_val = self.switch_table.get(context_key, 0.0)
         new_val = old_val + alpha_switch * (reward - old_val)
         self.switch_table[context_key] = new_val
+        self.dirty_switch.add(context_key)
+        if self.switch_update_counts is not None:
+            self.switch_update_counts[context_key] = self.switch_update_counts.get(context_key, 0) + 1
 
-    def _update_traces_and_q(self, reward, max_next_q, next_action_is_greedy):
-        old_q = self.get_q_value(self.last_state_key, self.last_action_hash)
+    def _update_traces_and_q(self, ctx, reward, max_next_q, next_action_is_greedy):
+        old_q = self.get_q_value(ctx.last_state_key, ctx.last_action_hash)
         delta = reward + self.gamma * max_next_q - old_q
+        step = self.alpha * delta
         
-        if self.last_switch_context:
-            self.switch_traces[self.last_switch_context] = self.switch_traces.get(self.last_switch_context, 0.0) + 1.0
-
-        switch_keys_to_remove = []
-        for s_key, e_val in self.switch_traces.items():
-            self.switch_table[s_key] = self.switch_table.get(s_key, 0.0) + self.alpha * delta * e_val
-            new_e = e_val * self.gamma * self.lam if (next_action_is_greedy and self.last_switch_action_was_greedy) else 0.0
-            if new_e < 0.001: switch_keys_to_remove.append(s_key)
-            else: self.switch_traces[s_key] = new_e
-        for k in switch_keys_to_remove: del self.switch_traces[k]
-
-        trace_key = (self.last_state_key, self.last_action_hash)
-        self.active_traces[trace_key] = self.active_traces.get(trace_key, 0.0) + 1.0
+        if ctx.last_switch_context:
+            ctx.switch_traces.increment(ctx.last_switch_context, table_slot(self.switch_table, ctx.last_switch_context))
+
+        self.dirty_switch.update(ctx.switch_traces)
+        ctx.switch_traces.apply(self.switch_table, step)
+        switch_keys_to_remove = ctx.switch_traces.decay(self.gamma, self.lam, next_action_is_greedy and ctx.last_switch_action_was_greedy)
+
+        trace_key = (ctx.last_state_key, ctx.last_action_hash)
+        ctx.active_traces.increment(trace_key, table_slot(self.q_table, trace_key))
+        self.dirty_q.update(ctx.active_traces)
         
-        keys_to_remove = []
-        for key, e_val in self.active_traces.items():
-            self.q_table[key] = self.q_table.get(key, 0.0) + self.alpha * delta * e_val
-            new_e = e_val * self.gamma * self.lam if next_action_is_greedy else 0.0
-            if new_e < 0.001: keys_to_remove.append(key)
-            else: self.active_traces[key] = new_e
-        for k in keys_to_remove: del self.active_traces[k]
+        # One scatter-add + one vectorized decay, whatever the trace length (see traces.py)
+        ctx.active_traces.apply(self.q_table, step)
+        keys_to_remove = ctx.active_traces.decay(self.gamma, self.lam, next_action_is_greedy)
+
+        if self.q_update_counts is not None:
+            for key in list(ctx.active_traces) + keys_to_remove:
+                self.q_update_counts[key] = self.q_update_counts.get(key, 0) + 1
+            for key in list(ctx.switch_traces) + switch_keys_to_remove:
+                self.switch_update_counts[key] = self.switch_update_counts.get(key, 0) + 1
 
         if not next_action_is_greedy:
-            self.active_traces.clear()
-            self.switch_traces.clear()
-            self.last_switch_action_was_greedy = False
-            self.last_switch_context = None
+            ctx.active_traces.clear()
+            ctx.switch_traces.clear()
+            ctx.last_switch_action_was_greedy = False
+            ctx.last_switch_context = None
 
     def choose_move(self, battle):
+        ctx = self.get_context(battle)
         current_snapshot = self._get_dense_reward_snapshot(battle)
-        step_reward = self._calculate_step_reward(current_snapshot)
+        step_reward = self._calculate_step_reward(ctx, current_snapshot)
         if step_reward != 0: self.step_buffer.append(step_reward)
-        self.last_reward_snapshot = current_snapshot
+        ctx.last_reward_snapshot = current_snapshot
 
         state_key = self.extractor.get_master_state(battle)
         
@@ -290,7 +436,11 @@ class TabularQPlayerV16(Player):
              best_indices = [i for i, q in enumerate(q_values) if q == max_q]
              greedy_idx = random.choice(best_indices)
 
-        if random.random() < self.epsilon:
+        logged_idx = self.replay_index([move for _, move in possible_actions])
+        if logged_idx is not None:
+            chosen_idx = logged_idx
+            is_greedy = (q_values[chosen_idx] == max_q)
+        elif random.random() < self.epsilon:
             chosen_idx = random.randint(0, len(possible_actions) - 1)
             is_greedy = (q_values[chosen_idx] == max_q)
         else:
@@ -299,20 +449,20 @@ class TabularQPlayerV16(Player):
             
         chosen_hash, chosen_move_obj = possible_actions[chosen_idx]
 
-        if self.last_state_key is not None:
-            self._update_traces_and_q(step_reward, max_q, is_greedy)
+        if ctx.last_state_key is not None:
+            self._update_traces_and_q(ctx, step_reward, max_q, is_greedy)
 
-        self.last_state_key = state_key
-        self.last_action_hash = chosen_hash
+        ctx.last_state_key = state_key
+        ctx.last_action_hash = chosen_hash
         
         if chosen_hash == -1:
-            self.last_switch_context = None 
-            return self._sub_agent_switch_learned(battle, is_greedy)
+            ctx.last_switch_context = None 
+            return self._sub_agent_switch_learned(battle, ctx, is_greedy)
         else:
-            self.last_switch_context = None 
+            ctx.last_switch_context = None 
             return self.create_order(chosen_move_obj)
 
-    def _sub_agent_switch_learned(self, battle, parent_action_was_greedy):
+    def _sub_agent_switch_learned(self, battle, ctx, parent_action_was_greedy):
         available = battle.available_switches
         if not available: return self.choose_random_move(battle)
         
@@ -331,7 +481,12 @@ class TabularQPlayerV16(Player):
                 best_mon = mon
                 best_context = sub_state_key
         
-        if random.random() < self.epsilon:
+        logged_idx = self.replay_index(available)
+        if logged_idx is not None:
+            choice = available[logged_idx]
+            choice_context = self.extractor.get_sub_state(battle, choice)
+            is_sub_greedy = (choice.species == best_mon.species) if best_mon else False
+        elif random.random() < self.epsilon:
             choice = random.choice(available)
             choice_context = self.extractor.get_sub_state(battle, choice)
             is_sub_greedy = (choice.species == best_mon.species) if best_mon else False
@@ -340,49 +495,74 @@ class TabularQPlayerV16(Player):
             choice_context = best_context if best_context else self.extractor.get_sub_state(battle, choice)
             is_sub_greedy = True
             
-        self.last_switch_context = choice_context
-        self.last_switch_action_was_greedy = is_sub_greedy and parent_action_was_greedy
+        ctx.last_switch_context = choice_context
+        ctx.last_switch_action_was_greedy = is_sub_greedy and parent_action_was_greedy
         return self.create_order(choice)
 
     def battle_finished_callback(self, battle):
         pass 
 
+    def _battle_finished_callback(self, battle):
+        # The only terminal hook poke_env 0.16 calls live (at |win| / |tie|); the engine calls _battle_finished
+        self._terminal_update(battle, bool(battle.won))
+
     def _battle_finished(self, battle, won):
+        self._terminal_update(battle, won)
+        self._n_finished_battles += 1
+        if won: self._n_won_battles += 1
+
+    def _terminal_update(self, battle, won):
+        ctx = self.contexts.pop(battle.battle_tag, None) or BattleContext()
+        self.extractor.forget(battle.battle_tag)
         current_snapshot = self._get_dense_reward_snapshot(battle)
-        step_reward = self._calculate_step_reward(current_snapshot)
+        step_reward = self._calculate_step_reward(ctx, current_snapshot)
         win_reward = 1.0 if won else -1.0
         final_total_reward = step_reward + win_reward
         
-        if self.last_switch_context:
-            self.update_switch_value(self.last_switch_context, final_total_reward, alpha_switch=0.1)
+        if ctx.last_switch_context:
+            self.update_switch_value(ctx.last_switch_context, final_total_reward, alpha_switch=0.1)
 
-        if self.last_state_key is not None:
-            self._update_traces_and_q(final_total_reward, 0.0, True)
-            
-        self.last_state_key = None; self.last_action_hash = None
-        self.active_traces.clear(); self.switch_traces.clear()
-        self.last_switch_context = None; self.last_switch_action_was_greedy = False
-        self.last_reward_snapshot = None
-        
-        self._n_finished_battles += 1
-        if won: self._n_won_battles += 1
+        if ctx.last_state_key is not None:
+            self._update_traces_and_q(ctx, final_total_reward, 0.0, True)
 
     def save_table(self, path):
+        """Full snapshot. Training loops should call checkpoint(), which only appends deltas."""
+        if path.endswith(qtable_mmap.EXT):
+            qtable_mmap.write_checkpoint(path, {'q': self.q_table, 'switch': self.switch_table})
+            return True
         gc.disable()
+        temp_path = path + ".tmp"
         try:
             data = {'q': self.q_table, 'switch': self.switch_table}
-            with open(path, 'wb') as f:
+            with open(temp_path, 'wb') as f:
                 pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, path)
+            return True
         finally:
             gc.enable()
 
     def load_table(self, path):
+        if path.endswith(qtable_mmap.EXT):
+            # O(1) open; values are mapped copy-on-write and new keys land in memory
+            try:
+                tables = qtable_mmap.open_checkpoint(path)
+                self.q_table, self.switch_table = tables['q'], tables['switch']
+                self.replay_delta_log(path)
+                logging.critical(f"Mapped V16 Tables: Q ({len(self.q_table)}) Switch ({len(self.switch_table)})")
+            except Exception as e:
+                logging.critical(f"Starting fresh V16. Error: {e}")
+            return
         gc.disable()
         try:
             with open(path, 'rb') as f:
                 data = pickle.load(f)
                 self.q_table = data.get('q', {})
+                if self.use_qstore and isinstance(self.q_table, dict):
+                    self.q_table = QStore.from_dict(self.q_table)
+                elif not self.use_qstore and isinstance(self.q_table, QStore):
+                    self.q_table = self.q_table.to_dict()
                 self.switch_table = data.get('switch', {})
+            self.replay_delta_log(path)
             logging.critical(f"Loaded V16 Tables: Q ({len(self.q_table)}) Switch ({len(self.switch_table)})")
         except Exception as e:
             logging.critical(f"Starting fresh V16. Error: {e}")
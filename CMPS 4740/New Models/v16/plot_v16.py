@@ -3,6 +3,7 @@ import matplotlib.pyplot as plt
 import os
 import argparse
 from datetime import datetime
+from metrics_log import METRICS_EXT, read_frame
 
 # --- CONFIGURATION ---
 LOG_DIR = "v16_logs"
@@ -15,7 +16,9 @@ def clean_percentage(val):
     return val
 
 def get_log_file(opponent):
-    return os.path.join(LOG_DIR, f"{PLOT_FILE_PREFIX}_{opponent}.csv")
+    log_file = os.path.join(LOG_DIR, f"{PLOT_FILE_PREFIX}_{opponent}{METRICS_EXT}")
+    if os.path.exists(log_file): return log_file
+    return os.path.join(LOG_DIR, f"{PLOT_FILE_PREFIX}_{opponent}.csv") # Not yet converted
 
 def plot_training(opponent):
     log_file = get_log_file(opponent)
@@ -24,7 +27,7 @@ def plot_training(opponent):
         return
 
     print(f"Plotting V16 data from: {log_file}")
-    try: data = pd.read_csv(log_file)
+    try: data = read_frame(log_file) if log_file.endswith(METRICS_EXT) else pd.read_csv(log_file)
     except Exception as e:
         print(f"Error: {e}")
         return
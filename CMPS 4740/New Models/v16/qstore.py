@@ -0,0 +1,291 @@
+import sys
+import pickle
+import argparse
+import numpy as np
+
+# --- CONFIG ---
+ACTION_BITS = 16 # Packed key = state_id << ACTION_BITS | action_id
+MAX_LOAD = 0.5
+EMPTY = -1
+_FIB = np.uint64(11400714819323198485) # 2^64 / golden ratio
+
+class QStore:
+    """
+    Array-backed replacement for the {(state_tuple, action_hash): q} dict.
+
+    Master-state tuples and action hashes are interned to dense integer ids, the
+    (state_id, action_id) pair is packed into one int64 and located through a
+    linear-probing open-addressing index. Q-values live in a growable float32 array.
+    Supports the dict operations the player uses (in / get / [] / len / items / update),
+    so it can be swapped in for q_table without touching the learning code.
+    """
+    def __init__(self, capacity=1024):
+        self.state_ids = {}
+        self.states = []
+        self.action_ids = {}
+        self.actions = []
+
+        self.size = 0
+        self.values = np.zeros(capacity, dtype=np.float32)
+        self.entry_keys = np.zeros(capacity, dtype=np.int64)
+        self._alloc_index(self._index_capacity(capacity))
+
+    # --- INTERNALS ---
+    @staticmethod
+    def _index_capacity(n):
+        cap = 16
+        while cap * MAX_LOAD < n: cap *= 2
+        return cap
+
+    def _alloc_index(self, cap):
+        self._bits = cap.bit_length() - 1
+        self._shift = 64 - self._bits
+        self._mask = cap - 1
+        self._index_keys = np.full(cap, EMPTY, dtype=np.int64)
+        self._index_slots = np.zeros(cap, dtype=np.int32)
+
+    def _hash(self, key):
+        return ((key * 11400714819323198485) & 0xFFFFFFFFFFFFFFFF) >> self._shift
+
+    def _hash_array(self, keys):
+        return ((keys.astype(np.uint64) * _FIB) >> np.uint64(self._shift)).astype(np.int64)
+
+    def _pack(self, key, intern=False):
+        state, action = key
+        sid = self.state_ids.get(state)
+        aid = self.action_ids.get(action)
+        if sid is None or aid is None:
+            if not intern: return None
+            if sid is None:
+                sid = len(self.states)
+                self.state_ids[state] = sid
+                self.states.append(state)
+            if aid is None:
+                aid = len(self.actions)
+                if aid >= (1 << ACTION_BITS): raise OverflowError("QStore action id space exhausted")
+                self.action_ids[action] = aid
+                self.actions.append(action)
+        return (sid << ACTION_BITS) | aid
+
+    def _unpack(self, packed):
+        packed = int(packed)
+        return (self.states[packed >> ACTION_BITS], self.actions[packed & ((1 << ACTION_BITS) - 1)])
+
+    def _find(self, packed):
+        """Returns (slot, index_position). slot is -1 when the key is absent."""
+        keys = self._index_keys
+        i = self._hash(packed)
+        while True:
+            k = keys[i]
+            if k == packed: return int(self._index_slots[i]), i
+            if k == EMPTY: return -1, i
+            i = (i + 1) & self._mask
+
+    def _find_many(self, packed):
+        """Vectorized probe for an int64 array of packed keys. Missing keys map to -1."""
+        result = np.full(packed.shape[0], -1, dtype=np.int64)
+        pos = self._hash_array(packed)
+        pending = np.arange(packed.shape[0])
+        while pending.size:
+            k = self._index_keys[pos[pending]]
+            hit = k == packed[pending]
+            result[pending[hit]] = self._index_slots[pos[pending[hit]]]
+            pending = pending[~hit & (k != EMPTY)]
+            pos[pending] = (pos[pending] + 1) & self._mask
+        return result
+
+    def _rebuild_index(self, cap):
+        self._alloc_index(cap)
+        keys = self.entry_keys[:self.size]
+        pos = self._hash_array(keys)
+        pending = np.arange(self.size)
+        claimed = np.zeros(self.size, dtype=bool)
+        while pending.size:
+            p = pos[pending]
+            free = self._index_keys[p] == EMPTY
+            cand = pending[free]
+            # Only the first claimant of each free position wins this round
+            _, first = np.unique(p[free], return_index=True)
+            winners = cand[first]
+            self._index_keys[pos[winners]] = keys[winners]
+            self._index_slots[pos[winners]] = winners
+            claimed[winners] = True
+            pending = pending[~claimed[pending]]
+            pos[pending] = (pos[pending] + 1) & self._mask
+
+    def _grow_values(self):
+        cap = max(16, self.values.shape[0] * 2)
+        values = np.zeros(cap, dtype=np.float32)
+        keys = np.zeros(cap, dtype=np.int64)
+        values[:self.size] = self.values[:self.size]
+        keys[:self.size] = self.entry_keys[:self.size]
+        self.values, self.entry_keys = values, keys
+
+    def _insert(self, packed, pos, value):
+        if self.size == self.values.shape[0]: self._grow_values()
+        slot = self.size
+        self.values[slot] = value
+        self.entry_keys[slot] = packed
+        self.size += 1
+        if self.size > (self._mask + 1) * MAX_LOAD:
+            self._rebuild_index((self._mask + 1) * 2)
+        else:
+            self._index_keys[pos] = packed
+            self._index_slots[pos] = slot
+        return slot
+
+    # --- SLOT API (stable integer handles for callers that cache them) ---
+    def slot(self, key, create=False, default=0.0):
+        packed = self._pack(key, intern=create)
+        if packed is None: return -1
+        slot, pos = self._find(packed)
+        if slot < 0 and create: slot = self._insert(packed, pos, default)
+        return slot
+
+    def get_many(self, state, actions, default=0.0):
+        """Q-values for every action of one state in a single vectorized probe."""
+        sid = self.state_ids.get(state)
+        out = np.full(len(actions), default, dtype=np.float32)
+        if sid is None: return out
+        aids = np.array([self.action_ids.get(a, -1) for a in actions], dtype=np.int64)
+        known = aids >= 0
+        if not known.any(): return out
+        slots = self._find_many((sid << ACTION_BITS) | aids[known])
+        vals = out[known]
+        vals[slots >= 0] = self.values[slots[slots >= 0]]
+        out[known] = vals
+        return out
+
+    def get_values(self, keys):
+        """Vectorized lookup for a list of (state, action) keys; missing keys come back as NaN."""
+        packed = [self._pack(k) for k in keys]
+        known = np.array([p is not None for p in packed], dtype=bool)
+        out = np.full(len(keys), np.nan, dtype=np.float32)
+        if known.any():
+            slots = self._find_many(np.array([p for p in packed if p is not None], dtype=np.int64))
+            vals = np.full(slots.shape[0], np.nan, dtype=np.float32)
+            vals[slots >= 0] = self.values[slots[slots >= 0]]
+            out[known] = vals
+        return out
+
+    # --- DICT API ---
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, key):
+        packed = self._pack(key)
+        return packed is not None and self._find(packed)[0] >= 0
+
+    def get(self, key, default=None):
+        packed = self._pack(key)
+        if packed is None: return default
+        slot, _ = self._find(packed)
+        return float(self.values[slot]) if slot >= 0 else default
+
+    def __getitem__(self, key):
+        packed = self._pack(key)
+        slot = self._find(packed)[0] if packed is not None else -1
+        if slot < 0: raise KeyError(key)
+        return float(self.values[slot])
+
+    def __setitem__(self, key, value):
+        packed = self._pack(key, intern=True)
+        slot, pos = self._find(packed)
+        if slot >= 0: self.values[slot] = value
+        else: self._insert(packed, pos, value)
+
+    def update(self, other):
+        for key, value in other.items(): self[key] = value
+
+    def keys(self):
+        for packed in self.entry_keys[:self.size]: yield self._unpack(packed)
+
+    def __iter__(self):
+        return self.keys()
+
+    def items(self):
+        for packed, value in zip(self.entry_keys[:self.size], self.values[:self.size]):
+            yield self._unpack(packed), float(value)
+
+    def to_dict(self):
+        return dict(self.items())
+
+    @classmethod
+    def from_dict(cls, table):
+        store = cls(capacity=max(16, len(table)))
+        for (state, action), value in table.items():
+            packed = store._pack((state, action), intern=True)
+            store.entry_keys[store.size] = packed
+            store.values[store.size] = value
+            store.size += 1
+        store._rebuild_index(cls._index_capacity(store.size))
+        return store
+
+    # --- PICKLING (arrays + id tables; the index is rebuilt on load) ---
+    def __getstate__(self):
+        return {'states': self.states, 'actions': self.actions,
+                'keys': self.entry_keys[:self.size].copy(), 'values': self.values[:self.size].copy()}
+
+    def __setstate__(self, data):
+        self.states = data['states']
+        self.actions = data['actions']
+        self.state_ids = {s: i for i, s in enumerate(self.states)}
+        self.action_ids = {a: i for i, a in enumerate(self.actions)}
+        self.size = len(data['values'])
+        cap = max(16, self.size)
+        self.values = np.zeros(cap, dtype=np.float32)
+        self.entry_keys = np.zeros(cap, dtype=np.int64)
+        self.values[:self.size] = data['values']
+        self.entry_keys[:self.size] = data['keys']
+        self._rebuild_index(self._index_capacity(self.size))
+
+    # --- MEMORY ---
+    def nbytes(self, sample=10000):
+        arrays = self.values.nbytes + self.entry_keys.nbytes + self._index_keys.nbytes + self._index_slots.nbytes
+        interning = sys.getsizeof(self.state_ids) + sys.getsizeof(self.states)
+        interning += sys.getsizeof(self.action_ids) + sys.getsizeof(self.actions)
+        seen = set()
+        step = max(1, len(self.states) // sample)
+        sampled = self.states[::step]
+        state_bytes = sum(deep_size(s, seen) for s in sampled) * (len(self.states) / max(1, len(sampled)))
+        return int(arrays + interning + state_bytes)
+
+
+def deep_size(obj, seen):
+    """sys.getsizeof over tuples/strings/numbers, counting shared objects once."""
+    if id(obj) in seen: return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, tuple):
+        size += sum(deep_size(x, seen) for x in obj)
+    return size
+
+def dict_nbytes(table, sample=10000):
+    seen = set()
+    items = list(table.items()) if len(table) <= sample else None
+    if items is None:
+        step = max(1, len(table) // sample)
+        items = [kv for i, kv in enumerate(table.items()) if i % step == 0]
+    per_entry = sum(deep_size(k, seen) + deep_size(v, seen) for k, v in items)
+    return int(sys.getsizeof(table) + per_entry * (len(table) / max(1, len(items))))
+
+def memory_report(table, store=None):
+    store = store if store is not None else QStore.from_dict(table)
+    n = max(1, len(table))
+    before, after = dict_nbytes(table), store.nbytes()
+    lines = [
+        "--- Q-TABLE MEMORY REPORT ---",
+        f"Entries: {len(table)} | States: {len(store.states)} | Actions: {len(store.actions)}",
+        f"dict   : {before / 1e6:9.1f} MB ({before / n:6.1f} B/entry)",
+        f"QStore : {after / 1e6:9.1f} MB ({after / n:6.1f} B/entry)",
+    ]
+    return "\n".join(lines)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("table", type=str, help="Pickled {'q': ..., 'switch': ...} file, e.g. v16_models/qtable_maxbp.pkl")
+    args = parser.parse_args()
+    with open(args.table, 'rb') as f:
+        q = pickle.load(f).get('q', {})
+    if isinstance(q, QStore): q = q.to_dict()
+    print(memory_report(q))
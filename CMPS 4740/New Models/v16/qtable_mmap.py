@@ -0,0 +1,240 @@
+import os
+import sys
+import time
+import glob
+import pickle
+import struct
+import hashlib
+import argparse
+import numpy as np
+from qstore import QStore, EMPTY, _FIB
+
+# --- FORMAT ---
+# [file header][table descriptors...][64-byte aligned sections...]
+# Each table has: fingerprints int64[n], values float32[n], index_keys int64[cap],
+# index_slots int32[cap] and a pickled list of the original keys (only read when
+# iterating / re-saving). Lookups hash the key to a stable 64-bit fingerprint and
+# probe the on-disk open-addressing index, so opening a file is O(1).
+MAGIC = b'V16QMAP\0'
+VERSION = 1
+EXT = ".qmap"
+FILE_HEADER = struct.Struct('<8sII')              # magic, version, n_tables
+TABLE_HEADER = struct.Struct('<16sQQQQQQQQ')      # name, n, cap, off_fp, off_val, off_ik, off_is, off_blob, blob_len
+ALIGN = 64
+
+def fingerprint(key):
+    """Stable across processes (unlike hash() on strings). Never equals EMPTY."""
+    digest = hashlib.blake2b(repr(key).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'little') & 0x7FFFFFFFFFFFFFFF
+
+def _align(n):
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+def _index_arrays(fps):
+    cap = QStore._index_capacity(len(fps))
+    shift = np.uint64(64 - (cap.bit_length() - 1))
+    mask = cap - 1
+    idx_keys = np.full(cap, EMPTY, dtype=np.int64)
+    idx_slots = np.zeros(cap, dtype=np.int32)
+    pos = ((fps.astype(np.uint64) * _FIB) >> shift).astype(np.int64)
+    pending = np.arange(len(fps))
+    claimed = np.zeros(len(fps), dtype=bool)
+    while pending.size:
+        p = pos[pending]
+        free = idx_keys[p] == EMPTY
+        cand = pending[free]
+        _, first = np.unique(p[free], return_index=True)
+        winners = cand[first]
+        idx_keys[pos[winners]] = fps[winners]
+        idx_slots[pos[winners]] = winners
+        claimed[winners] = True
+        pending = pending[~claimed[pending]]
+        pos[pending] = (pos[pending] + 1) & mask
+    return idx_keys, idx_slots
+
+def write_checkpoint(path, tables):
+    """tables: {'q': dict-like, 'switch': dict-like}. Written to a temp file then swapped in."""
+    prepared = []
+    for name, table in tables.items():
+        keys, values = [], []
+        for k, v in table.items():
+            keys.append(k)
+            values.append(v)
+        fps = np.fromiter((fingerprint(k) for k in keys), dtype=np.int64, count=len(keys))
+        vals = np.asarray(values, dtype=np.float32)
+        idx_keys, idx_slots = _index_arrays(fps)
+        blob = pickle.dumps(keys, protocol=pickle.HIGHEST_PROTOCOL)
+        prepared.append((name, fps, vals, idx_keys, idx_slots, blob))
+
+    offset = _align(FILE_HEADER.size + TABLE_HEADER.size * len(prepared))
+    headers, layout = [], []
+    for name, fps, vals, idx_keys, idx_slots, blob in prepared:
+        offs = []
+        for arr in (fps, vals, idx_keys, idx_slots):
+            offs.append(offset)
+            offset = _align(offset + arr.nbytes)
+        off_blob = offset
+        offset = _align(offset + len(blob))
+        headers.append(TABLE_HEADER.pack(name.encode()[:16], len(fps), len(idx_keys), *offs, off_blob, len(blob)))
+        layout.append(list(zip(offs, (fps, vals, idx_keys, idx_slots))) + [(off_blob, blob)])
+
+    temp_path = path + ".tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(FILE_HEADER.pack(MAGIC, VERSION, len(prepared)))
+        for h in headers: f.write(h)
+        for sections in layout:
+            for off, data in sections:
+                f.seek(off)
+                f.write(data if isinstance(data, bytes) else data.tobytes())
+        f.truncate(offset)
+    os.replace(temp_path, path)
+
+
+class MappedTable:
+    """
+    Dict-like view over one table of a .qmap checkpoint. Values are mapped copy-on-write,
+    so a worker can update existing entries immediately without touching the file; new
+    keys get slots past the mapped ones (overflow: key -> slot), at which point the values
+    array is copied into memory and grows like QStore's.
+    """
+    def __init__(self, path, n, cap, off_fp, off_val, off_ik, off_is, off_blob, blob_len):
+        self.path = path
+        self.n = n
+        self.size = n
+        self.fps = np.memmap(path, dtype=np.int64, mode='r', offset=off_fp, shape=(n,)) if n else np.zeros(0, np.int64)
+        self.values = np.memmap(path, dtype=np.float32, mode='c', offset=off_val, shape=(n,)) if n else np.zeros(0, np.float32)
+        self.index_keys = np.memmap(path, dtype=np.int64, mode='r', offset=off_ik, shape=(cap,))
+        self.index_slots = np.memmap(path, dtype=np.int32, mode='r', offset=off_is, shape=(cap,))
+        self._mask = cap - 1
+        self._shift = 64 - (cap.bit_length() - 1)
+        self._blob = (off_blob, blob_len)
+        # Held open so the key blob is read from the file we mapped, even after a
+        # newer checkpoint has been os.replace()d over the same path
+        self._file = open(path, 'rb')
+        self._keys = None
+        self.overflow = {}
+
+    def _slot(self, key):
+        fp = fingerprint(key)
+        i = ((fp * 11400714819323198485) & 0xFFFFFFFFFFFFFFFF) >> self._shift
+        keys = self.index_keys
+        while True:
+            k = keys[i]
+            if k == fp: return int(self.index_slots[i])
+            if k == EMPTY: return -1
+            i = (i + 1) & self._mask
+
+    def _grow_values(self):
+        values = np.zeros(max(16, self.values.shape[0] * 2), dtype=np.float32)
+        values[:self.size] = self.values[:self.size]
+        self.values = values
+
+    def slot(self, key, create=False, default=0.0):
+        slot = self.overflow.get(key)
+        if slot is not None: return slot
+        slot = self._slot(key)
+        if slot >= 0 or not create: return slot
+        if self.size == self.values.shape[0]: self._grow_values()
+        slot = self.size
+        self.values[slot] = default
+        self.overflow[key] = slot
+        self.size += 1
+        return slot
+
+    def keys_list(self):
+        if self._keys is None:
+            off, length = self._blob
+            self._file.seek(off)
+            self._keys = pickle.loads(self._file.read(length))
+        return self._keys
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, key):
+        return self.slot(key) >= 0
+
+    def get(self, key, default=None):
+        slot = self.slot(key)
+        return float(self.values[slot]) if slot >= 0 else default
+
+    def __getitem__(self, key):
+        value = self.get(key, None)
+        if value is None: raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        slot = self.slot(key, create=True) # May grow (replace) self.values
+        self.values[slot] = value
+
+    def update(self, other):
+        for key, value in other.items(): self[key] = value
+
+    def items(self):
+        for key, value in zip(self.keys_list(), self.values[:self.n]):
+            yield key, float(value)
+        for key, slot in self.overflow.items():
+            yield key, float(self.values[slot])
+
+    def keys(self):
+        for key, _ in self.items(): yield key
+
+    def __iter__(self):
+        return self.keys()
+
+
+def open_checkpoint(path):
+    with open(path, 'rb') as f:
+        magic, version, n_tables = FILE_HEADER.unpack(f.read(FILE_HEADER.size))
+        if magic != MAGIC: raise ValueError(f"{path} is not a V16 .qmap checkpoint")
+        if version != VERSION: raise ValueError(f"Unsupported .qmap version {version}")
+        descriptors = [TABLE_HEADER.unpack(f.read(TABLE_HEADER.size)) for _ in range(n_tables)]
+    tables = {}
+    for name, *fields in descriptors:
+        tables[name.rstrip(b'\0').decode()] = MappedTable(path, *fields)
+    return tables
+
+def convert(pkl_path):
+    with open(pkl_path, 'rb') as f:
+        data = pickle.load(f)
+    out = os.path.splitext(pkl_path)[0] + EXT
+    write_checkpoint(out, {'q': data.get('q', {}), 'switch': data.get('switch', {})})
+    return out
+
+def benchmark(pkl_path, lookups=10000):
+    qmap_path = os.path.splitext(pkl_path)[0] + EXT
+    if not os.path.exists(qmap_path): convert(pkl_path)
+
+    start = time.perf_counter()
+    with open(pkl_path, 'rb') as f:
+        data = pickle.load(f)
+    pkl_load = time.perf_counter() - start
+
+    start = time.perf_counter()
+    tables = open_checkpoint(qmap_path)
+    map_open = time.perf_counter() - start
+
+    q_dict = data['q'] if isinstance(data['q'], dict) else data['q'].to_dict()
+    sample = list(q_dict)[:lookups]
+    start = time.perf_counter()
+    for k in sample: tables['q'].get(k)
+    map_lookup = (time.perf_counter() - start) / max(1, len(sample))
+
+    print(f"--- LOAD BENCHMARK ({len(q_dict)} Q entries) ---")
+    print(f"pickle.load      : {pkl_load * 1000:9.1f} ms")
+    print(f"open_checkpoint  : {map_open * 1000:9.3f} ms")
+    print(f"mapped lookup    : {map_lookup * 1e6:9.2f} us/key (cold pages included)")
+    print(f"file size        : pkl {os.path.getsize(pkl_path) / 1e6:.1f} MB | qmap {os.path.getsize(qmap_path) / 1e6:.1f} MB")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", choices=["convert", "bench"])
+    parser.add_argument("paths", nargs="*", help="Defaults to every v16_models/qtable_*.pkl")
+    args = parser.parse_args()
+    paths = args.paths or sorted(glob.glob("v16_models/qtable_*.pkl"))
+    if not paths:
+        print("⚠️ No pickled tables found.")
+        sys.exit(1)
+    for path in paths:
+        if args.command == "convert": print(f"✅ {path} -> {convert(path)}")
+        else: benchmark(path)
@@ -0,0 +1,237 @@
+import asyncio
+import os
+import csv
+import time
+import pickle
+import logging
+import argparse
+import subprocess
+import multiprocessing as mp
+
+# --- CONFIG ---
+TOTAL_BATTLES = 10000000
+SYNC_BATTLES = 500 # Battles each worker plays between merges
+SAVE_EVERY_SYNCS = 4
+BASE_PORT = 8000
+MAX_CONCURRENT = 32
+
+ALPHA = 0.1
+GAMMA = 0.995
+LAMBDA = 0.6967
+
+# terminal the following first (one server per worker, or pass --start_servers):
+# node pokemon-showdown start 8000 --no-security
+# node pokemon-showdown start 8001 --no-security ...
+
+def server_config_for_port(port):
+    from poke_env.ps_client.server_configuration import LocalhostServerConfiguration
+    cfg = LocalhostServerConfiguration
+    url_field = cfg._fields[0]
+    return cfg._replace(**{url_field: getattr(cfg, url_field).replace(str(BASE_PORT), str(port))})
+
+def start_showdown_servers(showdown_dir, n_workers):
+    procs = []
+    for i in range(n_workers):
+        cmd = ["node", "pokemon-showdown", "start", str(BASE_PORT + i), "--no-security"]
+        procs.append(subprocess.Popen(cmd, cwd=showdown_dir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+    time.sleep(5) # Give Node time to bind every port
+    return procs
+
+def merge_deltas(master, deltas):
+    """
+    Visit-count-weighted average of every worker's value for each key it touched.
+    deltas: list of {key: (value, count)}. Keys no worker touched keep their master value.
+    """
+    totals = {}
+    for delta in deltas:
+        for key, (value, count) in delta.items():
+            acc = totals.get(key)
+            if acc is None: totals[key] = [value * count, count]
+            else:
+                acc[0] += value * count
+                acc[1] += count
+    merged = {key: weighted / count for key, (weighted, count) in totals.items()}
+    master.update(merged)
+    return merged
+
+def log_sync(filename, sync_idx, battles, win_rate, epsilon, speed, merge_seconds, merged_keys, table_size, opponent):
+    file_exists = os.path.isfile(filename)
+    with open(filename, mode='a', newline='') as f:
+        writer = csv.writer(f)
+        if not file_exists:
+            writer.writerow(['Sync', 'Battles', 'RollingWin', 'Epsilon', 'Speed', 'MergeSeconds', 'MergedKeys', 'TableSize', 'Opponent'])
+        writer.writerow([sync_idx, battles, f"{win_rate:.2%}", f"{epsilon:.4f}", speed, f"{merge_seconds:.4f}", merged_keys, table_size, opponent])
+
+# --- WORKER ---
+async def worker_loop(worker_id, conn, opponent_name, model_file, legacy_file, epsilon):
+    import uuid
+    from poke_env.player import SimpleHeuristicsPlayer, RandomPlayer, MaxBasePowerPlayer
+    from player_v16 import TabularQPlayerV16, PriorCache
+    from train_v16 import get_unique_player_class, PRIORS_FILE
+    from battle_watchdog import BattleWatchdog
+    from worker_state import release_finished
+
+    logging.getLogger("poke_env").setLevel(logging.CRITICAL)
+    server = server_config_for_port(BASE_PORT + worker_id)
+    run_uuid = f"w{worker_id}{uuid.uuid4().hex[:6]}"
+
+    if opponent_name == "random": BaseOpp = RandomPlayer
+    elif opponent_name == "maxbp": BaseOpp = MaxBasePowerPlayer
+    else: BaseOpp = SimpleHeuristicsPlayer
+
+    opponent = get_unique_player_class(BaseOpp, "Opp", run_uuid)(
+        battle_format="gen1randombattle", server_configuration=server, max_concurrent_battles=MAX_CONCURRENT)
+    learner = get_unique_player_class(TabularQPlayerV16, "Learner", run_uuid)(
+        battle_format="gen1randombattle", server_configuration=server, max_concurrent_battles=MAX_CONCURRENT,
+        alpha=ALPHA, gamma=GAMMA, lam=LAMBDA, epsilon=epsilon, prior_cache=PriorCache(PRIORS_FILE))
+    if os.path.exists(model_file):
+        learner.load_table(model_file)
+    elif os.path.exists(legacy_file):
+        learner.load_table(legacy_file)
+    learner.enable_update_counts()
+    watchdog = BattleWatchdog(learner, opponent) # Forfeits stuck battles, as in train_v16.py
+    watchdog.start()
+
+    while True:
+        start = time.time()
+        battles, wins = 0, 0
+        while battles < SYNC_BATTLES:
+            chunk = min(MAX_CONCURRENT, SYNC_BATTLES - battles)
+            try:
+                await asyncio.wait_for(learner.battle_against(opponent, n_battles=chunk), timeout=10 * chunk + watchdog.worst_case)
+            except asyncio.TimeoutError:
+                # Stuck battles are the watchdog's to forfeit; only count what finished
+                watchdog.counts['chunk_timeouts'] += 1
+            # Frees finished battles; their contexts went with the terminal update
+            finished, won = release_finished(learner)
+            battles += finished
+            wins += won
+            release_finished(opponent)
+        total_reward = wins - (battles - wins) + sum(learner.pop_step_rewards())
+
+        q_counts, s_counts = learner.pop_update_counts()
+        q_delta = {k: (learner.q_table[k], c) for k, c in q_counts.items() if k in learner.q_table}
+        s_delta = {k: (learner.switch_table[k], c) for k, c in s_counts.items() if k in learner.switch_table}
+        conn.send(('delta', worker_id, q_delta, s_delta, battles, wins, time.time() - start, total_reward))
+
+        msg = conn.recv()
+        if msg[0] == 'stop':
+            watchdog.stop()
+            learner.priors.save() # Merged into the shared file for the next run
+            break
+        _, q_merged, s_merged, learner.epsilon = msg
+        learner.q_table.update(q_merged)
+        learner.switch_table.update(s_merged)
+
+def worker_main(worker_id, conn, opponent_name, model_file, legacy_file, epsilon):
+    try:
+        asyncio.run(worker_loop(worker_id, conn, opponent_name, model_file, legacy_file, epsilon))
+    except KeyboardInterrupt:
+        pass
+
+# --- DRIVER ---
+def load_master(model_file, legacy_file):
+    from qstore import QStore
+    from qtable_mmap import open_checkpoint
+    from delta_log import DeltaLog
+    if os.path.exists(model_file):
+        tables = open_checkpoint(model_file)
+        q, switch = dict(tables['q'].items()), dict(tables['switch'].items())
+        # Deltas left behind by a single-process train_v16.py run on the same file
+        for record in DeltaLog(model_file).replay():
+            q.update(record['q'])
+            switch.update(record['switch'])
+        return QStore.from_dict(q), switch
+    if not os.path.exists(legacy_file): return QStore(), {}
+    with open(legacy_file, 'rb') as f:
+        data = pickle.load(f)
+    q = data.get('q', {})
+    return (QStore.from_dict(q) if isinstance(q, dict) else q), data.get('switch', {})
+
+def save_master(model_file, q_table, switch_table):
+    from qtable_mmap import write_checkpoint
+    from delta_log import DeltaLog
+    write_checkpoint(model_file, {'q': q_table, 'switch': switch_table})
+    DeltaLog(model_file).reset() # The full snapshot supersedes any logged deltas
+
+def main(args):
+    from run_v16 import get_last_stats, get_epsilon
+    from train_v16 import log_stats
+    from metrics_log import METRICS_EXT
+
+    model_file = f"v16_models/qtable_{args.opponent}.qmap"
+    legacy_file = f"v16_models/qtable_{args.opponent}.pkl"
+    log_file = f"v16_logs/log_{args.opponent}{METRICS_EXT}"
+    sync_log = f"v16_logs/sharded_{args.opponent}.csv"
+    os.makedirs("v16_models", exist_ok=True)
+    os.makedirs("v16_logs", exist_ok=True)
+
+    servers = start_showdown_servers(args.showdown_dir, args.workers) if args.start_servers else []
+
+    battles, wins = get_last_stats(log_file)
+    q_master, s_master = load_master(model_file, legacy_file)
+    eps = get_epsilon(battles)
+
+    print(f"🚀 STARTING V16 SHARDED x{args.workers} vs {args.opponent.upper()} (Bat {battles}, Eps {eps:.3f})")
+
+    ctx = mp.get_context("spawn")
+    conns, procs = [], []
+    for i in range(args.workers):
+        parent, child = ctx.Pipe()
+        p = ctx.Process(target=worker_main, args=(i, child, args.opponent, model_file, legacy_file, eps), daemon=True)
+        p.start()
+        conns.append(parent)
+        procs.append(p)
+
+    sync_idx = 0
+    try:
+        while battles < TOTAL_BATTLES:
+            sync_start = time.time()
+            reports = [conn.recv() for conn in conns]
+
+            merge_start = time.time()
+            q_merged = merge_deltas(q_master, [r[2] for r in reports])
+            s_merged = merge_deltas(s_master, [r[3] for r in reports])
+            merge_seconds = time.time() - merge_start
+
+            round_battles = sum(r[4] for r in reports)
+            round_wins = sum(r[5] for r in reports)
+            # Workers run in parallel, so the round takes as long as the slowest one
+            round_seconds = max(r[6] for r in reports) + merge_seconds
+            battles += round_battles
+            wins += round_wins
+            eps = get_epsilon(battles)
+
+            for conn in conns:
+                conn.send(('merged', q_merged, s_merged, eps))
+
+            sync_idx += 1
+            speed = round_battles / round_seconds if round_seconds > 0 else 0.0
+            win_rate = round_wins / round_battles if round_battles else 0.0
+            merged_keys = len(q_merged) + len(s_merged)
+            print(f"Sync {sync_idx}: Bat {battles} | Win {win_rate:.2%} | Speed {speed:.1f}/s | Merge {merge_seconds * 1000:.1f}ms ({merged_keys} keys) | Wait {merge_start - sync_start:.1f}s | States {len(q_master)}")
+            log_sync(sync_log, sync_idx, battles, win_rate, eps, speed, merge_seconds, merged_keys, len(q_master), args.opponent)
+            # Keep the regular log going so run_v16.py / plot_v16.py can resume from it
+            avg_rew = sum(r[7] for r in reports) / round_battles if round_battles else 0.0
+            log_stats(log_file, battles, win_rate, wins / battles, eps, speed, avg_rew, len(q_master), args.opponent)
+
+            if sync_idx % SAVE_EVERY_SYNCS == 0:
+                save_master(model_file, q_master, s_master)
+    except KeyboardInterrupt:
+        print("\n🛑 Stopping workers...")
+    finally:
+        save_master(model_file, q_master, s_master)
+        for conn in conns:
+            try: conn.send(('stop',))
+            except (BrokenPipeError, OSError): pass
+        for p in procs: p.join(timeout=5)
+        for s in servers: s.terminate()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("opponent", nargs="?", type=str, default="random")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() // 2 or 1)
+    parser.add_argument("--start_servers", action="store_true")
+    parser.add_argument("--showdown_dir", type=str, default="../../pokemon-showdown")
+    args = parser.parse_args()
+    main(args)
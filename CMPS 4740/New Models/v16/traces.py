@@ -0,0 +1,157 @@
+import time
+import random
+import argparse
+import numpy as np
+from qstore import QStore
+
+# --- CONFIG ---
+TRACE_CUTOFF = 0.001 # Traces that decay below this are dropped
+
+def table_slot(table, key):
+    """Stable slot of key in tables with a slot API (QStore / MappedTable), else -1."""
+    return table.slot(key, create=True) if hasattr(table, 'slot') else -1
+
+class SparseTraces:
+    """
+    Eligibility traces of one battle as parallel arrays (key, table slot, trace value).
+
+    The Q update is one scatter-add into the table's values array and the decay is one
+    vectorized multiply. Dropped traces are zeroed in place and the arrays are compacted
+    once most entries are dead, so a step costs a few NumPy ops whatever the trace length.
+    Tables without a slot API (plain dicts) fall back to a per-key update.
+    """
+    __slots__ = ('keys', 'slots', 'values', 'positions', 'n', 'dead')
+
+    def __init__(self, capacity=32):
+        self.keys = np.empty(capacity, dtype=object)
+        self.slots = np.zeros(capacity, dtype=np.int64)
+        self.values = np.zeros(capacity, dtype=np.float64)
+        self.positions = {} # live key -> index
+        self.n = 0
+        self.dead = 0
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __iter__(self):
+        return iter(self.positions)
+
+    def __contains__(self, key):
+        return key in self.positions
+
+    def get(self, key, default=0.0):
+        i = self.positions.get(key)
+        return float(self.values[i]) if i is not None else default
+
+    def clear(self):
+        self.keys[:self.n] = None
+        self.positions = {}
+        self.n = 0
+        self.dead = 0
+
+    def _compact(self):
+        n = self.n
+        live = self.values[:n] > 0.0
+        m = int(live.sum())
+        self.keys[:m] = self.keys[:n][live]
+        self.slots[:m] = self.slots[:n][live]
+        self.values[:m] = self.values[:n][live]
+        self.keys[m:n] = None
+        self.positions = {k: i for i, k in enumerate(self.keys[:m].tolist())}
+        self.n = m
+        self.dead = 0
+
+    def _grow(self):
+        cap = self.values.shape[0] * 2
+        for name, dtype in (('keys', object), ('slots', np.int64), ('values', np.float64)):
+            arr = np.zeros(cap, dtype=dtype) if dtype is not object else np.empty(cap, dtype=object)
+            arr[:self.n] = getattr(self, name)[:self.n]
+            setattr(self, name, arr)
+
+    def increment(self, key, slot=-1, amount=1.0):
+        i = self.positions.get(key)
+        if i is None:
+            if self.n == self.values.shape[0]:
+                if self.dead: self._compact()
+                else: self._grow()
+            i = self.n
+            self.keys[i] = key
+            self.slots[i] = slot
+            self.values[i] = 0.0
+            self.positions[key] = i
+            self.n += 1
+        self.values[i] += amount
+
+    def apply(self, table, step):
+        """table[key] += step * e for every live trace."""
+        n = self.n
+        live = self.values[:n] > 0.0
+        if hasattr(table, 'slot'):
+            slots = self.slots[:n][live]
+            table_values = table.values # Re-read: the table may have grown since increment()
+            table_values[slots] = table_values[slots] + step * self.values[:n][live]
+        else:
+            for key, e_val in zip(self.keys[:n][live].tolist(), self.values[:n][live].tolist()):
+                table[key] = table.get(key, 0.0) + step * e_val
+
+    def decay(self, gamma, lam, keep):
+        """e <- e * gamma * lam (0 when keep is False); drops traces under TRACE_CUTOFF and returns their keys."""
+        n = self.n
+        values = self.values[:n]
+        alive = values > 0.0
+        new = values * gamma * lam if keep else np.zeros(n)
+        dropped = alive & (new < TRACE_CUTOFF)
+        new[dropped] = 0.0
+        self.values[:n] = new
+        removed = self.keys[:n][dropped].tolist()
+        for key in removed: del self.positions[key]
+        self.dead += len(removed)
+        if self.dead > max(16, n // 2): self._compact()
+        return removed
+
+
+# --- MICROBENCHMARK ---
+def _dict_step(table, traces, key, step, gamma, lam, keep):
+    """The original per-key loop from _update_traces_and_q, kept as the reference."""
+    traces[key] = traces.get(key, 0.0) + 1.0
+    keys_to_remove = []
+    for k, e_val in traces.items():
+        table[k] = table.get(k, 0.0) + step * e_val
+        new_e = e_val * gamma * lam if keep else 0.0
+        if new_e < TRACE_CUTOFF: keys_to_remove.append(k)
+        else: traces[k] = new_e
+    for k in keys_to_remove: del traces[k]
+
+def _sparse_step(table, traces, key, step, gamma, lam, keep):
+    traces.increment(key, table_slot(table, key))
+    traces.apply(table, step)
+    traces.decay(gamma, lam, keep)
+
+def benchmark(lengths, steps=2000, n_keys=50000, seed=0):
+    print(f"--- TRACE UPDATE BENCHMARK ({steps} steps per length) ---")
+    for length in lengths:
+        # Decay chosen so the steady-state trace holds ~length live entries
+        gamma, lam = TRACE_CUTOFF ** (1.0 / length), 1.0
+        rng = random.Random(seed)
+        keys = [((i,), i % 7) for i in range(n_keys)]
+        schedule = [(rng.choice(keys), rng.uniform(-0.1, 0.1), rng.random() > 0.001) for _ in range(steps)]
+
+        results = []
+        for step_fn, traces in ((_dict_step, {}), (_sparse_step, SparseTraces())):
+            table = QStore.from_dict({k: 0.0 for k in keys})
+            start = time.perf_counter()
+            for key, step, keep in schedule:
+                step_fn(table, traces, key, step, gamma, lam, keep)
+                if not keep: traces.clear()
+            results.append((time.perf_counter() - start, table, len(traces)))
+
+        (t_dict, dict_table, live), (t_sparse, sparse_table, _) = results
+        identical = np.array_equal(dict_table.values[:dict_table.size], sparse_table.values[:sparse_table.size])
+        print(f"len {length:5d} (live {live:4d}) | dict {t_dict / steps * 1e6:8.1f} us/step | sparse {t_sparse / steps * 1e6:7.1f} us/step | x{t_dict / t_sparse:5.1f} | identical {identical}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lengths", type=int, nargs="*", default=[10, 30, 100, 300, 1000])
+    parser.add_argument("--steps", type=int, default=2000)
+    args = parser.parse_args()
+    benchmark(args.lengths, args.steps)
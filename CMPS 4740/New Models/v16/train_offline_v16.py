@@ -0,0 +1,57 @@
+import os
+import time
+import argparse
+from player_v16 import TabularQPlayerV16, PriorCache
+from battle_log import read_index, iter_battles, replay_battles
+from train_v16 import ALPHA, GAMMA, LAMBDA, MODEL_EXT, PRIORS_FILE, SAVE_FREQ
+
+# --- CONFIG ---
+LOG_DIR = "battle_logs"
+REPORT_EVERY = 1000
+
+def main(args):
+    # Pinned to the logged actions, so epsilon only matters on a replay miss (then greedy)
+    learner = TabularQPlayerV16(battle_format="gen1randombattle", start_listening=False,
+                                alpha=args.alpha, gamma=GAMMA, lam=LAMBDA, epsilon=0.0,
+                                prior_cache=PriorCache(PRIORS_FILE))
+    model_file = f"v16_models/qtable_{args.opponent}{MODEL_EXT}"
+    os.makedirs("v16_models", exist_ok=True)
+    if os.path.exists(model_file):
+        learner.load_table(model_file)
+
+    n_logged = len(read_index(args.logs))
+    if args.limit is not None: n_logged = min(n_logged, args.limit)
+    print(f"--- V16 OFFLINE REPLAY: {n_logged} battles x {args.epochs} epoch(s) from {args.logs} -> {model_file} ---")
+
+    done = [0]
+    start_time = time.time()
+    def after_battle(player, battle):
+        player.pop_step_rewards() # Only the live trainer reports them
+        done[0] += 1
+        if done[0] % SAVE_FREQ == 0: player.checkpoint(model_file)
+        if done[0] % REPORT_EVERY == 0:
+            speed = done[0] / (time.time() - start_time)
+            print(f"Bat {done[0]}: States {len(player.q_table)} | Misses {player.replay_misses} | Speed {speed:.1f}/s")
+
+    for epoch in range(args.epochs):
+        epoch_start = time.time()
+        stats = replay_battles(learner, iter_battles(args.logs, args.limit), after_battle)
+        elapsed = time.time() - epoch_start
+        win_rate = stats['wins'] / stats['battles'] if stats['battles'] else 0.0
+        print(f"✅ Epoch {epoch + 1}: {stats['battles']} battles, {stats['decisions']} decisions in {elapsed:.1f}s "
+              f"({stats['battles'] / max(elapsed, 1e-9):.1f} bat/s) | Logged win rate {win_rate:.2%} | "
+              f"Misses {learner.replay_misses} | States {len(learner.q_table)}")
+
+    learner.checkpoint(model_file)
+    learner.wait_for_compaction()
+    learner.priors.save()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the v16 table from battle logs (train_v16.py --record) without a server.")
+    parser.add_argument("--logs", type=str, default=LOG_DIR)
+    parser.add_argument("--opponent", type=str, default="maxbp", help="Which qtable_<opponent> checkpoint to update")
+    parser.add_argument("--epochs", type=int, default=1)
+    parser.add_argument("--limit", type=int, default=None, help="Replay only the first N logged battles")
+    parser.add_argument("--alpha", type=float, default=ALPHA)
+    args = parser.parse_args()
+    main(args)
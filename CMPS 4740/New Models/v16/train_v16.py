@@ -1,6 +1,5 @@
 import asyncio
 import os
-import csv
 import time
 import logging
 import uuid
@@ -10,27 +9,30 @@ import traceback
 from collections import deque
 from poke_env.ps_client.server_configuration import LocalhostServerConfiguration
 from poke_env.player import SimpleHeuristicsPlayer, RandomPlayer, MaxBasePowerPlayer
-from player_v16 import TabularQPlayerV16
+from player_v16 import TabularQPlayerV16, PriorCache
+from battle_log import BattleLogWriter
+from battle_watchdog import BattleWatchdog
+from metrics_log import METRICS_EXT, append_metrics
+from worker_state import state_path, load_state, save_state, linear_epsilon, release_finished, memory_gauges, format_gauges, log_gauges
 
 # --- CONFIG ---
 BATTLES_PER_LOG = 1000 
 SAVE_FREQ = 1000
-BATTLE_TIMEOUT = 1 
+BATTLE_TIMEOUT = 1 # Per battle; a chunk of MAX_CONCURRENT battles gets proportionally longer (plus the watchdog's worst case)
+MAX_CONCURRENT = 32 # Battles kept in flight against the local server
+MODEL_EXT = ".qmap" # Memory-mapped checkpoint (see qtable_mmap.py); ".pkl" for the old pickle
 
 ALPHA = 0.1 
 GAMMA = 0.995 
 LAMBDA = 0.6967 
+PRIORS_FILE = "v16_models/priors_gen1randombattle.pkl" # Heuristic init cache, shared by every worker / opponent
 
 logging.basicConfig(level=logging.CRITICAL)
 logging.getLogger("poke_env").setLevel(logging.CRITICAL)
 
 def log_stats(filename, battles, rolling_win, overall_win, epsilon, speed, avg_rew, table_size, opponent):
-    file_exists = os.path.isfile(filename)
-    with open(filename, mode='a', newline='') as f:
-        writer = csv.writer(f)
-        if not file_exists:
-            writer.writerow(['Battles', 'RollingWin', 'OverallWin', 'Epsilon', 'Speed', 'AvgReward', 'TableSize', 'Opponent'])
-        writer.writerow([battles, f"{rolling_win:.2%}", f"{overall_win:.2%}", f"{epsilon:.4f}", speed, f"{avg_rew:.4f}", table_size, opponent])
+    append_metrics(filename, battles=battles, rolling_win=rolling_win, overall_win=overall_win, epsilon=epsilon,
+                   speed=speed, avg_reward=avg_rew, table_size=table_size, opponent=opponent)
 
 def print_live_progress(current_count, total_count, current_speed, log_window_size):
     progress_fraction = current_count / log_window_size
@@ -57,50 +59,84 @@ async def main(args):
     OppClass = get_unique_player_class(BaseOpp, "Opp", run_uuid)
     opponent = OppClass(battle_format="gen1randombattle", 
                         server_configuration=LocalhostServerConfiguration, 
-                        max_concurrent_battles=1)
+                        max_concurrent_battles=MAX_CONCURRENT)
 
     LearnerClass = get_unique_player_class(TabularQPlayerV16, "Learner", run_uuid)
     learner = LearnerClass(battle_format="gen1randombattle", 
                            server_configuration=LocalhostServerConfiguration,
-                           max_concurrent_battles=1,
-                           alpha=ALPHA, gamma=GAMMA, lam=LAMBDA, epsilon=args.epsilon)
+                           max_concurrent_battles=MAX_CONCURRENT,
+                           alpha=ALPHA, gamma=GAMMA, lam=LAMBDA, epsilon=args.epsilon,
+                           prior_cache=PriorCache(PRIORS_FILE))
+    if args.record: learner.record_to(BattleLogWriter(args.record)) # Raw protocol for train_offline_v16.py
     
-    MODEL_FILE = f"v16_models/qtable_{args.opponent}.pkl"
+    MODEL_FILE = f"v16_models/qtable_{args.opponent}{MODEL_EXT}"
+    LEGACY_FILE = f"v16_models/qtable_{args.opponent}.pkl"
+    STATE_FILE = state_path(MODEL_FILE)
     os.makedirs("v16_models", exist_ok=True)
     os.makedirs("v16_logs", exist_ok=True)
     
     if os.path.exists(MODEL_FILE):
         learner.load_table(MODEL_FILE)
+    elif os.path.exists(LEGACY_FILE):
+        learner.load_table(LEGACY_FILE)
+
+    if args.persistent:
+        # Counters saved with the checkpoint we just loaded win over the supervisor's CSV guess
+        state = load_state(STATE_FILE)
+        if state is not None:
+            args.historic_battles, args.historic_wins = state['battles'], state['wins']
+        remaining = args.target_battles - args.historic_battles
+        print(f"--- V16 PERSISTENT WORKER (Bat {args.historic_battles}, {remaining} to go) ---")
+        args.batch_size = max(0, remaining)
+
+    def set_epsilon(total_battles):
+        if args.decay_battles:
+            learner.epsilon = linear_epsilon(total_battles, args.epsilon, args.eps_end, args.decay_battles)
+
+    def save_checkpoint():
+        learner.checkpoint(MODEL_FILE) # Appends only the entries touched since the last save
+        save_state(STATE_FILE, battles=args.historic_battles + battles_collected,
+                   wins=args.historic_wins + session_wins, epsilon=learner.epsilon)
+
+    # Forfeits / leaves stuck battles so a stall costs one battle, not a process restart
+    watchdog = BattleWatchdog(learner, opponent)
+    watchdog.start()
 
     battles_collected = 0
     start_time = time.time()
     
-    initial_learner_wins = learner.n_won_battles 
+    session_wins = 0
     session_outcomes = deque(maxlen=BATTLES_PER_LOG)
     
     accumulated_total_reward = 0.0 
     
-    chunk_size = 1 
     log_window_start_time = time.time()
     current_log_progress = 0
     consecutive_timeouts = 0
+    next_save = SAVE_FREQ
     
     while battles_collected < args.batch_size:
         try:
-            if battles_collected > 0 and battles_collected % SAVE_FREQ == 0:
-                 learner.save_table(MODEL_FILE)
+            if battles_collected >= next_save:
+                 save_checkpoint()
+                 next_save += SAVE_FREQ
 
+            chunk_size = min(MAX_CONCURRENT, args.batch_size - battles_collected)
+            set_epsilon(args.historic_battles + battles_collected)
             wins_before = learner.n_won_battles
             
-            await asyncio.wait_for(learner.battle_against(opponent, n_battles=chunk_size), timeout=BATTLE_TIMEOUT)
+            await asyncio.wait_for(learner.battle_against(opponent, n_battles=chunk_size), timeout=BATTLE_TIMEOUT * chunk_size + watchdog.worst_case)
             
             consecutive_timeouts = 0
             
-            is_win = learner.n_won_battles > wins_before
-            session_outcomes.append(1 if is_win else 0)
+            chunk_wins = learner.n_won_battles - wins_before
+            session_wins += chunk_wins
+            # poke_env would otherwise hold every finished battle (and its lock) forever
+            release_finished(learner)
+            release_finished(opponent)
+            session_outcomes.extend([1] * chunk_wins + [0] * (chunk_size - chunk_wins))
             
-            outcome_reward = 1.0 if is_win else -1.0
-            accumulated_total_reward += outcome_reward
+            accumulated_total_reward += chunk_wins - (chunk_size - chunk_wins)
             
             step_rewards = learner.pop_step_rewards()
             accumulated_total_reward += sum(step_rewards)
@@ -108,42 +144,54 @@ async def main(args):
             battles_collected += chunk_size
             current_log_progress += chunk_size
             
-            if current_log_progress % 10 == 0 and current_log_progress < BATTLES_PER_LOG:
+            if current_log_progress < BATTLES_PER_LOG:
                 elapsed_progress = time.time() - log_window_start_time
                 current_speed = current_log_progress / elapsed_progress if elapsed_progress > 0 else 0
                 print_live_progress(current_log_progress, BATTLES_PER_LOG, current_speed, BATTLES_PER_LOG)
             
-            if battles_collected % BATTLES_PER_LOG == 0:
+            if current_log_progress >= BATTLES_PER_LOG:
                 sys.stdout.write("\r" + " " * 80 + "\r")
                 sys.stdout.flush()
                 
                 rolling_wr = sum(session_outcomes) / len(session_outcomes) if len(session_outcomes) > 0 else 0.0
-                current_session_wins = learner.n_won_battles - initial_learner_wins
                 total_battles_processed = args.historic_battles + battles_collected
-                total_wins_overall = args.historic_wins + current_session_wins
+                total_wins_overall = args.historic_wins + session_wins
                 overall_wr = total_wins_overall / total_battles_processed if total_battles_processed > 0 else 0.0
                 
                 elapsed = time.time() - start_time
                 speed = battles_collected / elapsed if elapsed > 0 else 0.0
                 table_size = len(learner.q_table)
-                avg_rew = accumulated_total_reward / BATTLES_PER_LOG
+                avg_rew = accumulated_total_reward / current_log_progress
                 
                 print(f"Bat {total_battles_processed}: Rolling {rolling_wr:.2%} | Overall {overall_wr:.2%} | AvgRew {avg_rew:.3f} | Eps {learner.epsilon:.3f} | States {table_size} | Speed {speed:.1f}/s")
                 
                 log_stats(
-                    f"v16_logs/log_{args.opponent}.csv",
+                    f"v16_logs/log_{args.opponent}{METRICS_EXT}",
                     total_battles_processed, rolling_wr, overall_wr, learner.epsilon, speed, avg_rew, table_size, args.opponent
                 )
+                gauges = memory_gauges(learner, opponent, contexts=len(learner.contexts), feature_cache=len(learner.extractor._cache),
+                                       priors=len(learner.priors.entries), states=table_size)
+                print(f"   Memory: {format_gauges(gauges)}")
+                log_gauges(f"v16_logs/memory_{args.opponent}.csv", total_battles_processed, gauges)
+                stalls = watchdog.metrics()
+                if any(stalls.values()): print(f"   Watchdog: {format_gauges(stalls)}")
+                log_gauges(f"v16_logs/watchdog_{args.opponent}.csv", total_battles_processed, stalls)
                 
                 accumulated_total_reward = 0.0
                 current_log_progress = 0
                 log_window_start_time = time.time()
 
         except asyncio.TimeoutError:
+            # The watchdog frees any stuck battle well within the timeout, so repeated
+            # chunk timeouts mean the connection itself is gone: that is worth a restart
             consecutive_timeouts += 1
+            watchdog.counts['chunk_timeouts'] += 1
             if consecutive_timeouts >= 5:
                 print(f"\n⚠️ 5 Timeouts. Restarting Process.")
-                learner.save_table(MODEL_FILE)
+                watchdog.stop()
+                save_checkpoint()
+                learner.wait_for_compaction()
+                learner.priors.save()
                 sys.exit(1) 
             time.sleep(0.1)
             continue
@@ -151,14 +199,23 @@ async def main(args):
             traceback.print_exc()
             pass
 
-    learner.save_table(MODEL_FILE)
+    watchdog.stop()
+    save_checkpoint()
+    learner.wait_for_compaction()
+    learner.priors.save()
+    if learner.recorder is not None: learner.recorder.close()
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--historic_battles", type=int, default=0)
     parser.add_argument("--historic_wins", type=int, default=0)
     parser.add_argument("--batch_size", type=int, default=100)
-    parser.add_argument("--epsilon", type=float, default=0.5)
+    parser.add_argument("--epsilon", type=float, default=0.5, help="Fixed epsilon, or the schedule's start with --decay_battles")
+    parser.add_argument("--eps_end", type=float, default=0.05)
+    parser.add_argument("--decay_battles", type=int, default=0, help="Decay epsilon linearly to --eps_end over this many total battles")
+    parser.add_argument("--persistent", action="store_true", help="Run to --target_battles in this process, resuming from the saved worker state")
+    parser.add_argument("--target_battles", type=int, default=0)
     parser.add_argument("--opponent", type=str, default="maxbp")
+    parser.add_argument("--record", type=str, default=None, help="Log every battle to this battle_log directory")
     args = parser.parse_args()
     asyncio.run(main(args))
\ No newline at end of file
@@ -0,0 +1,194 @@
+import os
+import sys
+import zlib
+import pickle
+import struct
+import logging
+import argparse
+import subprocess
+
+# --- CONFIG ---
+WAL_EXT = ".wal"
+COMPACTING_EXT = ".wal.compacting"
+COMPACT_BYTES = 64 * 1024 * 1024 # Fold the log into the base snapshot past this size
+RECORD_HEADER = struct.Struct('<II') # payload length, crc32
+
+class DeltaLog:
+    """
+    Append-only write-ahead log of table deltas sitting next to a base snapshot.
+
+    Each record is one checkpoint: {'q': {key: value}, 'switch': {key: value}} holding
+    only the entries modified since the previous checkpoint. Values are absolute, so
+    replaying a record twice is harmless. Compaction rotates the live log aside, writes a
+    fresh base snapshot and then deletes the rotated log; a crash at any point leaves
+    base + rotated log + live log, which replay back to the latest flushed state.
+    """
+    def __init__(self, base_path):
+        self.base_path = base_path
+        self.wal_path = base_path + WAL_EXT
+        self.compacting_path = base_path + COMPACTING_EXT
+
+    def append(self, q_delta, switch_delta):
+        payload = pickle.dumps({'q': q_delta, 'switch': switch_delta}, protocol=pickle.HIGHEST_PROTOCOL)
+        with open(self.wal_path, 'ab') as f:
+            f.write(RECORD_HEADER.pack(len(payload), zlib.crc32(payload)))
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        return len(payload)
+
+    def size(self):
+        return os.path.getsize(self.wal_path) if os.path.exists(self.wal_path) else 0
+
+    def reset(self):
+        for path in (self.wal_path, self.compacting_path):
+            if os.path.exists(path): os.remove(path)
+
+    def _read_records(self, path):
+        """Yields deltas up to the first torn / corrupt record, then truncates the tail."""
+        good_offset = 0
+        with open(path, 'rb') as f:
+            while True:
+                header = f.read(RECORD_HEADER.size)
+                if len(header) < RECORD_HEADER.size: break
+                length, crc = RECORD_HEADER.unpack(header)
+                payload = f.read(length)
+                if len(payload) < length or zlib.crc32(payload) != crc: break
+                good_offset = f.tell()
+                yield pickle.loads(payload)
+        if good_offset < os.path.getsize(path):
+            logging.critical(f"Truncating torn tail of {path} at byte {good_offset}")
+            with open(path, 'r+b') as f: f.truncate(good_offset)
+
+    def replay(self):
+        for path in (self.compacting_path, self.wal_path):
+            if os.path.exists(path):
+                yield from self._read_records(path)
+
+    # --- COMPACTION ---
+    def begin_compaction(self):
+        """Rotates the live log aside. Returns False if a previous compaction is unfinished."""
+        if os.path.exists(self.compacting_path) or not os.path.exists(self.wal_path): return False
+        os.replace(self.wal_path, self.compacting_path)
+        return True
+
+    def end_compaction(self):
+        if os.path.exists(self.compacting_path): os.remove(self.compacting_path)
+
+    def abort_compaction(self):
+        """Puts the rotated log back in front of the live one, so compaction can start over."""
+        if not os.path.exists(self.compacting_path): return
+        tmp = self.wal_path + ".tmp"
+        with open(tmp, 'wb') as out:
+            for path in (self.compacting_path, self.wal_path):
+                if os.path.exists(path):
+                    with open(path, 'rb') as f: out.write(f.read())
+            out.flush()
+            os.fsync(out.fileno())
+        # Crash between these two: replay reads the rotated records twice, which is harmless
+        os.replace(tmp, self.wal_path)
+        os.remove(self.compacting_path)
+
+
+def compact_files(base_path):
+    """
+    Folds the rotated log into the base snapshot, from the files alone: base + rotated log
+    is exactly the table state when the log was rotated. Runs in its own process.
+    """
+    log = DeltaLog(base_path)
+    with open(base_path, 'rb') as f: tables = pickle.load(f)
+    for record in log._read_records(log.compacting_path):
+        tables['q'].update(record['q'])
+        tables['switch'].update(record['switch'])
+
+    tmp = base_path + ".tmp"
+    with open(tmp, 'wb') as f:
+        pickle.dump(tables, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, base_path)
+    log.end_compaction()
+
+
+def _gather(table, keys):
+    """{key: value} for the dirty keys still present in table."""
+    if hasattr(table, 'get_values'): # QStore: one vectorized probe instead of a lookup per key
+        keys = list(keys)
+        return {k: float(v) for k, v in zip(keys, table.get_values(keys)) if v == v}
+    return {k: table[k] for k in keys if k in table}
+
+
+class IncrementalCheckpointMixin:
+    """
+    Dirty-key tracking + DeltaLog checkpointing for the tabular players.
+    The player marks keys in self.dirty_q / self.dirty_switch whenever it writes a table,
+    and must provide save_table(path) (atomic full snapshot, returns True on success)
+    and call replay_delta_log(path) at the end of load_table(path).
+    """
+    def _init_checkpointing(self):
+        self.dirty_q = set()
+        self.dirty_switch = set()
+        self._compaction = None # (process, path) of the running compaction
+
+    def checkpoint(self, path):
+        log = DeltaLog(path)
+        if not os.path.exists(path):
+            self.save_table(path)
+            log.reset()
+        else:
+            q_delta = _gather(self.q_table, self.dirty_q)
+            s_delta = _gather(self.switch_table, self.dirty_switch)
+            if q_delta or s_delta: log.append(q_delta, s_delta)
+        self.dirty_q.clear()
+        self.dirty_switch.clear()
+
+        if log.size() > COMPACT_BYTES:
+            self.compact(path, log)
+
+    def compact(self, path, log=None):
+        log = log or DeltaLog(path)
+        if self._compaction_running(): return
+        if os.path.exists(log.compacting_path):
+            # Left by a crashed process: nothing is writing the base, so start over
+            logging.critical(f"Merging unfinished compaction {log.compacting_path} back into the log")
+            log.abort_compaction()
+        if not log.begin_compaction(): return
+
+        # A fresh interpreter rebuilds the base from disk while we keep battling. No
+        # fork: this process runs poke_env's loop thread, whose locks a child would inherit.
+        proc = subprocess.Popen([sys.executable, os.path.abspath(__file__), "compact", path])
+        self._compaction = (proc, path)
+
+    def _finish_compaction(self, proc, path):
+        self._compaction = None
+        if proc.returncode != 0:
+            logging.critical(f"Compaction of {path} failed (exit {proc.returncode}); its deltas stay in {path}{WAL_EXT}")
+            DeltaLog(path).abort_compaction()
+
+    def _compaction_running(self):
+        if self._compaction is None: return False
+        proc, path = self._compaction
+        if proc.poll() is None: return True
+        self._finish_compaction(proc, path)
+        return False
+
+    def wait_for_compaction(self):
+        if self._compaction is not None:
+            proc, path = self._compaction
+            proc.wait()
+            self._finish_compaction(proc, path)
+
+    def replay_delta_log(self, path):
+        n_records = 0
+        for record in DeltaLog(path).replay():
+            self.q_table.update(record['q'])
+            self.switch_table.update(record['switch'])
+            n_records += 1
+        if n_records:
+            logging.critical(f"Replayed {n_records} checkpoint deltas from {path}{WAL_EXT}")
+        return n_records
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", choices=["compact"])
+    parser.add_argument("path", help="Base snapshot whose .wal.compacting should be folded in")
+    args = parser.parse_args()
+    compact_files(args.path)
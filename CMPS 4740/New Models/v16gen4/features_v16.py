@@ -24,6 +24,34 @@ class AdvancedFeatureExtractor:
         if SideCondition is None:
             logging.warning("⚠️ SideCondition enum not found. Features will be 0.")
 
+        # Turn-scoped memo: battle_tag -> (decision key, {feature: value})
+        self._cache = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    # --- TURN CACHE ---
+    def _turn_cache(self, battle):
+        """
+        Memo dict for the current decision in this battle. The key is the turn number plus
+        force_switch and the active species, because a forced switch after a faint (or a
+        U-turn) asks for a second decision within the same turn on a different board.
+        """
+        active = battle.active_pokemon
+        decision = (battle.turn, battle.force_switch, active.species if active else None)
+        entry = self._cache.get(battle.battle_tag)
+        if entry is None or entry[0] != decision:
+            entry = (decision, {})
+            self._cache[battle.battle_tag] = entry
+        return entry[1]
+
+    def forget(self, battle_tag):
+        self._cache.pop(battle_tag, None)
+
+    def cache_stats(self):
+        total = self.cache_hits + self.cache_misses
+        rate = self.cache_hits / total if total else 0.0
+        return f"Feature cache: {self.cache_hits} hits / {self.cache_misses} misses ({rate:.1%})"
+
     def get_hp_bucket(self, current_hp, max_hp):
         if max_hp == 0 or current_hp == 0: return 0
         ratio = current_hp / max_hp
@@ -59,6 +87,16 @@ class AdvancedFeatureExtractor:
         return (has_any, has_max)
 
     def get_hazards_tuple(self, battle):
+        cache = self._turn_cache(battle)
+        hazards = cache.get('hazards')
+        if hazards is not None:
+            self.cache_hits += 1
+            return hazards
+        self.cache_misses += 1
+        hazards = cache['hazards'] = self._compute_hazards_tuple(battle)
+        return hazards
+
+    def _compute_hazards_tuple(self, battle):
         if SideCondition is None: return (0, 0, 0, 0)
         sc = battle.side_conditions
         has_spikes = 1 if SideCondition.SPIKES in sc else 0
@@ -68,6 +106,16 @@ class AdvancedFeatureExtractor:
         return (has_spikes, has_rocks, has_web, has_tspikes)
 
     def get_master_state(self, battle):
+        cache = self._turn_cache(battle)
+        state = cache.get('master')
+        if state is not None:
+            self.cache_hits += 1
+            return state
+        self.cache_misses += 1
+        state = cache['master'] = self._compute_master_state(battle)
+        return state
+
+    def _compute_master_state(self, battle):
         my_mon = battle.active_pokemon
         if my_mon:
             my_species = my_mon.species
@@ -97,6 +145,17 @@ class AdvancedFeatureExtractor:
         )
 
     def get_sub_state(self, battle, candidate):
+        cache = self._turn_cache(battle)
+        key = ('sub', candidate.species)
+        state = cache.get(key)
+        if state is not None:
+            self.cache_hits += 1
+            return state
+        self.cache_misses += 1
+        state = cache[key] = self._compute_sub_state(battle, candidate)
+        return state
+
+    def _compute_sub_state(self, battle, candidate):
         opp_mon = battle.opponent_active_pokemon
         if opp_mon:
             opp_species = opp_mon.species
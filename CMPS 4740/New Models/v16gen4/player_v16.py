@@ -6,10 +6,12 @@ import numpy as np
 import logging
 import gc
 import math
+from collections import OrderedDict
 from poke_env.player.player import Player
 from poke_env.battle.pokemon import Pokemon
 from poke_env.battle.move_category import MoveCategory
 from features_v16 import AdvancedFeatureExtractor
+from delta_log import IncrementalCheckpointMixin
 
 # Fix Gen 1/4 moves issue
 _original_available_moves = Pokemon.available_moves_from_request
@@ -34,8 +36,8 @@ class HeuristicEngine:
         return ((2 * mon.base_stats.get(stat, 100) + 31) + 5) * multiplier
 
     @staticmethod
-    def _estimate_matchup(mon, opponent):
-        if not opponent: return 0
+    def _type_speed_matchup(mon, opponent):
+        """HP-independent part of _estimate_matchup (depends only on the two species)."""
         # Type effectiveness
         score = max([opponent.damage_multiplier(t) for t in mon.types if t is not None])
         score -= max([mon.damage_multiplier(t) for t in opponent.types if t is not None])
@@ -45,6 +47,12 @@ class HeuristicEngine:
             score += HeuristicEngine.SPEED_TIER_COEFICIENT
         elif opponent.base_stats.get("spe", 0) > mon.base_stats.get("spe", 0):
             score -= HeuristicEngine.SPEED_TIER_COEFICIENT
+        return score
+
+    @staticmethod
+    def _estimate_matchup(mon, opponent, type_speed=None):
+        if not opponent: return 0
+        score = HeuristicEngine._type_speed_matchup(mon, opponent) if type_speed is None else type_speed
             
         # HP
         score += mon.current_hp_fraction * HeuristicEngine.HP_FRACTION_COEFICIENT
@@ -78,11 +86,94 @@ class HeuristicEngine:
     def get_switch_score(battle, candidate, opponent):
         return HeuristicEngine._estimate_matchup(candidate, opponent)
 
-class TabularQPlayerV16(Player):
-    def __init__(self, battle_format="gen4randombattle", alpha=0.1, gamma=0.99, lam=0.8, epsilon=0.1, **kwargs):
+class PriorCache:
+    """
+    Memoized HeuristicEngine scores used to initialize new Q / switch entries.
+
+    Move scores are keyed by (attacker species, move id, defender species, boost bucket),
+    the bucket being the two stat stages the move's category reads, so a hit returns
+    exactly what get_move_score would. Switch scores cache the type/speed part of the
+    matchup per (candidate species, opponent species) and add the HP terms on top.
+    LRU-bounded; save() merges into the file on disk so workers share one warm cache.
+    """
+    MAX_ENTRIES = 500000
+
+    def __init__(self, path=None, max_entries=MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if path and os.path.exists(path): self.load(path)
+
+    def _lookup(self, key):
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        return value
+
+    def _store(self, key, value):
+        self.entries[key] = value
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def move_score(self, battle, move, active, opponent):
+        if not opponent or not active: return 0.0
+        atk, defn = ("atk", "def") if move.category == MoveCategory.PHYSICAL else ("spa", "spd")
+        key = (active.species, move.id, opponent.species, (active.boosts.get(atk), opponent.boosts.get(defn)))
+        score = self._lookup(key)
+        if score is None:
+            score = HeuristicEngine.get_move_score(battle, move, active, opponent)
+            self._store(key, score)
+        return score
+
+    def switch_score(self, battle, candidate, opponent):
+        if not opponent: return 0
+        key = ("switch", candidate.species, opponent.species)
+        type_speed = self._lookup(key)
+        if type_speed is None:
+            type_speed = HeuristicEngine._type_speed_matchup(candidate, opponent)
+            self._store(key, type_speed)
+        return HeuristicEngine._estimate_matchup(candidate, opponent, type_speed)
+
+    def stats(self):
+        total = self.hits + self.misses
+        rate = self.hits / total if total else 0.0
+        return f"Prior cache: {len(self.entries)} entries | {self.hits} hits / {self.misses} misses ({rate:.1%})"
+
+    def load(self, path):
+        try:
+            with open(path, 'rb') as f:
+                self.entries.update(pickle.load(f))
+            while len(self.entries) > self.max_entries: self.entries.popitem(last=False)
+        except Exception as e:
+            logging.critical(f"Ignoring prior cache {path}. Error: {e}")
+
+    def save(self, path=None):
+        path = path or self.path
+        if not path: return
+        merged = OrderedDict()
+        if os.path.exists(path): # Keep what other workers saved since we loaded
+            try:
+                with open(path, 'rb') as f: merged.update(pickle.load(f))
+            except Exception: pass
+        merged.update(self.entries)
+        while len(merged) > self.max_entries: merged.popitem(last=False)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            pickle.dump(merged, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
+
+class TabularQPlayerV16(IncrementalCheckpointMixin, Player):
+    def __init__(self, battle_format="gen4randombattle", alpha=0.1, gamma=0.99, lam=0.8, epsilon=0.1, prior_cache=None, **kwargs):
         super().__init__(battle_format=battle_format, **kwargs)
         
         self.extractor = AdvancedFeatureExtractor()
+        # Heuristic initial values (shared PriorCache so workers can warm-start from disk)
+        self.priors = prior_cache if prior_cache is not None else PriorCache()
         
         # Tables
         self.q_table = {}
@@ -104,6 +195,9 @@ class TabularQPlayerV16(Player):
         self.last_reward_snapshot = None
         self.step_buffer = []
 
+        # Keys written since the last checkpoint(); flushed to the delta log
+        self._init_checkpointing()
+
     # --- INITIALIZATION LOGIC ---
     def _initialize_state_if_needed(self, battle, state_key, possible_actions):
         """
@@ -126,7 +220,7 @@ class TabularQPlayerV16(Player):
                 # Or a small penalty/bonus depending on if we are trapped
                 score = 50.0 # Arbitrary mid-range score for "Switching general option"
             else:
-                score = HeuristicEngine.get_move_score(battle, move_obj, active, opponent)
+                score = self.priors.move_score(battle, move_obj, active, opponent)
             raw_scores.append(score)
             
         # 2. Softmax Normalization
@@ -142,6 +236,7 @@ class TabularQPlayerV16(Player):
             if (state_key, action_hash) not in self.q_table:
                 # Initialize with the heuristic probability [0.0, 1.0]
                 self.q_table[(state_key, action_hash)] = normalized_scores[i]
+                self.dirty_q.add((state_key, action_hash))
 
     def _initialize_switch_if_needed(self, battle, candidates):
         """
@@ -163,7 +258,7 @@ class TabularQPlayerV16(Player):
         # Calculate scores
         raw_scores = []
         for mon in candidates:
-            score = HeuristicEngine.get_switch_score(battle, mon, opponent)
+            score = self.priors.switch_score(battle, mon, opponent)
             raw_scores.append(score)
             
         # Softmax
@@ -176,6 +271,7 @@ class TabularQPlayerV16(Player):
         for i, ctx in enumerate(contexts):
             if ctx not in self.switch_table:
                 self.switch_table[ctx] = normalized_scores[i]
+                self.dirty_switch.add(ctx)
 
     # --- STANDARD Q-LEARNING METHODS ---
     def _get_dense_reward_snapshot(self, battle):
@@ -226,6 +322,7 @@ class TabularQPlayerV16(Player):
         old_val = self.switch_table.get(context_key, 0.0)
         new_val = old_val + alpha_switch * (reward - old_val)
         self.switch_table[context_key] = new_val
+        self.dirty_switch.add(context_key)
 
     def _update_traces_and_q(self, reward, max_next_q, next_action_is_greedy):
         old_q = self.get_q_value(self.last_state_key, self.last_action_hash)
@@ -234,6 +331,7 @@ class TabularQPlayerV16(Player):
         if self.last_switch_context:
             self.switch_traces[self.last_switch_context] = self.switch_traces.get(self.last_switch_context, 0.0) + 1.0
 
+        self.dirty_switch.update(self.switch_traces)
         switch_keys_to_remove = []
         for s_key, e_val in self.switch_traces.items():
             self.switch_table[s_key] = self.switch_table.get(s_key, 0.0) + self.alpha * delta * e_val
@@ -244,6 +342,7 @@ class TabularQPlayerV16(Player):
 
         trace_key = (self.last_state_key, self.last_action_hash)
         self.active_traces[trace_key] = self.active_traces.get(trace_key, 0.0) + 1.0
+        self.dirty_q.update(self.active_traces)
         
         keys_to_remove = []
         for key, e_val in self.active_traces.items():
@@ -347,7 +446,17 @@ class TabularQPlayerV16(Player):
     def battle_finished_callback(self, battle):
         pass 
 
+    def _battle_finished_callback(self, battle):
+        # The only terminal hook poke_env 0.16 calls live (at |win| / |tie|)
+        self._terminal_update(battle, bool(battle.won))
+
     def _battle_finished(self, battle, won):
+        self._terminal_update(battle, won)
+        self._n_finished_battles += 1
+        if won: self._n_won_battles += 1
+
+    def _terminal_update(self, battle, won):
+        self.extractor.forget(battle.battle_tag)
         current_snapshot = self._get_dense_reward_snapshot(battle)
         step_reward = self._calculate_step_reward(current_snapshot)
         win_reward = 1.0 if won else -1.0
@@ -363,11 +472,9 @@ class TabularQPlayerV16(Player):
         self.active_traces.clear(); self.switch_traces.clear()
         self.last_switch_context = None; self.last_switch_action_was_greedy = False
         self.last_reward_snapshot = None
-        
-        self._n_finished_battles += 1
-        if won: self._n_won_battles += 1
 
     def save_table(self, path):
+        """Full snapshot. Training loops should call checkpoint(), which only appends deltas."""
         gc.disable()
         temp_path = path + ".tmp"  # Save to a temporary file first
         try:
@@ -377,10 +484,12 @@ class TabularQPlayerV16(Player):
             
             # Only overwrite the real file if the dump finished successfully
             os.replace(temp_path, path) 
+            return True
         except Exception as e:
             print(f"⚠️ Error during save: {e}")
             if os.path.exists(temp_path):
                 os.remove(temp_path)
+            return False
         finally:
             gc.enable()
 
@@ -391,6 +500,7 @@ class TabularQPlayerV16(Player):
                 data = pickle.load(f)
                 self.q_table = data.get('q', {})
                 self.switch_table = data.get('switch', {})
+            self.replay_delta_log(path)
             logging.critical(f"Loaded V16 Tables: Q ({len(self.q_table)}) Switch ({len(self.switch_table)})")
         except Exception as e:
             logging.critical(f"Starting fresh V16. Error: {e}")
@@ -10,7 +10,7 @@ import traceback
 from collections import deque
 from poke_env.ps_client.server_configuration import LocalhostServerConfiguration
 from poke_env.player import SimpleHeuristicsPlayer, RandomPlayer, MaxBasePowerPlayer
-from player_v16 import TabularQPlayerV16
+from player_v16 import TabularQPlayerV16, PriorCache
 
 # --- CONFIG ---
 BATTLES_PER_LOG = 1000
@@ -20,6 +20,7 @@ BATTLE_TIMEOUT = 1
 ALPHA = 0.1 
 GAMMA = 0.995 
 LAMBDA = 0.6967 
+PRIORS_FILE = "v16_models/priors_gen4randombattle.pkl" # Heuristic init cache, shared by every worker / opponent
 
 logging.basicConfig(level=logging.CRITICAL)
 logging.getLogger("poke_env").setLevel(logging.CRITICAL)
@@ -63,7 +64,8 @@ async def main(args):
     learner = LearnerClass(battle_format="gen4randombattle", 
                            server_configuration=LocalhostServerConfiguration,
                            max_concurrent_battles=1,
-                           alpha=ALPHA, gamma=GAMMA, lam=LAMBDA, epsilon=args.epsilon)
+                           alpha=ALPHA, gamma=GAMMA, lam=LAMBDA, epsilon=args.epsilon,
+                           prior_cache=PriorCache(PRIORS_FILE))
     
     MODEL_FILE = f"v16_models/qtable_{args.opponent}.pkl"
     os.makedirs("v16_models", exist_ok=True)
@@ -88,7 +90,7 @@ async def main(args):
     while battles_collected < args.batch_size:
         try:
             if battles_collected > 0 and battles_collected % SAVE_FREQ == 0:
-                 learner.save_table(MODEL_FILE)
+                 learner.checkpoint(MODEL_FILE) # Appends only the entries touched since the last save
 
             wins_before = learner.n_won_battles
             
@@ -143,7 +145,9 @@ async def main(args):
             consecutive_timeouts += 1
             if consecutive_timeouts >= 5:
                 print(f"\n⚠️ 5 Timeouts. Restarting Process.")
-                learner.save_table(MODEL_FILE)
+                learner.checkpoint(MODEL_FILE)
+                learner.wait_for_compaction()
+                learner.priors.save()
                 sys.exit(1) 
             time.sleep(0.1)
             continue
@@ -151,7 +155,9 @@ async def main(args):
             traceback.print_exc()
             pass
 
-    learner.save_table(MODEL_FILE)
+    learner.checkpoint(MODEL_FILE)
+    learner.wait_for_compaction()
+    learner.priors.save()
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()